@@ -2,32 +2,48 @@
 Chaino CLI entrypoint (__main__.py)
 
 Usage:
-  py -m chaino scan
+  py -m chaino scan [--timeout SEC] [--workers N]
   py -m chaino change <PORT> <NEW_ADDR>
+  py -m chaino emulate [SLAVE_ADDR ...] [--baud BAUD]
+  py -m chaino bench [PORT] [--emulate] [-w WORKLOAD ...] [-n COUNT]
+  py -m chaino bench --micro
+  py -m chaino bench --crc
+  py -m chaino dump <CAPTURE_FILE>
 
 Examples:
   py -m chaino scan
   py -m chaino change COM9 0x41
   py -m chaino change /dev/ttyACM0 0x41
+  py -m chaino emulate 0x41 0x42
+  py -m chaino bench COM9 --slaves 0x41 0x42 -n 2000
+  py -m chaino bench --emulate --baud 460800 -w read -w write
+  py -m chaino dump link.cap
 """
 
 import argparse
 import sys
+import time
 from . import Chaino  # re-exported in __init__.py
 
 
 def _cmd_scan(args) -> int:
     """
-    Scan for Chaino MASTER devices on serial ports (CPython only).
-    Chaino.scan() prints status for each detected port.
+    Scan for Chaino MASTER devices on serial ports (CPython only)
+    and print one line per detected master.
     """
     try:
-        Chaino.scan()
-        return 0
+        found = Chaino.scan(timeout=args.timeout, max_workers=args.workers)
     except Exception as e:
         print(f"[ERROR] scan failed: {e}")
         return 1
 
+    for port, name, addr, version, rtt_ms in found:
+        print(f'Serial("{port}"): {name}(0x{addr:02x}) {version} [{rtt_ms:.2f} ms]')
+    if not found:
+        print("No Chaino master device found.")
+    print("Note: Chaino.scan() can detect \033[31m**MASTER**\033[0m Chaino devices only.")
+    return 0
+
 
 def _cmd_change(args) -> int:
     """
@@ -56,15 +72,86 @@ def _cmd_change(args) -> int:
         return 4
 
 
+def _cmd_emulate(args) -> int:
+    """
+    Serve an emulated Chaino MASTER (with the given I2C slaves) on a
+    pseudo-terminal until Ctrl+C is pressed (POSIX only).
+    """
+    try:
+        from .emulator import ChainoEmulator
+        slaves = [int(x, 0) for x in args.slaves]
+        emu = ChainoEmulator(slaves=slaves, baudrate=args.baud)
+        port = emu.start()
+    except Exception as e:
+        print(f"[ERROR] Failed to start the emulator: {e}")
+        return 5
+
+    print(f'Emulated Chaino master on "{port}" (slaves: {", ".join(f"0x{a:02x}" for a in slaves) or "none"})')
+    print("Press Ctrl+C to stop.")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    emu.stop()
+    return 0
+
+
+def _cmd_bench(args) -> int:
+    """
+    Run latency/throughput workloads against a real or an emulated MASTER
+    and print the report as JSON (optionally also writing it to a file).
+    """
+    from . import bench
+    try:
+        if args.micro:
+            print(bench.dumps(bench.micro()))
+            return 0
+        if args.crc:
+            print(bench.dumps(bench.crc()))
+            return 0
+        slaves = [int(x, 0) for x in args.slaves]
+        report = bench.run(
+            port=args.port, workloads=args.workload or bench.WORKLOADS,
+            count=args.count, slaves=slaves, emulate=args.emulate,
+            baudrate=args.baud, arg_bytes=args.arg_bytes,
+        )
+    except Exception as e:
+        print(f"[ERROR] bench failed: {e}")
+        return 6
+
+    text = bench.dumps(report)
+    print(text)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    return 0
+
+
+def _cmd_dump(args) -> int:
+    """
+    Print a capture file recorded by Chaino.start_capture(), one line per frame.
+    """
+    from .capture import dump
+    try:
+        dump(args.file)
+    except (OSError, ValueError) as e:
+        print(f"[ERROR] Failed to read the capture: {e}")
+        return 7
+    return 0
+
+
 def main():
     parser = argparse.ArgumentParser(
         prog="chaino",
-        description="Chaino CLI utility (scan / change)"
+        description="Chaino CLI utility (scan / change / emulate / bench / dump)"
     )
     sub = parser.add_subparsers(dest="cmd", required=True)
 
     # scan
     p_scan = sub.add_parser("scan", help="scan Chaino MASTER (serial) devices")
+    p_scan.add_argument("--timeout", type=float, default=2.0, help="drop ports whose probe takes longer than this many seconds (not a time limit)")
+    p_scan.add_argument("--workers", type=int, default=8, help="ports probed at the same time")
     p_scan.set_defaults(func=_cmd_scan)
 
     # change <PORT> <NEW_ADDR>
@@ -73,6 +160,33 @@ def main():
     p_chg.add_argument("new_addr", help="new address (e.g., 0x41 or 65)")
     p_chg.set_defaults(func=_cmd_change)
 
+    # emulate [SLAVE_ADDR ...]
+    p_emu = sub.add_parser("emulate", help="serve an emulated Chaino MASTER on a pty")
+    p_emu.add_argument("slaves", nargs="*", help="I2C addresses of emulated slaves (e.g., 0x41)")
+    p_emu.add_argument("--baud", type=int, default=None, help="emulated baud rate (default: no delay)")
+    p_emu.set_defaults(func=_cmd_emulate)
+
+    # bench [PORT]
+    p_bench = sub.add_parser("bench", help="measure call latency and throughput")
+    p_bench.add_argument("port", nargs="?", default=None, help="serial port of the MASTER")
+    p_bench.add_argument("--emulate", action="store_true", help="benchmark an emulated device")
+    p_bench.add_argument("--micro", action="store_true", help="measure packet-building CPU cost only")
+    p_bench.add_argument("--crc", action="store_true", help="cross-check and time the CRC16 implementations")
+    p_bench.add_argument("-w", "--workload", action="append",
+                         choices=["small", "large", "read", "write", "fanout"],
+                         help="workload to run (repeatable, default: all)")
+    p_bench.add_argument("-n", "--count", type=int, default=1000, help="calls per workload")
+    p_bench.add_argument("--slaves", nargs="*", default=[], help="slave addresses for fanout")
+    p_bench.add_argument("--arg-bytes", type=int, default=64, help="argument size of 'large'")
+    p_bench.add_argument("--baud", type=int, default=None, help="emulated baud rate")
+    p_bench.add_argument("-o", "--out", default=None, help="also write the JSON report here")
+    p_bench.set_defaults(func=_cmd_bench)
+
+    # dump <CAPTURE_FILE>
+    p_dump = sub.add_parser("dump", help="print a wire capture file")
+    p_dump.add_argument("file", help="capture file written by Chaino.start_capture()")
+    p_dump.set_defaults(func=_cmd_dump)
+
     args = parser.parse_args()
     rc = args.func(args)
     sys.exit(rc)
@@ -0,0 +1,440 @@
+"""
+asyncio client for Chaino devices
+=================================
+
+This module provides :class:`AsyncChaino` and :class:`AsyncHana`, awaitable
+counterparts of :class:`~chaino.chaino.Chaino` and :class:`~chaino.hana.Hana`
+for CPython programs built around an asyncio event loop.
+
+The serial port is used in non-blocking mode. A reader task parses the frames
+as the bytes arrive and resolves the future of the matching call, so many
+coroutines (and many slave handles sharing one master) can have calls in
+flight at the same time without blocking the event loop. Calls are sent as
+sequence-tagged ('Q') frames, see :meth:`~chaino.chaino.Chaino.pipeline`.
+
+Usage:
+------
+.. code-block:: python
+
+    import asyncio
+    from chaino.aio import AsyncHana
+
+    async def main():
+        hana = await AsyncHana.open("COM9", 0x40)
+        print(await hana.who())
+        adcs = await asyncio.gather(*(hana.read_analog(26) for _ in range(10)))
+        print(adcs)
+        await hana.close()
+
+    asyncio.run(main())
+"""
+import asyncio
+import time
+
+import serial # pyserial을 pip install해야 한다
+
+from .chaino import (
+    _ChainoBase, _FrameDecoder, device_functions,
+    gen_seq_exec_func_packet, gen_seq_resend_packet, is_crc_matched,
+)
+from .hana import (
+    _HANA_FUNCTIONS, _HANA_DOCS, _adc_calls, _compile_melody, _compile_sequence,
+    _decode_adc_hex, _decode_pins, _levels_masks, _melody_ms, _note_freq, _pins_mask, _table_calls,
+)
+
+
+class _AsyncPort:
+    # 하나의 serial 포트를 여러 AsyncChaino 핸들(master/slave)이 공유한다.
+    # 요청은 순번(seq)을 달고 나가며, reader task가 응답의 순번으로 future를 찾아 완료시킨다.
+
+    _ports = {}
+    _POLL_INTERVAL = 0.001 # fileno()를 쓸 수 없는 플랫폼(Windows)에서의 polling 간격
+
+    def __init__(self, port: str, baudrate: int, timeout: float, depth: int):
+        # 순번은 256개이므로 기다리는 요청들의 순번이 겹치지 않도록 depth를 제한한다
+        # (에뮬레이터/펌웨어는 마지막 순번보다 128 이내로 앞선 순번을 새 요청으로 본다)
+        if not (1 <= depth <= 128):
+            raise ValueError("pipeline depth must be in the range of 1~128.")
+        self.port = port
+        self.timeout = timeout
+        self._serial = serial.Serial(port=port, baudrate=baudrate, timeout=0, write_timeout=timeout)
+        self._serial.reset_input_buffer()
+        self._serial.reset_output_buffer()
+        self._decoder = _FrameDecoder()
+        self._slots = asyncio.Semaphore(depth)
+        self._seq = 0
+        self._pending = {}  # seq -> [future, packet, try_count, 호출한 핸들(통계를 센다)]
+        self._order = []    # 송신 순서(오래된 것이 앞)
+        self._refs = 0
+        try:
+            self._fd = self._serial.fileno()
+        except Exception:
+            self._fd = None
+        self._tx_queue = asyncio.Queue() # 송신할 프레임들 (writer task가 executor에서 쓴다)
+        loop = asyncio.get_running_loop()
+        self._reader = loop.create_task(self._read_loop())
+        self._writer = loop.create_task(self._write_loop())
+
+
+    @classmethod
+    def get(cls, port: str, baudrate: int, timeout: float, depth: int):
+        obj = cls._ports.get(port)
+        if obj is None:
+            obj = cls._ports[port] = cls(port, baudrate, timeout, depth)
+        obj._refs += 1
+        return obj
+
+
+    async def release(self):
+        self._refs -= 1
+        if self._refs > 0: return
+        _AsyncPort._ports.pop(self.port, None)
+        for task in (self._reader, self._writer):
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        for entry in self._pending.values():
+            if not entry[0].done():
+                entry[0].set_exception(Exception(f'Serial port("{self.port}") closed.'))
+        self._serial.close()
+
+
+    def _write(self, packet: bytes):
+        self._tx_queue.put_nowait(packet + b'\x04') #끝에 EOT를 붙여서 전송
+
+
+    async def _write_loop(self):
+        # serial.write()는 blocking이므로 event loop 밖(executor)에서 쓴다.
+        # 기다리는 동안 쌓인 프레임들은 한 번에 쓴다.
+        loop = asyncio.get_running_loop()
+        while True:
+            data = await self._tx_queue.get()
+            while not self._tx_queue.empty():
+                data += self._tx_queue.get_nowait()
+            try:
+                await loop.run_in_executor(None, self._serial.write, data)
+            except serial.SerialException:
+                pass # 응답이 오지 않으므로 call()이 재전송하거나 실패로 처리한다
+
+
+    async def _wait_readable(self):
+        if self._fd is None:
+            while not self._serial.in_waiting:
+                await asyncio.sleep(_AsyncPort._POLL_INTERVAL)
+            return
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        loop.add_reader(self._fd, lambda: fut.done() or fut.set_result(None))
+        try:
+            await fut
+        finally:
+            loop.remove_reader(self._fd)
+
+
+    async def _read_loop(self):
+        while True:
+            await self._wait_readable()
+            data = self._serial.read(self._serial.in_waiting or 1)
+            for packet in self._decoder.feed(data):
+                self._dispatch(packet)
+
+
+    def _retry_oldest(self, packet_for) -> None:
+        if not self._order: return # 기다리는 요청이 없다면 버린다
+        seq = self._order[0]
+        entry = self._pending[seq]
+        entry[2] += 1
+        if entry[2] < _ChainoBase._MAX_RETRIES:
+            packet = packet_for(seq, entry)
+            entry[3]._cnt_retries += 1
+            entry[3]._cnt_bytes_tx += len(packet) + 1
+            self._write(packet)
+        elif not entry[0].done():
+            entry[0].set_exception(Exception(f"Max retries reached (seq:0x{seq:02x})"))
+
+
+    def _dispatch(self, packet: bytes):
+        # 디바이스는 도착 순서대로 처리하므로 순번이 없는 오류는 가장 오래된 요청의 것이다
+        if not is_crc_matched(packet):
+            if self._order: self._pending[self._order[0]][3]._cnt_rd_crc_err += 1
+            self._retry_oldest(lambda seq, entry: gen_seq_resend_packet(seq))
+        elif chr(packet[2]) == 'E':
+            if self._order: self._pending[self._order[0]][3]._cnt_wrt_crc_err += 1
+            self._retry_oldest(lambda seq, entry: entry[1])
+        elif chr(packet[2]) == 'Q':
+            entry = self._pending.get(int(packet[4:6], 16))
+            if entry is not None and not entry[0].done():
+                entry[3]._cnt_bytes_rx += len(packet) + 1
+                entry[0].set_result(packet[7:])
+
+
+    async def call(self, dev, func_num: int, args) -> bytes:
+        # dev(AsyncChaino)의 함수를 호출하고 그 핸들의 통계(stats())를 갱신한다
+        # 지연시간은 슬롯을 얻은 뒤부터 잰다 (Chaino._transact와 같다)
+        async with self._slots:
+            start = time.perf_counter()
+            seq = self._seq
+            while seq in self._pending: # 아직 응답을 기다리는 순번은 건너뛴다
+                seq = (seq + 1) & 0xFF
+            self._seq = (seq + 1) & 0xFF
+            packet = gen_seq_exec_func_packet(seq, dev._addr, func_num, *args)
+            fut = asyncio.get_running_loop().create_future()
+            entry = self._pending[seq] = [fut, packet, 0, dev]
+            self._order.append(seq)
+            try:
+                while True:
+                    self._write(packet)
+                    dev._cnt_bytes_tx += len(packet) + 1
+                    try:
+                        data_packet = await asyncio.wait_for(asyncio.shield(fut), self.timeout)
+                    except asyncio.TimeoutError:
+                        dev._cnt_timeouts += 1
+                        entry[2] += 1
+                        if entry[2] >= _ChainoBase._MAX_RETRIES:
+                            raise Exception("Max retries reached for serial read error.")
+                        dev._cnt_retries += 1
+                        continue
+                    dev._record_call(func_num, time.perf_counter() - start, data_packet[:1] != b'F')
+                    return data_packet
+            except BaseException:
+                dev._record_call(func_num, time.perf_counter() - start, False)
+                raise
+            finally:
+                del self._pending[seq]
+                self._order.remove(seq)
+
+
+
+class AsyncChaino(_ChainoBase):
+    """
+    The asyncio client class for communicating with a Chaino-enabled device from CPython.
+
+    Instances are created with the :meth:`open` coroutine. All the methods of
+    :class:`~chaino.chaino.Chaino` that talk to the device are coroutines here.
+    Handles for the master and for its I2C slaves opened on the same port share
+    one serial connection, and their calls can be in flight concurrently.
+    """
+
+    _BAUDRATE = 460800
+    _TIMEOUT = 0.1 # 응답을 기다리는 시간 (이후 재전송)
+    _async_calls = True
+
+
+    def __init__(self, port_obj: _AsyncPort, i2c_addr: int):
+        super().__init__(i2c_addr)
+        self._port_obj = port_obj
+        self._port = port_obj.port
+
+
+    @classmethod
+    async def open(cls, port: str, i2c_addr: int = 0, depth: int = 8):
+        """
+        Opens (or reuses) the serial port and verifies the Chaino device.
+
+        :param port: The name of the serial port (e.g., "COM9", "/dev/ttyACM0").
+        :type port: str
+        :param i2c_addr: The 7-bit I2C address of the target slave device.
+                         If 0 (default), commands are sent to the master device.
+        :type i2c_addr: int
+        :param depth: The maximum number of calls in flight on this port (1~128).
+                      Only used when the port is opened for the first time.
+        :type depth: int
+        :raises ValueError: If ``depth`` is out of range.
+        :raises Exception: If the device on the port is not a Chaino device.
+
+        .. code-block:: python
+
+            master = await AsyncChaino.open("COM9")
+            slave = await AsyncChaino.open("COM9", 0x42)
+        """
+        port_obj = _AsyncPort.get(port, cls._BAUDRATE, cls._TIMEOUT, depth)
+        self = cls(port_obj, i2c_addr)
+        try:
+            self._chaino_name = (await self.identity())["name"] # 한 번의 호출로 handshake
+        except Exception:
+            await port_obj.release()
+            raise Exception(f'Serial port("{port}") does not connected to Chaino device.')
+        return self
+
+
+    async def close(self):
+        """Releases this handle. The port is closed when its last handle is closed."""
+        if self._port_obj is not None:
+            await self._port_obj.release()
+            self._port_obj = None
+
+
+    async def __aenter__(self):
+        return self
+
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+        return False
+
+
+    async def exec_func(self, func_num: int, *args):
+        """
+        Executes a function by its ID on the target Chaino device.
+
+        Same as :meth:`chaino.chaino.Chaino.exec_func`, but awaitable.
+
+        :return: ``None``, a ``str`` or a ``list[str]``.
+        :raises Exception: If communication fails after retries or the remote
+                           function reports an error.
+        """
+        data_packet = await self._port_obj.call(self, func_num, args)
+        return self._parse_response(data_packet)
+
+
+    def bind(self, func_num: int):
+        """
+        Returns a callable for one remote function of this handle.
+
+        Calling the stub returns a coroutine equivalent to
+        ``exec_func(func_num, *args)``.
+
+        .. code-block:: python
+
+            read_adc = hana.bind(13)
+            value = int(await read_adc(26))
+        """
+        async def stub(*args):
+            return await self.exec_func(func_num, *args)
+        return stub
+
+
+    async def load_functions(self) -> list:
+        """
+        Reads the function table advertised by the device and adds its functions
+        to this handle as coroutines, see :meth:`chaino.chaino.Chaino.load_functions`.
+        """
+        return self._add_functions(await self.exec_func(208))
+
+
+    def batch(self):
+        """
+        Not supported by the asyncio client.
+
+        The calls are already pipelined: start them together, e.g. with
+        ``asyncio.gather()``.
+
+        :raises RuntimeError: Always.
+        """
+        raise RuntimeError("AsyncChaino does not support batch(); use asyncio.gather() instead.")
+
+
+    def set_binary_mode(self, enable: bool = True) -> bool:
+        """
+        Not supported by the asyncio client (its 'Q' frames are ASCII only).
+
+        :raises RuntimeError: If ``enable`` is ``True``.
+        """
+        if enable:
+            raise RuntimeError("AsyncChaino does not support the binary mode.")
+        return False
+
+
+    async def ping(self) -> float:
+        """
+        Measures the round-trip latency of a ``who`` call (function 201) and returns it in milliseconds.
+        """
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await self.exec_func(201)
+        return (loop.time() - start) * 1000
+
+
+    async def identity(self, refresh: bool = False) -> dict:
+        """
+        Gets the name, version, address and capabilities of the target device
+        in one call and caches them, see :meth:`chaino.chaino.Chaino.identity`.
+        """
+        if refresh or self._identity is None:
+            data_packet = await self._port_obj.call(self, 207, ())
+            if chr(data_packet[0]) == 'F': # 207번 함수가 없는 펌웨어
+                self._identity = {"name": await self.exec_func(201),
+                                  "version": await self.exec_func(202),
+                                  "addr": int(await self.exec_func(203)), "caps": []}
+            else:
+                self._identity = self._identity_from(self._parse_response(data_packet))
+        return self._identity
+
+
+    async def who(self) -> str:
+        """Gets the identification string of the target device."""
+        return (await self.identity())["name"]
+
+
+    async def get_version(self) -> str:
+        """Gets the firmware version string of the target device."""
+        return (await self.identity())["version"]
+
+
+    async def get_addr(self) -> int:
+        """Gets the currently configured I2C address of the target device."""
+        return (await self.identity())["addr"]
+
+
+    async def set_addr(self, new_addr: int):
+        """Changes the I2C address of the target device (a reset is required)."""
+        if self._addr != new_addr:
+            self._identity = None
+            return await self.exec_func(204, new_addr)
+        else:
+            return f"I2C address is already set to 0x{self._addr:02x}."
+
+
+    async def set_neopixel(self, r: int, g: int, b: int):
+        """Sets the color of the onboard NeoPixel LED on the target device."""
+        await self.exec_func(205, r, g, b)
+
+
+
+@device_functions(*_HANA_FUNCTIONS, docs=_HANA_DOCS) # Hana와 같은 함수 테이블로 coroutine 메소드들을 만든다
+class AsyncHana(AsyncChaino):
+    """
+    The asyncio counterpart of :class:`~chaino.hana.Hana`.
+
+    Every hardware control method of :class:`~chaino.hana.Hana` is available
+    with the same arguments and return value, as a coroutine.
+
+    .. code-block:: python
+
+        hana = await AsyncHana.open("COM9", 0x40)
+        await hana.set_high(13)
+        value = await hana.read_analog(26)
+    """
+
+    async def is_low(self, pin: int) -> bool:
+        return not await self.is_high(pin)
+
+    async def read_pins(self, pins) -> dict:
+        pins = list(pins)
+        return _decode_pins(await self.exec_func(18, _pins_mask(pins)), pins)
+
+    async def write_pins(self, levels: dict):
+        await self.exec_func(19, *_levels_masks(levels))
+
+    async def read_analogs(self, pins, samples: int = 1, as_array: bool = True):
+        pins = list(pins)
+        chunks = [await self.exec_func(20, n, *pins) for n in _adc_calls(pins, samples)]
+        return _decode_adc_hex(chunks, len(pins), as_array)
+
+    async def start_tone(self, pin: int, freq, duration: int = 0):
+        await self.exec_func(41, pin, _note_freq(freq), duration)
+
+    async def play_melody(self, pin: int, notes, tempo: int = 120, loops: int = 1) -> int:
+        chunks = _compile_melody(notes, tempo)
+        for index, chunk in _table_calls(chunks, 8)[0]:
+            await self.exec_func(43, index, chunk)
+        await self.exec_func(44, pin, loops)
+        return _melody_ms(chunks)
+
+    async def upload_sequence(self, steps) -> int:
+        calls, count = _table_calls(_compile_sequence(steps), 20)
+        for index, chunk in calls:
+            await self.exec_func(61, index, chunk)
+        return count
@@ -0,0 +1,339 @@
+"""
+Latency benchmark for Chaino links
+==================================
+
+This module runs configurable call workloads against a real Chaino master or
+an emulated one (:mod:`chaino.emulator`) and reports the latency
+distribution and the throughput as JSON, so the numbers can be compared
+between releases, baud rates and firmware versions.
+
+Workloads:
+
+- ``small``  : ``is_high()`` style calls with one short argument (func 12)
+- ``large``  : calls carrying ``arg_bytes`` bytes of argument (func 0, ignored by the firmware)
+- ``read``   : ``read_analog()`` calls (func 13)
+- ``write``  : ``write_analog()`` calls (func 21)
+- ``fanout`` : ``read_analog()`` round-robin over the master and all given slaves
+
+:func:`micro` measures the host CPU cost of building a request packet, with
+and without a precompiled call stub (:meth:`~chaino.chaino.Chaino.bind`),
+without any device. :func:`crc` cross-checks the CRC16 implementations
+against the bit-by-bit reference and times them; it also runs on MicroPython.
+:func:`alloc` counts the heap bytes allocated per call by the MicroPython
+I2C client against a loopback bus (MicroPython only, including the unix port).
+
+Usage:
+------
+.. code-block:: bash
+
+    py -m chaino bench COM9 --slaves 0x41 0x42 -n 2000
+    py -m chaino bench --emulate --baud 460800 -w read -w write
+    py -m chaino bench --micro
+    py -m chaino bench --crc
+
+.. code-block:: python
+
+    from chaino import bench
+    report = bench.run(emulate=True, workloads=["small", "read"], count=500)
+
+    # MicroPython
+    print(bench.dumps(bench.alloc()))
+"""
+import json
+import time
+
+# micropython에는 perf_counter_ns가 없다
+_clock_ns = getattr(time, "perf_counter_ns", None) or (lambda: time.ticks_us() * 1000)
+
+
+WORKLOADS = ("small", "large", "read", "write", "fanout")
+
+
+def _percentile(sorted_vals: list, q: float):
+    # nearest-rank 방식의 백분위수
+    if not sorted_vals: return 0
+    rank = int(-(-q * len(sorted_vals) // 100)) # ceil
+    return sorted_vals[max(0, min(len(sorted_vals), rank) - 1)]
+
+
+def summarize(name: str, latencies_ns: list, elapsed_ns: int, n_bytes: int, errors: int = 0) -> dict:
+    """
+    Builds the report dict of one workload from per-call latencies in nanoseconds.
+
+    :return: A dict with ``calls``, ``errors``, ``calls_per_s``, ``bytes_per_s``
+             and ``latency_us`` (``min``, ``mean``, ``p50``, ``p90``, ``p99``, ``max``).
+    :rtype: dict
+    """
+    lat = sorted(latencies_ns)
+    sec = elapsed_ns / 1e9 if elapsed_ns else 0.0
+    us = lambda ns: round(ns / 1000, 1)
+    return {
+        "workload": name,
+        "calls": len(lat),
+        "errors": errors,
+        "elapsed_s": round(sec, 6),
+        "calls_per_s": round(len(lat) / sec, 1) if sec else 0.0,
+        "bytes_per_s": round(n_bytes / sec, 1) if sec else 0.0,
+        "latency_us": {
+            "min": us(lat[0]) if lat else 0.0,
+            "mean": us(sum(lat) / len(lat)) if lat else 0.0,
+            "p50": us(_percentile(lat, 50)),
+            "p90": us(_percentile(lat, 90)),
+            "p99": us(_percentile(lat, 99)),
+            "max": us(lat[-1]) if lat else 0.0,
+        },
+    }
+
+
+def _plan(workload: str, handles: list, arg_bytes: int):
+    # i번째 호출에 사용할 (핸들, 함수번호, 인수들)을 돌려주는 함수를 만든다
+    master = handles[0]
+    if workload == "small":
+        return lambda i: (master, 12, (2,))
+    if workload == "large":
+        arg = "x" * arg_bytes
+        return lambda i: (master, 0, (arg,))
+    if workload == "read":
+        return lambda i: (master, 13, (26,))
+    if workload == "write":
+        return lambda i: (master, 21, (9, i & 0xFF))
+    if workload == "fanout":
+        n = len(handles)
+        return lambda i: (handles[i % n], 13, (26,))
+    raise ValueError(f"Unknown workload: {workload}.")
+
+
+def run_workload(handles: list, workload: str, count: int = 1000, arg_bytes: int = 64) -> dict:
+    """
+    Runs ``count`` calls of one workload and returns its summary.
+
+    :param handles: The opened handles; ``handles[0]`` is used by every workload
+                    except ``fanout``, which cycles through all of them.
+    :type handles: list
+    :param workload: One of :data:`WORKLOADS`.
+    :type workload: str
+    :param count: The number of calls.
+    :type count: int
+    :param arg_bytes: The argument size of the ``large`` workload.
+    :type arg_bytes: int
+    :rtype: dict
+    """
+    plan = _plan(workload, handles, arg_bytes)
+    bytes_before = sum(h._cnt_bytes_tx + h._cnt_bytes_rx for h in handles)
+    latencies, errors = [], 0
+    clock = time.perf_counter_ns
+    start = clock()
+    for i in range(count):
+        dev, func_num, args = plan(i)
+        t0 = clock()
+        try:
+            dev.exec_func(func_num, *args)
+        except Exception:
+            errors += 1
+            continue
+        latencies.append(clock() - t0)
+    elapsed = clock() - start
+    n_bytes = sum(h._cnt_bytes_tx + h._cnt_bytes_rx for h in handles) - bytes_before
+    return summarize(workload, latencies, elapsed, n_bytes, errors)
+
+
+def run(port: str = None, workloads=WORKLOADS, count: int = 1000, slaves=(),
+        emulate: bool = False, baudrate: int = None, arg_bytes: int = 64) -> dict:
+    """
+    Opens the device(s) and runs the selected workloads.
+
+    :param port: The serial port of the Chaino master. Not needed with ``emulate``.
+    :type port: str | None
+    :param workloads: The names of the workloads to run, in order.
+    :param count: The number of calls per workload.
+    :type count: int
+    :param slaves: The I2C addresses of the slaves used by ``fanout``.
+    :param emulate: If ``True``, a :class:`~chaino.emulator.ChainoEmulator`
+                    (with slaves 0x41 and 0x42 unless ``slaves`` is given)
+                    is started and measured instead of real hardware.
+    :type emulate: bool
+    :param baudrate: The baud rate emulated by the emulator.
+    :type baudrate: int | None
+    :param arg_bytes: The argument size of the ``large`` workload.
+    :type arg_bytes: int
+    :return: A dict with the run parameters and a ``results`` list with one
+             :func:`summarize` dict per workload.
+    :rtype: dict
+    """
+    from .chaino import Chaino
+
+    emu = None
+    if emulate:
+        from .emulator import ChainoEmulator
+        slaves = list(slaves) or [0x41, 0x42]
+        emu = ChainoEmulator(slaves=slaves, baudrate=baudrate)
+        port = emu.start()
+    elif port is None:
+        raise ValueError("port is required unless emulate is True.")
+
+    handles = []
+    try:
+        handles.append(Chaino(port))
+        handles += [Chaino(port, addr) for addr in slaves]
+        results = [run_workload(handles, w, count, arg_bytes) for w in workloads]
+    finally:
+        for h in reversed(handles): h.close() # 같은 프로세스에서 포트를 다시 열 수 있도록 닫는다
+        if emu is not None: emu.stop()
+
+    return {
+        "port": port,
+        "emulated": emulate,
+        "baudrate": baudrate if emulate else 460800,
+        "count": count,
+        "slaves": [f"0x{a:02x}" for a in slaves],
+        "results": results,
+    }
+
+
+def _ns_per_call(func, count: int) -> float:
+    clock = _clock_ns
+    start = clock()
+    for _ in range(count): func()
+    return (clock() - start) / count
+
+
+def micro(count: int = 100000, func_num: int = 13, args=(26,)) -> dict:
+    """
+    Measures the per-call CPU cost of building a request packet.
+
+    ``exec_func`` formats the header, address and function id and CRCs the
+    whole payload on every call; a stub from ``bind()`` only encodes and CRCs
+    the arguments. Both are timed in ASCII and in binary mode.
+
+    :param count: The number of packets built per measurement.
+    :type count: int
+    :return: A dict with ``ns_per_call`` for each variant and the speed-up.
+    :rtype: dict
+    """
+    from .chaino import _ChainoBase
+
+    dev = _ChainoBase(0x40) # 통신 없이 패킷 생성만 측정한다
+    report = {"count": count, "func_num": func_num, "args": list(args), "ns_per_call": {}}
+    for mode in ("ascii", "binary"):
+        dev._binary = (mode == "binary")
+        stub = dev.bind(func_num)
+        before = _ns_per_call(lambda: dev._gen_exec_packet(func_num, *args), count)
+        after = _ns_per_call(lambda: stub.packet(*args), count)
+        report["ns_per_call"][mode] = {
+            "exec_func": round(before, 1), "stub": round(after, 1),
+            "speedup": round(before / after, 2) if after else 0.0,
+        }
+    return report
+
+
+def crc(count: int = 200, size: int = 64) -> dict:
+    """
+    Cross-checks and times the CRC16-XMODEM implementations.
+
+    The active ``crc_hqx`` (``binascii`` on CPython; viper, native or table on
+    MicroPython) and the 256-entry table version are compared with the
+    bit-by-bit reference on the standard check string and on ``count``
+    pseudo-random buffers of lengths 0~``size`` with varying initial values.
+
+    :return: A dict with ``impl``, ``ok`` and ``us_per_kb`` for each implementation.
+    :rtype: dict
+    :raises AssertionError: If any implementation disagrees with the reference.
+    """
+    from .chaino import crc_hqx, _crc_hqx_bitwise, _crc_hqx_table, CRC_IMPL
+
+    impls = {"active": crc_hqx, "table": _crc_hqx_table, "bitwise": _crc_hqx_bitwise}
+    for name, func in impls.items():
+        assert func(b"123456789", 0) == 0x31C3, f"{name}: wrong check value"
+    seed = 12345
+    for i in range(count): # 재현 가능한 의사난수 데이터 (micropython에는 random.seed가 없을 수 있다)
+        data = bytearray()
+        for _ in range(i % (size + 1)):
+            seed = (seed * 1103515245 + 12345) & 0x7FFFFFFF
+            data.append(seed >> 16 & 0xFF)
+        ref = _crc_hqx_bitwise(data, i * 257 & 0xFFFF)
+        for name, func in impls.items():
+            assert func(data, i * 257 & 0xFFFF) == ref, f"{name}: mismatch at buffer {i}"
+
+    block = bytes(range(256)) * 4 # 1 KiB
+    return {
+        "impl": CRC_IMPL,
+        "ok": True,
+        "us_per_kb": {name: round(_ns_per_call(lambda: func(block, 0), 20) / 1000, 1)
+                      for name, func in impls.items()},
+    }
+
+
+class _LoopbackI2C:
+    # 어떤 요청에도 같은 응답을 돌려주는 가짜 I2C 버스 (자신도 메모리를 할당하지 않는다)
+    # single=True이면 single read 모드의 슬레이브처럼 header와 응답을 한 번에 보낸다
+
+    def __init__(self, payload: bytes, single: bool = False):
+        from .chaino import crc_hqx
+        self._resp = crc_hqx(payload, 0).to_bytes(2, 'big') + payload
+        n, head = len(self._resp), self._resp[2]
+        self._hdr = bytes((head, n, (~(head + n)) & 0xFF))
+        self._frame = self._hdr + self._resp
+        self._single = single
+
+    def writeto(self, addr, buf):
+        return len(buf)
+
+    def readfrom_into(self, addr, buf):
+        src = self._frame if self._single else self._hdr if len(buf) == 3 else self._resp
+        for i in range(len(buf)):
+            buf[i] = src[i] if i < len(src) else 0xFF # 보낼 것이 없으면 버스는 0xFF를 읽는다
+
+
+def alloc(count: int = 1000) -> dict:
+    """
+    Measures the heap bytes allocated per call by the MicroPython I2C client.
+
+    ``exec_func`` (generic), ``exec_func_int`` (preallocated buffers) and a
+    method generated by :func:`~chaino.chaino.device_functions` call
+    ``read_analog(26)`` on a loopback bus that always answers ``512``, with
+    the garbage collector disabled; ``exec_func_int`` is also measured in
+    the single read mode (see ``Chaino.set_single_read``). MicroPython only
+    (``gc.mem_alloc``).
+
+    :return: A dict with ``bytes_per_call`` and ``us_per_call`` for each variant.
+    :rtype: dict
+    :raises RuntimeError: If not running on MicroPython.
+    """
+    import gc
+    if not hasattr(gc, "mem_alloc"):
+        raise RuntimeError("alloc() runs on MicroPython only.")
+    from .chaino import Chaino, device_functions
+
+    @device_functions("13 read_analog(pin:int) -> int")
+    class _Dev(Chaino):
+        pass
+
+    dev = _Dev(0x42, _LoopbackI2C(b"S\x1e512"))
+    single = _Dev(0x42, _LoopbackI2C(b"S\x1e512", single=True))
+    single._single_read = True # loopback 버스는 209번 함수로 협상할 수 없다
+    variants = (
+        ("exec_func", lambda: dev.exec_func(13, 26)),
+        ("exec_func_int", lambda: dev.exec_func_int(13, 26)),
+        ("method", lambda: dev.read_analog(26)),
+        ("exec_func_int_single_read", lambda: single.exec_func_int(13, 26)),
+    )
+    report = {"count": count, "bytes_per_call": {}, "us_per_call": {}}
+    for name, func in variants:
+        assert int(func()) == 512, f"{name}: wrong result"  # 길이별 memoryview도 여기서 만들어진다
+        gc.collect()
+        gc.disable()
+        before = gc.mem_alloc()
+        ns = _ns_per_call(func, count)
+        used = gc.mem_alloc() - before
+        gc.enable()
+        report["bytes_per_call"][name] = round(used / count, 1)
+        report["us_per_call"][name] = round(ns / 1000, 1)
+    return report
+
+
+def dumps(report: dict) -> str:
+    """Formats a report returned by :func:`run` as indented JSON."""
+    try:
+        return json.dumps(report, indent=2)
+    except TypeError: # micropython의 json은 indent를 지원하지 않는다
+        return json.dumps(report)
@@ -0,0 +1,188 @@
+"""
+Wire-level capture and replay of Chaino serial links
+====================================================
+
+This module records the frames exchanged on a serial link to a compact
+binary file, prints a capture in a readable form, and replays a capture
+on a pseudo-terminal so that a problem seen in the field can be reproduced
+(and the client-side parsing measured) without the hardware.
+
+A capture is started per port with :meth:`Chaino.start_capture
+<chaino.chaino.Chaino.start_capture>`: every frame written by the host and
+every frame (or read timeout) seen by the host is stored with a monotonic
+timestamp. When no capture is running the cost is one attribute check per
+frame.
+
+File format (big endian)::
+
+    header : b"CHNOCAP" version:1B  started:double(epoch s)  port_len:2B  port(utf-8)
+    record : direction:1B  delta_us:4B  frame_len:2B  frame
+
+``direction`` is ``b'>'`` (host to device), ``b'<'`` (device to host) or
+``b'!'`` (read timeout; the frame holds the bytes of an incomplete frame,
+if any). ``delta_us`` is the time since the previous record and ``frame``
+is the packet (crc16 and payload) without the trailing {EOT}.
+
+The replayer (:class:`chaino.emulator.CaptureReplayer`) requires a POSIX
+system (Linux, macOS), like the emulator. Recording and printing work on
+any system.
+
+Usage:
+------
+.. code-block:: python
+
+    from chaino import Hana
+    from chaino.capture import read_capture, dump
+    from chaino.emulator import CaptureReplayer
+
+    hana = Hana("COM9")
+    hana.start_capture("link.cap")
+    ...
+    hana.stop_capture()
+
+    dump("link.cap")                       # or: py -m chaino dump link.cap
+
+    with CaptureReplayer(read_capture("link.cap")) as rep:
+        hana = Hana(rep.port)              # answered from the capture
+"""
+import struct
+import sys
+import threading
+import time
+from collections import namedtuple
+
+from .chaino import str_packet
+
+
+_MAGIC = b"CHNOCAP"
+_VERSION = 1
+_HEADER = struct.Struct(">dH")  # started, port_len
+_RECORD = struct.Struct(">cIH") # direction, delta_us, frame_len
+
+TX, RX, TIMEOUT = b'>', b'<', b'!'
+
+
+CaptureRecord = namedtuple("CaptureRecord", "time direction frame")
+CaptureRecord.__doc__ = "A frame of a capture; ``time`` is in seconds from the start of the capture."
+
+Capture = namedtuple("Capture", "port started records")
+Capture.__doc__ = "A capture read by :func:`read_capture`; ``started`` is the wall-clock start time (epoch seconds)."
+
+
+class WireCapture:
+    """
+    The writer of a capture file.
+
+    Normally created by :meth:`Chaino.start_capture <chaino.chaino.Chaino.start_capture>`;
+    :meth:`record` may be called from several threads.
+
+    :param path: The capture file (overwritten).
+    :type path: str
+    :param port: The name of the captured port, stored in the header.
+    :type port: str
+    """
+
+    def __init__(self, path: str, port: str = ""):
+        self.path = path
+        self.count = 0
+        self._lock = threading.Lock()
+        self._file = open(path, "wb")
+        name = port.encode("utf-8")
+        self._file.write(_MAGIC + bytes((_VERSION,)) + _HEADER.pack(time.time(), len(name)) + name)
+        self._last = time.perf_counter_ns()
+
+
+    def record(self, direction: bytes, frame: bytes):
+        """Appends a frame (``TX``, ``RX`` or ``TIMEOUT``) with the current time."""
+        with self._lock:
+            if self._file is None: return # 이미 닫혔다
+            now = time.perf_counter_ns()
+            delta = min((now - self._last) // 1000, 0xFFFFFFFF)
+            self._last = now
+            self._file.write(_RECORD.pack(direction, delta, len(frame)) + frame)
+            self.count += 1
+
+
+    def close(self):
+        """Flushes and closes the file."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+
+def read_capture(path: str) -> Capture:
+    """
+    Reads a capture file.
+
+    :param path: The capture file.
+    :type path: str
+    :return: The port name, the start time and the list of :class:`CaptureRecord`.
+    :rtype: Capture
+    :raises ValueError: If the file is not a capture or is truncated.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    if data[:len(_MAGIC)] != _MAGIC or data[len(_MAGIC)] != _VERSION:
+        raise ValueError(f"Not a Chaino capture file: {path}")
+    i = len(_MAGIC) + 1
+    started, port_len = _HEADER.unpack_from(data, i)
+    i += _HEADER.size
+    port = data[i:i + port_len].decode("utf-8")
+    i += port_len
+
+    records, t_us = [], 0
+    while i < len(data):
+        if i + _RECORD.size > len(data):
+            raise ValueError(f"Truncated capture file: {path}")
+        direction, delta, n = _RECORD.unpack_from(data, i)
+        i += _RECORD.size
+        if i + n > len(data):
+            raise ValueError(f"Truncated capture file: {path}")
+        t_us += delta
+        records.append(CaptureRecord(t_us / 1e6, direction, data[i:i + n]))
+        i += n
+    return Capture(port, started, records)
+
+
+def format_record(rec: CaptureRecord) -> str:
+    """Returns one line describing a record, e.g. ``12.345678 > <[0x1f2e]R{RS}40{RS}d{RS}1a>:12 bytes``."""
+    if rec.direction == TIMEOUT:
+        what = "timeout" + (f" (incomplete: {rec.frame!r})" if rec.frame else "")
+    else:
+        what = str_packet(rec.frame)
+    return f"{rec.time:12.6f} {rec.direction.decode()} {what}"
+
+
+def dump(path: str, file=None):
+    """
+    Prints a capture file, one line per frame (see :func:`format_record`).
+
+    :param path: The capture file.
+    :type path: str
+    :param file: The output stream. If ``None`` (default), ``sys.stdout``.
+    """
+    cap = read_capture(path)
+    out = file or sys.stdout
+    started = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(cap.started))
+    print(f"# port: {cap.port}  started: {started}  frames: {len(cap.records)}", file=out)
+    for rec in cap.records:
+        print(format_record(rec), file=out)
+
+
+def __getattr__(name):
+    # chaino.capture.CaptureReplayer: 예전 위치. emulator는 POSIX 전용이므로 쓸 때만 import한다
+    if name == "CaptureReplayer":
+        from .emulator import CaptureReplayer
+        return CaptureReplayer
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -42,13 +42,16 @@ MicroPython (I2C) Usage:
 
 import sys
 import time # micropython에도 time모듈이 있다.
+import struct # micropython에서는 ustruct의 별칭
+from array import array
 
 IS_CPYTHON = (sys.implementation.name == "cpython")
 
 # 구분자들
 RS = "\x1e"  #코드 주석에서 {RS}로 표시
 EOT = "\x04" #코드 주석에서 {EOT}로 표시
-bRS, bEOT = b'\x1e', b'\x04'
+GS = "\x1d"  #코드 주석에서 {GS}로 표시 (batch 패킷에서 함수호출들을 구분)
+bRS, bEOT, bGS = b'\x1e', b'\x04', b'\x1d'
 
 PACKET_RQ_RESEND = (0x1861).to_bytes(2, 'big') + b'E'
 
@@ -56,22 +59,101 @@ PACKET_RQ_RESEND = (0x1861).to_bytes(2, 'big') + b'E'
 #######################################################################
 # python 종류별로 crc_hqx 함수를 정의한다.
 #######################################################################
+
+# 비트 단위 구현 (기준 구현: 테이블/viper 구현의 교차검증에 사용)
+def _crc_hqx_bitwise(data: bytes, value: int = 0) -> int:
+    crc = value & 0xFFFF
+    for b in data:
+        crc ^= (b & 0xFF) << 8
+        for _ in range(8):
+            if crc & 0x8000:
+                crc = ((crc << 1) ^ 0x1021) & 0xFFFF
+            else:
+                crc = (crc << 1) & 0xFFFF
+    return crc
+
+
+# 상위 바이트 값(0~255)별로 8비트 처리 결과를 미리 계산한 256개 테이블
+_CRC_TABLE = array('H', [_crc_hqx_bitwise(bytes((i,))) for i in range(256)])
+
+
+# 테이블 구현: 바이트당 한 번의 테이블 참조
+def _crc_hqx_table(data: bytes, value: int = 0) -> int:
+    crc, table = value & 0xFFFF, _CRC_TABLE
+    for b in data:
+        crc = ((crc << 8) & 0xFF00) ^ table[(crc >> 8) ^ b]
+    return crc
+
+
+# 버퍼의 일부(data[start:end])에 대한 crc. 슬라이스(메모리 할당) 없이 계산한다
+def _crc_hqx_table_range(data, start: int, end: int, value: int = 0) -> int:
+    crc, table = value & 0xFFFF, _CRC_TABLE
+    for i in range(start, end):
+        crc = ((crc << 8) & 0xFF00) ^ table[(crc >> 8) ^ data[i]]
+    return crc
+
+
+# viper/native 코드 생성기를 지원하지 않는 포트에서는 데코레이터 때문에 모듈 전체의
+# 컴파일이 실패하므로 문자열로 두었다가 exec()로 컴파일해 본다.
+_CRC_VIPER_SRC = """
+@micropython.viper
+def _crc_viper(data, i: int, n: int, value: int) -> int:
+    p = ptr8(data)
+    t = ptr16(_CRC_TABLE)
+    crc = value
+    while i < n:
+        crc = ((crc << 8) & 0xFF00) ^ t[((crc >> 8) ^ p[i]) & 0xFF]
+        i += 1
+    return crc
+
+def crc_hqx(data, value=0):
+    return _crc_viper(data, 0, len(data), value & 0xFFFF)
+
+def crc_hqx_range(data, start, end, value=0):
+    return _crc_viper(data, start, end, value & 0xFFFF)
+"""
+
+_CRC_NATIVE_SRC = """
+@micropython.native
+def crc_hqx(data, value=0):
+    crc, table = value & 0xFFFF, _CRC_TABLE
+    for b in data:
+        crc = ((crc << 8) & 0xFF00) ^ table[(crc >> 8) ^ b]
+    return crc
+
+@micropython.native
+def crc_hqx_range(data, start, end, value=0):
+    crc, table = value & 0xFFFF, _CRC_TABLE
+    for i in range(start, end):
+        crc = ((crc << 8) & 0xFF00) ^ table[(crc >> 8) ^ data[i]]
+    return crc
+"""
+
 if IS_CPYTHON:
     
     from binascii import crc_hqx # CPython 에서만 존재
+    CRC_IMPL = "binascii"
+
+    def crc_hqx_range(data, start: int, end: int, value: int = 0) -> int:
+        return crc_hqx(memoryview(data)[start:end], value)
     
 else: # Micropython에서는 binascii라이브러리에 crc_hqx가 없으므로 직접 구현
-    
-    def crc_hqx(data: bytes, value: int = 0) -> int:
-        crc = value & 0xFFFF
-        for b in data:
-            crc ^= (b & 0xFF) << 8
-            for _ in range(8):
-                if crc & 0x8000:
-                    crc = ((crc << 1) ^ 0x1021) & 0xFFFF
-                else:
-                    crc = (crc << 1) & 0xFFFF
-        return crc
+    # import 시점에 viper -> native -> 순수 파이썬 테이블 순서로 사용 가능한 구현을 고른다
+    crc_hqx, crc_hqx_range, CRC_IMPL = _crc_hqx_table, _crc_hqx_table_range, "table"
+    try:
+        import micropython
+        for _impl, _src in (("viper", _CRC_VIPER_SRC), ("native", _CRC_NATIVE_SRC)):
+            try:
+                _ns = {"micropython": micropython, "_CRC_TABLE": _CRC_TABLE}
+                exec(_src, _ns)
+                if (_ns["crc_hqx"](b"123456789") == 0x31C3 and # CRC-16/XMODEM check value
+                        _ns["crc_hqx_range"](b"x123456789", 1, 10) == 0x31C3):
+                    crc_hqx, crc_hqx_range, CRC_IMPL = _ns["crc_hqx"], _ns["crc_hqx_range"], _impl
+                    break
+            except Exception:
+                pass
+    except ImportError:
+        pass
 ########################################################################
 # 공통 유틸리티 함수들
 ########################################################################
@@ -135,12 +217,188 @@ def gen_exec_func_packet(i2c_addr: int, func_num: int, *args) -> bytes:
     return packet
 
 
+"""
+파이프라인(pipelined) 모드용 순번(sequence)이 붙은 함수실행 요구 패킷
+패킷 구조 : [crc:2byte]'Q'{RS}SQ{RS}AD{RS}FN [ {RS}arg1 ... {RS}argn ] {EOT}
+    SQ (seq) : 두 자리(고정) 16진수 (0x00~0xff 순환)
+응답 패킷 : [crc:2byte]'Q'{RS}SQ{RS}'S'{RS}ret... 또는 'Q'{RS}SQ{RS}'F'{RS}err_msg
+    수신측에서 CRC 오류가 나면 SQ를 신뢰할 수 없으므로 순번 없이 'E'만 응답한다.
+"""
+def gen_seq_exec_func_packet(seq: int, i2c_addr: int, func_num: int, *args) -> bytes:
+    """
+    :exclude-from-docs:
+    """
+    parts = ["Q", f"{seq:02x}", f"{i2c_addr:02x}", f"{func_num:x}"]
+    parts.extend(map_args(x) for x in args)
+    payload = RS.join(parts).encode('ascii')
+    return gen_CRC16_XMODEM(payload) + payload
+
+
+"""
+순번 SQ의 응답을 다시 보내달라는 요청 패킷 (PACKET_RQ_RESEND의 순번 버전)
+패킷 구조 : [crc:2byte]'e'{RS}SQ {EOT}
+"""
+def gen_seq_resend_packet(seq: int) -> bytes:
+    """
+    :exclude-from-docs:
+    """
+    payload = f"e{RS}{seq:02x}".encode('ascii')
+    return gen_CRC16_XMODEM(payload) + payload
+
+
+"""
+여러 함수실행을 하나의 패킷으로 묶은 batch 요구 패킷. 각 호출은 {GS}로 구분한다.
+패킷 구조 : [crc:2byte]'B'{RS}AD {GS}FN[{RS}args..] {GS}FN[{RS}args..] ... {EOT}
+    (micropython에서 호출한 경우 {RS}AD가 없다)
+응답 패킷 : [crc:2byte]'B' {GS}'S'{RS}ret.. {GS}'F'{RS}err_msg ... (호출 순서대로)
+"""
+def gen_batch_packet(i2c_addr: int, calls) -> bytes:
+    """
+    :exclude-from-docs:
+    """
+    head = "B" if i2c_addr == -1 else f"B{RS}{i2c_addr:02x}"
+    parts = [head]
+    for func_num, args in calls:
+        sub = [f"{func_num:x}"]
+        sub.extend(map_args(x) for x in args)
+        parts.append(RS.join(sub))
+    payload = GS.join(parts).encode('ascii')
+    return gen_CRC16_XMODEM(payload) + payload
+
+
+########################################################################
+# 바이너리(typed) 인코딩 모드
+########################################################################
+"""
+협상(negotiation)된 핸들은 인수/반환값을 ASCII 문자열 대신 타입 태그가 붙은 바이너리로 주고받는다.
+요구 패킷 : [crc:2byte]'T' AD(1byte) FN(1byte) [val1 val2 ... valn] {EOT}
+    (micropython에서 호출한 경우 AD가 없다)
+응답 패킷 : [crc:2byte]'T' [val1 val2 ... valn]  (실패는 기존과 같이 'F'{RS}err_msg)
+각 값(val)은 태그 1byte + 데이터 (정수/실수는 big-endian)
+    'n':None  't':True  'f':False
+    'b':int8  'h':int16  'i':int32  'q':int64  'r':float32
+    's':bytes(len 1byte + data)  'u':str(len 1byte + utf-8)
+바이너리 데이터에 {EOT}가 나올 수 있으므로 'T' 이후의 0x04, 0x1b는 0x1b, (byte^0x20)으로
+치환(byte stuffing)해서 보내며, crc는 치환된(전송되는) 바이트열에 대해 계산한다.
+"""
+_ESC = 0x1b
+
+_INT_TAGS = ((b'b', '>b', -0x80, 0x7f), (b'h', '>h', -0x8000, 0x7fff),
+             (b'i', '>i', -0x80000000, 0x7fffffff))
+
+
+def _stuff(data: bytes) -> bytes:
+    if b'\x04' not in data and b'\x1b' not in data: return data
+    out = bytearray()
+    for b in data:
+        if b == 0x04 or b == _ESC: out.append(_ESC); out.append(b ^ 0x20)
+        else: out.append(b)
+    return bytes(out)
+
+
+def _unstuff(data: bytes) -> bytes:
+    if b'\x1b' not in data: return data
+    out, esc = bytearray(), False
+    for b in data:
+        if esc: out.append(b ^ 0x20); esc = False
+        elif b == _ESC: esc = True
+        else: out.append(b)
+    return bytes(out)
+
+
+def encode_typed(x) -> bytes:
+    """
+    :exclude-from-docs:
+    """
+    if x is None: return b'n'
+    if x is True: return b't'
+    if x is False: return b'f'
+    if isinstance(x, int):
+        for tag, fmt, lo, hi in _INT_TAGS: # 가장 작은 크기를 사용
+            if lo <= x <= hi: return tag + struct.pack(fmt, x)
+        return b'q' + struct.pack('>q', x)
+    if isinstance(x, float): return b'r' + struct.pack('>f', x)
+    if isinstance(x, str): x, tag = x.encode(), b'u'
+    elif isinstance(x, (bytes, bytearray)): tag = b's'
+    else: raise TypeError(f"Cannot encode {type(x)} in binary mode.")
+    if len(x) > 255: raise ValueError("bytes/str argument is too long (max 255) in binary mode.")
+    return tag + bytes((len(x),)) + bytes(x)
+
+
+_FIXED = {ord('b'): ('>b', 1), ord('h'): ('>h', 2), ord('i'): ('>i', 4),
+          ord('q'): ('>q', 8), ord('r'): ('>f', 4)}
+_CONST = {ord('n'): None, ord('t'): True, ord('f'): False}
+
+
+def decode_typed(data: bytes) -> list:
+    """
+    :exclude-from-docs:
+    """
+    vals, i, n = [], 0, len(data)
+    while i < n:
+        tag = data[i]; i += 1
+        if tag in _FIXED:
+            fmt, size = _FIXED[tag]
+            vals.append(struct.unpack(fmt, data[i:i + size])[0]); i += size
+        elif tag in _CONST:
+            vals.append(_CONST[tag])
+        elif tag == 0x73 or tag == 0x75: # 's', 'u'
+            size = data[i]; raw = bytes(data[i + 1:i + 1 + size]); i += 1 + size
+            vals.append(raw.decode() if tag == 0x75 else raw)
+        else:
+            raise Exception(f"Unknown binary type tag: 0x{tag:02x}")
+    return vals
+
+
+def gen_typed_exec_func_packet(i2c_addr: int, func_num: int, *args) -> bytes:
+    """
+    :exclude-from-docs:
+    """
+    head = bytes((func_num,)) if i2c_addr == -1 else bytes((i2c_addr, func_num))
+    payload = b'T' + _stuff(head + b''.join(encode_typed(x) for x in args))
+    return gen_CRC16_XMODEM(payload) + payload
+
+
+class _FrameDecoder:
+    # 수신된 바이트열을 조각조각 넣어주면(feed) 완성된 패킷들을 돌려준다.
+    # 패킷 구조: [crc:2byte]payload{EOT} - crc에 우연히 {EOT}가 들어갈 수 있으므로
+    # 첫 2byte는 무조건 crc로 취급하고 그 이후의 첫 {EOT}를 패킷의 끝으로 본다.
+
+    def __init__(self):
+        self._buf = bytearray()
+
+
+    def feed(self, data: bytes) -> list:
+        buf = self._buf
+        buf.extend(data)
+        packets = []
+        while len(buf) > 2:
+            idx = buf.find(bEOT, 2)
+            if idx < 0: break
+            packets.append(bytes(buf[:idx])) # EOT 제거
+            del buf[:idx + 1]
+        return packets
+
+
+    def buffered(self) -> int: # 아직 {EOT}를 받지 못한(미완성) 패킷의 바이트 수
+        return len(self._buf)
+
+
+    def pending(self) -> bytes: # 아직 {EOT}를 받지 못한(미완성) 패킷의 바이트들
+        return bytes(self._buf)
+
+
+    def reset(self):
+        self._buf = bytearray()
+
+
+
 def str_packet(packet: bytes):
     """
     :exclude-from-docs:
     """
     str_crc16, bytes_data = f"<[0x{packet[:2].hex()}]", packet[2:]
-    replaced = bytes_data.replace(bRS, b'{RS}').replace(bEOT, b'{EOT}')
+    replaced = bytes_data.replace(bRS, b'{RS}').replace(bEOT, b'{EOT}').replace(bGS, b'{GS}')
     return str_crc16 + str(replaced)[2:-1] + f">:{len(packet)} bytes"
 
 
@@ -174,15 +432,228 @@ def print_yellow(msg: str, end:str = "\n"): #BLUE text
 # 공통 베이스 클래스
 ########################################################################
 
+class _CallStub:
+    # 핸들의 주소와 함수번호로 이루어진 패킷 앞부분(prefix)과 그 부분까지의 crc를 미리 계산해 둔다.
+    # 호출할 때는 인수 부분만 인코딩하고 crc도 인수 부분만 이어서(incremental) 계산한다.
+
+    def __init__(self, dev, func_num: int):
+        self._dev = dev
+        self.func_num = func_num
+        self._compile()
+
+
+    def _compile(self):
+        dev, func_num = self._dev, self.func_num
+        addr = dev._packet_addr()
+        self._binary = dev._binary
+        if self._binary:
+            head = bytes((func_num,)) if addr == -1 else bytes((addr, func_num))
+            self._prefix = b'T' + _stuff(head)
+        elif addr == -1:
+            self._prefix = f"{func_num:x}".encode('ascii')
+        else:
+            self._prefix = f"R{RS}{addr:02x}{RS}{func_num:x}".encode('ascii')
+        self._crc = crc_hqx(self._prefix, 0)
+
+
+    def packet(self, *args) -> bytes:
+        if self._binary != self._dev._binary: self._compile() # 인코딩 모드가 바뀐 경우
+        if self._binary:
+            tail = _stuff(b''.join(encode_typed(x) for x in args))
+        else:
+            tail = "".join(RS + map_args(x) for x in args).encode('ascii')
+        return crc_hqx(tail, self._crc).to_bytes(2, 'big') + self._prefix + tail
+
+
+    def __call__(self, *args):
+        dev = self._dev
+        return dev._parse_response(dev._transact(self.packet(*args), self.func_num))
+
+
+    def __repr__(self):
+        return f"<chaino call stub func#{self.func_num} addr:0x{self._dev._addr:02x}>"
+
+
+
+# 함수 테이블 ----------------------------------------------------------
+# "<id> <name>(<arg>:<type>[=<default>], ...) [-> <ret>]" 형식의 문자열로 원격 함수를 선언하면
+# 인수 이름까지 그대로인 메소드를 만들어 준다. 메소드는 핸들별 _CallStub(미리 만든 prefix와 crc)을
+# 사용하고 반환값을 ret 타입으로 바꾼다. (type: int, float, str, bool)
+
+_SPEC_DECODERS = {
+    None: None, "none": None, "int": int, "float": float, "str": str,
+    "bool": lambda val: int(val) == 1,
+}
+
+
+def _is_name(name: str) -> bool: # micropython에는 str.isidentifier()가 없다
+    return bool(name) and not name[0].isdigit() and all(
+        c.isalpha() or c.isdigit() or c == '_' for c in name)
+
+
+def parse_func_spec(spec: str) -> tuple:
+    """
+    Parses a function declaration like ``"13 read_analog(pin:int) -> int"``.
+
+    :return: ``(func_num, name, args, ret)`` where ``args`` is a list of
+             ``(name, type, default)`` and ``ret`` is a type name or ``None``.
+    :rtype: tuple
+    :raises ValueError: If the declaration is malformed.
+    """
+    try:
+        head, rest = spec.split("(", 1)
+        arg_text, ret_text = rest.split(")", 1)
+        num_text, name = head.split()
+        func_num = int(num_text, 0)
+        ret = ret_text.strip()
+        if ret:
+            if not ret.startswith("->"): raise ValueError
+            ret = ret[2:].strip().lower()
+        ret = ret or None
+        args = []
+        for item in arg_text.split(","):
+            item = item.strip()
+            if not item: continue
+            default = None
+            if "=" in item:
+                item, default = (x.strip() for x in item.split("=", 1))
+                if not all(c in "0123456789.+-eExX" for c in default): raise ValueError
+                float(default) if "x" not in default.lower() else int(default, 16) # 숫자만 허용한다
+            arg_name, arg_type = (x.strip() for x in item.split(":", 1))
+            args.append((arg_name, arg_type.lower(), default))
+    except ValueError:
+        raise ValueError(f"Invalid function spec: {spec!r}")
+    if not all(_is_name(x) for x in [name] + [a[0] for a in args]) or ret not in _SPEC_DECODERS:
+        raise ValueError(f"Invalid function spec: {spec!r}")
+    return func_num, name, args, ret
+
+
+def _make_function(spec: str, doc: str = None, asynchronous: bool = False):
+    # 선언으로부터 인수 이름/기본값을 가진 함수를 exec로 만든다 (이름은 parse_func_spec에서 검증됨)
+    # asynchronous이면 exec_func를 await하는 coroutine 함수를 만든다 (aio.AsyncChaino)
+    func_num, name, args, ret = parse_func_spec(spec)
+    params = "".join(f", {a}" + (f"={d}" if d is not None else "") for a, _, d in args)
+    call_args = ", ".join(a for a, _, _ in args)
+    decode = _SPEC_DECODERS[ret]
+    sep = ', ' if call_args else ''
+    # 정수 인수 4개 이하, 반환값이 없거나 정수인 함수는 micropython에서 할당 없는 exec_func_int를 쓴다
+    int_call = (len(args) <= 4 and ret in (None, "none", "int", "bool")
+                and all(t in ("int", "bool") for _, t, _ in args))
+    if asynchronous:
+        src = (f"async def {name}(self{params}):\n"
+               f"    ret = await self.exec_func({func_num}{sep}{call_args})\n"
+               f"    return {'None' if decode is None else '_decode(ret)'}\n")
+    else:
+        src = (f"def {name}(self{params}):\n"
+               f"    stubs = self._stubs\n"
+               f"    if stubs is None:\n" # stub을 쓸 수 없는 상태 (예: shadow mode)
+               f"        ret = self.exec_func({func_num}{sep}{call_args})\n"
+               + (f"    elif self._int_calls:\n"
+                  f"        ret = self.exec_func_int({func_num}{sep}{call_args})\n" if int_call else "")
+               + f"    else:\n"
+               f"        stub = stubs.get({func_num})\n"
+               f"        if stub is None: stub = stubs[{func_num}] = _CallStub(self, {func_num})\n"
+               f"        ret = stub({call_args})\n"
+               f"    return {'None' if decode is None else '_decode(ret)'}\n")
+    namespace = {"_CallStub": _CallStub, "_decode": decode}
+    exec(src, namespace)
+    func = namespace[name]
+    try:
+        func.__doc__ = doc or f"Calls remote function #{func_num}: ``{spec}``."
+    except AttributeError: # micropython 함수에는 __doc__를 쓸 수 없다
+        pass
+    return name, func
+
+
+def device_functions(*specs, docs=None):
+    """
+    Class decorator that generates methods from function declarations.
+
+    Each declaration ``"<id> <name>(<arg>:<type>[=<default>], ...) [-> <ret>]"``
+    becomes a method ``name(self, arg, ...)`` that calls the remote function
+    ``id`` through a precompiled stub (see :meth:`~chaino.chaino.Chaino.bind`)
+    and converts the returned value to ``ret`` (``int``, ``float``, ``str``
+    or ``bool``; no conversion if omitted). The docstring is taken from
+    ``docs`` (a ``{name: docstring}`` dict), or else from a method with the
+    same name already defined in the class body. On an
+    :class:`~chaino.aio.AsyncChaino` subclass the methods are coroutines.
+
+    .. code-block:: python
+
+        @device_functions(
+            "10 relay_on(ch:int)",
+            "11 relay_off(ch:int)",
+            "12 read_temp(ch:int) -> float",
+        )
+        class RelayBoard(Chaino):
+            pass
+    """
+    def decorate(cls):
+        asynchronous = getattr(cls, "_async_calls", False)
+        for spec in specs:
+            name = spec.split("(")[0].split()[-1]
+            doc = docs.get(name) if docs else None
+            if doc is None:
+                member = cls.__dict__.get(name)
+                # member가 없을 때 getattr(None, "__doc__")는 NoneType의 docstring이다
+                if member is not None: doc = getattr(member, "__doc__", None)
+            name, func = _make_function(spec, doc, asynchronous=asynchronous)
+            setattr(cls, name, func)
+        return cls
+    return decorate
+
+
+
+class _Batch:
+    # with dev.batch() as b: 블록 안의 b.exec_func() 호출들을 모아 두었다가
+    # 블록을 빠져나갈 때 하나의 batch 패킷으로 한 번에 실행한다.
+
+    def __init__(self, dev):
+        self._dev = dev
+        self._calls = []
+        self.results = None
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.results = self._dev._exec_batch(self._calls) if self._calls else []
+        return False
+
+
+    def exec_func(self, func_num: int, *args) -> int:
+        """Queues a call and returns its index in :attr:`results`."""
+        self._calls.append((func_num, args))
+        return len(self._calls) - 1
+
+
+
 class _ChainoBase:
     
     _MAX_RETRIES = 3
+    _int_calls = False # exec_func_int()를 지원하는가 (micropython)
+    _async_calls = False # exec_func가 coroutine인가 (aio)
+    # 호출 지연시간 히스토그램의 구간 상한 (초). 마지막 구간(+Inf)이 하나 더 있다
+    _LATENCY_BUCKETS = (0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0)
     
 
     def __init__(self, addr: int):
         self._addr = addr #이 주소는 exec_func_packet을 만드는데 사용됨
-        self._cnt_rd_crc_err = 0
-        self._cnt_wrt_crc_err = 0
+        self._cnt_rd_crc_err = 0  # 수신한 응답의 CRC 오류
+        self._cnt_wrt_crc_err = 0 # 송신한 요청의 CRC 오류 (디바이스의 'E' 응답)
+        self._cnt_retries = 0     # 재전송/재수신 횟수
+        self._cnt_timeouts = 0    # 응답이 없었던 횟수 (I2C: 버스 오류)
+        self._cnt_bytes_tx = 0 # 송신 바이트 수 ({EOT} 포함)
+        self._cnt_bytes_rx = 0 # 수신 바이트 수 ({EOT} 포함)
+        self._cnt_calls = 0    # 함수 호출 수 (micropython에서도 센다)
+        self._cnt_errors = 0   # 그 중 실패한(예외가 발생한) 호출 수
+        self._func_stats = {}  # func_num -> [calls, errors, sum_s, max_s, histogram]
+        self._binary = False   # 바이너리(typed) 인코딩 모드 여부
+        self._identity = None  # identity() 캐시 (set_addr()에서 무효화)
+        self._stubs = {}       # 함수 테이블로 만든 메소드들의 func_num -> _CallStub
 
 
     def _parse_response(self, data_packet: bytes):
@@ -199,6 +670,11 @@ class _ChainoBase:
             else:
                 return [x.decode() for x in ret_vals]  # 리스트로 반환
                 
+        elif char0 == 'T':  # 바이너리 모드의 함수실행 성공: T val1 val2 ...
+            ret_vals = decode_typed(_unstuff(data_packet[1:]))
+            if not ret_vals: return None
+            return ret_vals[0] if len(ret_vals) == 1 else ret_vals
+
         elif char0 == 'F':  # 함수실행 실패: F{RS}err_msg
             err_msg = str(data_packet[2:])
             raise Exception(f"Function execution fail(addr:{self._addr}): {err_msg}")
@@ -207,7 +683,264 @@ class _ChainoBase:
             raise Exception(f"Unknown response header(addr:{self._addr}): {char0}")
         
     
+    def _packet_addr(self) -> int:
+        # 패킷에 들어갈 주소 (micropython은 -1: 주소 필드가 없다)
+        return self._addr
+
+
+    def _record_call(self, func_num, seconds: float, ok: bool):
+        # 함수번호별 호출 수, 오류 수, 지연시간 합/최대값과 히스토그램을 갱신한다
+        self._cnt_calls += 1
+        if not ok: self._cnt_errors += 1
+        st = self._func_stats.get(func_num)
+        if st is None:
+            st = self._func_stats[func_num] = [0, 0, 0.0, 0.0, [0] * (len(_ChainoBase._LATENCY_BUCKETS) + 1)]
+        st[0] += 1
+        if not ok: st[1] += 1
+        st[2] += seconds
+        if seconds > st[3]: st[3] = seconds
+        i = 0
+        for bound in _ChainoBase._LATENCY_BUCKETS:
+            if seconds <= bound: break
+            i += 1
+        st[4][i] += 1
+
+
+    def stats(self) -> dict:
+        """
+        Returns the communication metrics of this handle.
+
+        The counters cover the whole life of the handle. ``functions`` maps
+        each function ID (``"batch"`` for batched calls, ``None`` for raw
+        packets) to its call count, the number of calls that raised, the
+        average and maximum latency and a latency histogram: ``histogram[i]``
+        counts the calls that took at most ``latency_buckets_ms[i]``, and the
+        last element counts the slower ones.
+
+        :return: A dict with ``addr``, ``calls``, ``errors``, ``retries``,
+                 ``timeouts``, ``crc_errors_rx`` (responses), ``crc_errors_tx``
+                 (requests), ``bytes_tx``, ``bytes_rx``, ``latency_buckets_ms``
+                 and ``functions``.
+        :rtype: dict
+
+        .. note::
+           On MicroPython only the counters (including ``calls`` and ``errors``)
+           are collected: the per-function latencies are not measured so that
+           calls stay allocation-free, and ``functions`` is empty.
+
+        .. code-block:: python
+
+            st = hana.stats()
+            print(st["retries"], st["functions"][13]["avg_ms"])
+        """
+        functions = {}
+        for func_num, (calls, errors, total, peak, hist) in self._func_stats.items():
+            functions[func_num] = {"calls": calls, "errors": errors,
+                                   "avg_ms": total / calls * 1000, "max_ms": peak * 1000,
+                                   "sum_ms": total * 1000, "histogram": list(hist)}
+        return {
+            "addr": self._addr,
+            "calls": self._cnt_calls,
+            "errors": self._cnt_errors,
+            "retries": self._cnt_retries,
+            "timeouts": self._cnt_timeouts,
+            "crc_errors_rx": self._cnt_rd_crc_err,
+            "crc_errors_tx": self._cnt_wrt_crc_err,
+            "bytes_tx": self._cnt_bytes_tx,
+            "bytes_rx": self._cnt_bytes_rx,
+            "latency_buckets_ms": [b * 1000 for b in _ChainoBase._LATENCY_BUCKETS],
+            "functions": functions,
+        }
+
+
+    def _gen_exec_packet(self, func_num: int, *args) -> bytes:
+        if self._binary:
+            return gen_typed_exec_func_packet(self._packet_addr(), func_num, *args)
+        return gen_exec_func_packet(self._packet_addr(), func_num, *args)
+
+
+    def bind(self, func_num: int):
+        """
+        Returns a precompiled callable for one remote function of this handle.
+
+        The packet prefix (header, address and function id) and the CRC state
+        after that prefix are computed once, so each call only encodes and CRCs
+        its arguments. Calling the stub is equivalent to
+        ``exec_func(func_num, *args)``.
+
+        :param func_num: The integer ID of the remote function.
+        :type func_num: int
+        :return: A callable ``stub(*args)``.
+
+        .. code-block:: python
+
+            read_adc = hana.bind(13)
+            samples = [int(read_adc(26)) for _ in range(1000)]
+        """
+        return _CallStub(self, func_num)
+
+
+    def load_functions(self) -> list:
+        """
+        Reads the function table advertised by the device and adds its functions to this handle.
+
+        The device answers function 208 with declarations in the format of
+        :func:`device_functions`. Functions whose name is already a method of
+        the class are skipped.
+
+        :return: The names of the added methods.
+        :rtype: list[str]
+
+        .. code-block:: python
+
+            dev = Chaino("COM9")
+            print(dev.load_functions())     # ['read_temp', ...]
+            print(dev.read_temp(0))
+        """
+        return self._add_functions(self.exec_func(208))
+
+
+    def _add_functions(self, specs) -> list:
+        # 208번 함수의 반환값(선언들)으로 메소드를 만들어 이 핸들에 붙인다
+        if specs is None: return []
+        if not isinstance(specs, list): specs = [specs]
+        added = []
+        for spec in specs:
+            name, func = _make_function(str(spec), asynchronous=self._async_calls)
+            if hasattr(type(self), name): continue
+            setattr(self, name, (lambda f: lambda *args, **kw: f(self, *args, **kw))(func))
+            added.append(name)
+        return added
+
+
+    def set_binary_mode(self, enable: bool = True) -> bool:
+        """
+        Switches the argument/return encoding between ASCII and binary.
+
+        In binary mode every argument is sent with a one-byte type tag in a
+        compact binary form (e.g., a 12-bit ADC value takes 2 bytes) and return
+        values come back already typed (``int``, ``bool``, ``float``, ``bytes``
+        or ``str``) instead of strings. The mode is negotiated with the device
+        (function 206); if the firmware does not support it, the handle stays
+        in ASCII mode.
+
+        :param enable: ``True`` for binary mode, ``False`` for ASCII mode.
+        :type enable: bool
+        :return: ``True`` if the binary mode is active after the call.
+        :rtype: bool
+
+        .. note::
+           Only :meth:`exec_func` (and the methods built on it) use the binary
+           encoding. The :meth:`pipeline` and :meth:`batch` frames are always
+           ASCII, so their results stay strings as in ASCII mode.
+
+        .. code-block:: python
+
+            if hana.set_binary_mode():
+                adc = hana.exec_func(13, 26)   # int, not str
+        """
+        if not enable:
+            self._binary = False
+            return False
+        try:
+            self._binary = int(self.exec_func(206, 1)) == 1
+        except Exception:
+            self._binary = False
+        return self._binary
+
+
+    def _exec_batch(self, calls) -> list:
+        packet = gen_batch_packet(self._packet_addr(), calls)
+        data_packet = self._transact(packet, "batch")
+        if chr(data_packet[0]) != 'B':
+            self._parse_response(data_packet) # 'F'라면 여기서 예외가 발생한다
+            raise Exception(f"Invalid batch response(addr:{self._addr})")
+
+        subs = data_packet.split(bGS)[1:]
+        if len(subs) != len(calls):
+            raise Exception(f"Batch response count mismatch(addr:{self._addr}): "
+                            f"{len(subs)} for {len(calls)} calls")
+        results = []
+        for sub in subs:
+            try:
+                results.append(self._parse_response(sub))
+            except Exception as e: # 개별 호출의 실패는 예외 객체로 결과에 넣는다
+                results.append(e)
+        return results
+
+
+    def batch(self):
+        """
+        Collects several function calls and executes them in a single round trip.
+
+        Calls made with ``exec_func()`` on the returned object inside the ``with``
+        block are only queued. When the block exits they are sent as one framed
+        packet (one CRC), executed in order by the device, and the per-call
+        results are stored in ``results``. A call that fails on the device does
+        not stop the others; its entry in ``results`` is the ``Exception``
+        instead of a value.
+
+        :return: A batch object with ``exec_func(func_num, *args)`` and ``results``.
+
+        .. note::
+           The firmware must support the batch ('B') frames. The batch frames
+           are ASCII even in binary mode (see :meth:`set_binary_mode`), so the
+           ``results`` are strings as in ASCII mode.
+
+        .. code-block:: python
+
+            with dev.batch() as b:
+                for pin in range(2, 10):
+                    b.exec_func(10, pin)      # set_high(pin)
+                b.exec_func(205, 0, 0, 255)   # set_neopixel(0, 0, 255)
+            print(b.results)
+        """
+        return _Batch(self)
+
+
     # 공통 인터페이스 메소드들
+    @staticmethod
+    def _identity_from(vals) -> dict:
+        # 207번 함수의 반환값: name, version, addr, capability...
+        return {"name": str(vals[0]), "version": str(vals[1]), "addr": int(vals[2]),
+                "caps": [str(cap) for cap in vals[3:]]}
+
+
+    def _fetch_identity(self) -> dict:
+        data_packet = self._transact(self._gen_exec_packet(207), 207)
+        if chr(data_packet[0]) == 'F': # 207번 함수가 없는 펌웨어: 기존 함수들로 하나씩 얻는다
+            return {"name": self.exec_func(201), "version": self.exec_func(202),
+                    "addr": int(self.exec_func(203)), "caps": []}
+        return self._identity_from(self._parse_response(data_packet))
+
+
+    def identity(self, refresh: bool = False) -> dict:
+        """
+        Gets the name, firmware version, I2C address and capabilities of the target device.
+
+        The identity is read with a single call (function 207) and cached on
+        the handle, so :meth:`who`, :meth:`get_version` and :meth:`get_addr`
+        do not communicate after the first time. The cache is cleared by
+        :meth:`set_addr`. With older firmware the three functions are called instead
+        and the capability list is empty.
+
+        :param refresh: If ``True``, reads the identity from the device again.
+        :type refresh: bool
+        :return: A dict with ``name`` (str), ``version`` (str), ``addr`` (int)
+                 and ``caps`` (list[str]).
+        :rtype: dict
+
+        .. code-block:: python
+
+            ident = dev.identity()
+            if "batch" in ident["caps"]:
+                ...
+        """
+        if refresh or self._identity is None:
+            self._identity = self._fetch_identity()
+        return self._identity
+
+
     def who(self) -> str:
         """
         Gets the identification string of the target device.
@@ -218,7 +951,7 @@ class _ChainoBase:
         :return: The identification string, e.g., "Chaino_Hana", "Chaino_Unknown".
         :rtype: str
         """
-        return self.exec_func(201)
+        return self.identity()["name"]
     
     
     def get_version(self) -> str:
@@ -228,7 +961,7 @@ class _ChainoBase:
         :return: The firmware version string, e.g., "Chaino_Hana Firmware v0.9.4".
         :rtype: str
         """
-        return self.exec_func(202)
+        return self.identity()["version"]
     
     
     def get_addr(self) -> int:
@@ -238,9 +971,8 @@ class _ChainoBase:
         :return: The I2C address as a int number
         :rtype: int
         """
-        int_addr = int(self.exec_func(203))
         #return f"0x{int_addr:2x}"
-        return int_addr
+        return self.identity()["addr"]
     
     
     def set_addr(self, new_addr: int):
@@ -257,6 +989,7 @@ class _ChainoBase:
         :rtype: str
         """
         if self._addr != new_addr:
+            self._identity = None
             return self.exec_func(204, new_addr)
         else:
             return f"I2C address is already set to 0x{self._addr:02x}."
@@ -285,7 +1018,360 @@ if IS_CPYTHON:#===========================================
     import serial # pyserial을 pip install해야 한다
     import serial.tools.list_ports
     import time
+    import threading
+    import weakref
     from random import randint
+    from collections import namedtuple
+    from concurrent.futures import ThreadPoolExecutor
+
+
+    ScanResult = namedtuple("ScanResult", "port name addr version rtt_ms")
+    ScanResult.__doc__ = "A Chaino master found by :meth:`Chaino.scan`."
+
+
+    # stats()의 카운터들 (port_stats()에서 합산한다)
+    _COUNTER_KEYS = ("calls", "errors", "retries", "timeouts", "crc_errors_rx",
+                     "crc_errors_tx", "bytes_tx", "bytes_rx")
+
+
+    def _merge_stats(a: dict, b: dict) -> dict:
+        # stats() 두 개를 합친다 (같은 주소의 핸들들, 또는 포트 전체)
+        st = dict(a)
+        for key in _COUNTER_KEYS:
+            st[key] = a[key] + b[key]
+        functions = {func_num: dict(f) for func_num, f in a["functions"].items()}
+        for func_num, f in b["functions"].items():
+            g = functions.get(func_num)
+            if g is None:
+                functions[func_num] = dict(f)
+                continue
+            g["calls"] += f["calls"]
+            g["errors"] += f["errors"]
+            g["sum_ms"] += f["sum_ms"]
+            g["max_ms"] = max(g["max_ms"], f["max_ms"])
+            g["avg_ms"] = g["sum_ms"] / g["calls"]
+            g["histogram"] = [x + y for x, y in zip(g["histogram"], f["histogram"])]
+        st["functions"] = functions
+        return st
+
+
+    # (metric 이름, stats()의 key, 추가 label, 설명)
+    _PROM_COUNTERS = (
+        ("chaino_retries_total", "retries", "", "Resent requests and re-read responses."),
+        ("chaino_timeouts_total", "timeouts", "", "Requests without a response in time."),
+        ("chaino_crc_errors_total", "crc_errors_rx", 'direction="rx",', "Frames with a CRC error."),
+        ("chaino_crc_errors_total", "crc_errors_tx", 'direction="tx",', None),
+        ("chaino_bytes_total", "bytes_rx", 'direction="rx",', "Bytes sent and received."),
+        ("chaino_bytes_total", "bytes_tx", 'direction="tx",', None),
+    )
+
+
+    def _prometheus_text(port_stats: list) -> str:
+        # port_stats() 결과들을 Prometheus text exposition format으로 변환한다
+        lines = []
+        def metric(name, kind, help_):
+            lines.append(f"# HELP {name} {help_}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        metric("chaino_port_transactions_total", "counter", "Transactions served by the port scheduler.")
+        for st in port_stats:
+            lines.append(f'chaino_port_transactions_total{{port="{st["port"]}"}} {st["transactions"]}')
+        metric("chaino_port_queue_depth", "gauge", "Threads waiting for the port.")
+        for st in port_stats:
+            lines.append(f'chaino_port_queue_depth{{port="{st["port"]}"}} {st["queue_depth"]}')
+
+        for name, key, extra, help_ in _PROM_COUNTERS:
+            if help_ is not None: metric(name, "counter", help_)
+            for st in port_stats:
+                for addr, dev in st["devices"].items():
+                    lines.append(f'{name}{{{extra}port="{st["port"]}",addr="0x{addr:02x}"}} {dev[key]}')
+
+        metric("chaino_calls_total", "counter", "Function calls, by function ID.")
+        for st in port_stats:
+            for addr, dev in st["devices"].items():
+                for func_num, f in dev["functions"].items():
+                    lines.append(f'chaino_calls_total{{port="{st["port"]}",addr="0x{addr:02x}",func="{func_num}"}} {f["calls"]}')
+        metric("chaino_call_errors_total", "counter", "Function calls that raised, by function ID.")
+        for st in port_stats:
+            for addr, dev in st["devices"].items():
+                for func_num, f in dev["functions"].items():
+                    lines.append(f'chaino_call_errors_total{{port="{st["port"]}",addr="0x{addr:02x}",func="{func_num}"}} {f["errors"]}')
+
+        metric("chaino_call_latency_seconds", "histogram", "Function call latency, by function ID.")
+        bounds = [f"{b:g}" for b in _ChainoBase._LATENCY_BUCKETS] + ["+Inf"]
+        for st in port_stats:
+            for addr, dev in st["devices"].items():
+                for func_num, f in dev["functions"].items():
+                    labels = f'port="{st["port"]}",addr="0x{addr:02x}",func="{func_num}"'
+                    cum = 0
+                    for le, n in zip(bounds, f["histogram"]):
+                        cum += n
+                        lines.append(f'chaino_call_latency_seconds_bucket{{{labels},le="{le}"}} {cum}')
+                    lines.append(f'chaino_call_latency_seconds_sum{{{labels}}} {f["sum_ms"] / 1000:.6f}')
+                    lines.append(f'chaino_call_latency_seconds_count{{{labels}}} {f["calls"]}')
+        return "\n".join(lines) + "\n"
+
+
+    class _PortScheduler:
+        # 하나의 serial 포트를 공유하는 모든 핸들(master/slave)의 송수신을 직렬화한다.
+        # 번호표(ticket) 방식이므로 먼저 기다린 스레드가 먼저 포트를 사용한다(FIFO).
+        # 같은 스레드는 다시 획득할 수 있다(reentrant).
+
+        def __init__(self, ser):
+            self.serial = ser
+            self._cond = threading.Condition()
+            self._next_ticket = 0
+            self._serving = 0
+            self._owner = None
+            self._reentry = 0
+            self._cnt_transactions = 0
+            self._max_queue_depth = 0
+            self._wait_total = 0.0
+            self._wait_max = 0.0
+            self.decoder = _FrameDecoder() # 이 포트의 수신 바이트열 -> 패킷
+            self.rx_frames = []            # 완성되었지만 아직 꺼내지 않은 패킷들
+            self.handles = weakref.WeakSet() # 이 포트를 쓰는 핸들들 (port_stats()에서 합산)
+            self.tap = None                # 캡처 중이라면 capture.WireCapture
+            self.next_seq = 0              # 다음 'Q' 프레임의 순번 (포트의 pipeline들이 이어서 쓴다)
+            self.pipeline = None           # 포트를 독점하고 있는 _Pipeline
+            self.stale = False             # 늦은 응답이 올 수 있다 (타임아웃/실패한 교환 이후)
+
+
+        def __enter__(self):
+            self.acquire()
+            return self
+
+
+        def __exit__(self, exc_type, exc, tb):
+            self.release()
+            return False
+
+
+        def _queue_depth(self) -> int: # 포트를 기다리는 스레드 수
+            return self._next_ticket - self._serving - (1 if self._owner is not None else 0)
+
+
+        def acquire(self):
+            me = threading.get_ident()
+            with self._cond:
+                if self._owner == me:
+                    self._reentry += 1
+                    return
+                ticket = self._next_ticket
+                self._next_ticket += 1
+                self._max_queue_depth = max(self._max_queue_depth, self._queue_depth())
+                start = time.perf_counter()
+                while ticket != self._serving or self._owner is not None:
+                    self._cond.wait()
+                wait = time.perf_counter() - start
+                self._owner = me
+                self._cnt_transactions += 1
+                self._wait_total += wait
+                self._wait_max = max(self._wait_max, wait)
+
+
+        def release(self):
+            with self._cond:
+                if self._reentry > 0:
+                    self._reentry -= 1
+                    return
+                self._owner = None
+                self._serving += 1
+                self._cond.notify_all()
+
+
+        def stats(self) -> dict:
+            with self._cond:
+                cnt = self._cnt_transactions
+                return {
+                    "queue_depth": self._queue_depth(),
+                    "max_queue_depth": self._max_queue_depth,
+                    "transactions": cnt,
+                    "wait_avg_ms": (self._wait_total / cnt * 1000) if cnt else 0.0,
+                    "wait_max_ms": self._wait_max * 1000,
+                }
+
+
+
+    class PipelinedCall:
+        """
+        The pending result of a call submitted through :meth:`Chaino.pipeline`.
+
+        Calling :meth:`result` keeps reading responses from the serial link
+        until this call is answered, so it never blocks forever even if the
+        pipeline has not been drained yet.
+        """
+        _PENDING = object()
+
+        def __init__(self, pipe, seq: int):
+            self._pipe = pipe
+            self.seq = seq
+            self._value = PipelinedCall._PENDING
+            self._error = None
+
+
+        def done(self) -> bool:
+            """Returns ``True`` if the response (or an error) has been received."""
+            return self._value is not PipelinedCall._PENDING or self._error is not None
+
+
+        def result(self):
+            """
+            Returns the value(s) of the remote function, same as :meth:`Chaino.exec_func`.
+
+            :raises Exception: If the remote function failed or the retries for
+                               this sequence number were exhausted.
+            """
+            while not self.done():
+                self._pipe._pump()
+            if self._error is not None:
+                raise self._error
+            return self._value
+
+
+
+    class _Pipeline:
+        # exec_func 요청을 최대 depth개까지 응답을 기다리지 않고 연속 송신한다.
+        # 각 요청은 순번(seq)을 가지며 응답은 seq로 PipelinedCall에 매칭된다.
+        # 디바이스는 요청을 도착 순서대로 처리하므로 순번이 없는 응답('E', CRC 오류, 타임아웃)은
+        # 가장 오래된 미응답 요청의 것으로 간주하여 그 순번만 복구한다.
+        # 같은 이유로 어떤 순번의 응답이 왔을 때, 그 순번을 처음 보내기 전에 마지막으로 송신된
+        # 요청이 아직 미응답이라면 그 요청(또는 응답)은 잃어버린 것이므로 타임아웃을 기다리지 않고
+        # 바로 다시 보낸다. 다시 보낸 요청도 처음 보낸 위치(_order)를 유지한다.
+
+        def __init__(self, dev, depth: int):
+            if not (1 <= depth <= 128):
+                raise ValueError("pipeline depth must be in the range of 1~128.")
+            self._dev = dev
+            self._depth = depth
+            self._pending = {}  # seq -> [packet, PipelinedCall, try_count, func_num, 송신 시각,
+                                #         처음 송신 번호, 마지막 송신 번호]
+            self._order = []    # 처음 송신한 순서(오래된 것이 앞)
+            self._tx_count = 0  # 송신 번호 (재전송과 재전송 요청도 센다)
+            self._progress = False # 마지막 타임아웃 이후에 무언가 수신했다 (디바이스가 처리 중이다)
+            self._resent = False   # 다시 보낸 요청이 있다 (중복 응답이 늦게 올 수 있다)
+            self._locked = False # 응답이 모두 올 때까지 포트를 독점한다
+            self._outer = None  # 같은 스레드에서 바깥에 열려 있는 pipeline
+
+
+        def __enter__(self):
+            return self
+
+
+        def __exit__(self, exc_type, exc, tb):
+            self.drain()
+            return False
+
+
+        def submit(self, func_num: int, *args) -> PipelinedCall:
+            sched = self._dev._sched
+            if not self._locked:
+                sched.acquire()
+                self._locked = True
+                self._outer = sched.pipeline
+                # 이전 요청의 늦은 응답을 버린다 (바깥 pipeline이 있다면 그 응답들을 먼저 받는다)
+                self._dev._discard_stale()
+                sched.pipeline = self
+            # 다음 순번이 아직 응답을 기다리고 있다면 재사용하지 않고 응답(또는 실패)을 기다린다
+            while len(self._pending) >= self._depth or sched.next_seq in self._pending:
+                self._pump()
+            seq = sched.next_seq
+            sched.next_seq = (seq + 1) & 0xFF
+            packet = gen_seq_exec_func_packet(seq, self._dev._addr, func_num, *args)
+            call = PipelinedCall(self, seq)
+            tx = self._tx_count = self._tx_count + 1
+            self._pending[seq] = [packet, call, 0, func_num, time.perf_counter(), tx, tx]
+            self._order.append(seq)
+            self._dev._serial_write(packet)
+            return call
+
+
+        def drain(self):
+            try:
+                self._settle()
+                # 다시 보낸 요청이 없었다면 모든 응답을 받았으므로 더 올 응답이 없다
+                if not self._resent: self._dev._sched.stale = False
+            finally:
+                if self._locked:
+                    self._locked = False
+                    self._dev._sched.pipeline = self._outer
+                    self._dev._sched.release()
+
+
+        def _settle(self): # 미응답 요청이 없을 때까지 응답을 받는다 (포트는 놓지 않는다)
+            while self._pending:
+                self._pump()
+
+
+        def _retry(self, seq: int, packet: bytes, err_msg: str):
+            entry = self._pending[seq]
+            entry[2] += 1
+            if entry[2] < Chaino._MAX_RETRIES:
+                self._dev._cnt_retries += 1
+                self._dev._serial_write(packet)
+                self._resent = True
+                self._tx_count += 1
+                entry[6] = self._tx_count
+            else:
+                self._finish(seq, error=Exception(f"{err_msg} (seq:0x{seq:02x})"))
+
+
+        def _finish(self, seq: int, value=None, error=None):
+            entry = self._pending.pop(seq, None)
+            if entry is None: return # 이미 처리된 순번의 중복 응답은 무시
+            self._order.remove(seq)
+            self._dev._record_call(entry[3], time.perf_counter() - entry[4], error is None)
+            call = entry[1]
+            if error is None: call._value = value
+            else: call._error = error
+
+
+        def _pump(self):
+            dev = self._dev
+            packet_ret = dev._read_packet()
+            oldest = self._order[0]
+
+            if packet_ret is None: # 타임아웃
+                dev._cnt_timeouts += 1
+                # 그 전에 응답이 왔다면 디바이스가 앞의 요청들을 처리하느라 늦는 것이므로 한 번은 더 기다린다
+                # (stop-and-wait처럼, 느린 디바이스의 큐에 중복 요청을 쌓지 않는다)
+                if self._progress: self._progress = False
+                else: self._retry(oldest, self._pending[oldest][0],
+                                  "Max retries reached for serial read error.")
+                return
+            self._progress = True
+
+            if not is_crc_matched(packet_ret): # 응답 CRC 오류 -> 순번 지정 재전송 요청
+                dev._cnt_rd_crc_err += 1
+                self._retry(oldest, gen_seq_resend_packet(oldest),
+                            "Max retries reached for received packet CRC error.")
+
+            elif chr(packet_ret[2]) == 'E': # 요청 패킷이 수신측에서 CRC 오류
+                dev._cnt_wrt_crc_err += 1
+                self._retry(oldest, self._pending[oldest][0],
+                            "Max retries reached for resending packet error.")
+
+            elif chr(packet_ret[2]) == 'Q': # Q{RS}SQ{RS}S...
+                seq = int(packet_ret[4:6], 16)
+                if seq in self._pending: # 이 순번보다 먼저 송신이 끝난 미응답 요청은 잃어버렸다
+                    first = self._pending[seq][5]
+                    # (그 뒤에 다시 보낸 요청은 재전송을 기다리는 중이므로 건드리지 않는다)
+                    for lost in self._order[:self._order.index(seq)]:
+                        if self._pending[lost][6] < first:
+                            dev._cnt_timeouts += 1
+                            self._retry(lost, self._pending[lost][0],
+                                        "Max retries reached for lost request.")
+                try:
+                    self._finish(seq, value=dev._parse_response(packet_ret[7:]))
+                except Exception as e:
+                    self._finish(seq, error=e)
+
+            elif packet_ret[2:3] in (b'S', b'F', b'T'):
+                pass # 순번이 없는 응답: 타임아웃으로 끝난 이전 exec_func의 늦은 응답이므로 버린다
+
+            else:
+                raise Exception(f"Unknown response header in pipeline(addr:{dev._addr}): {chr(packet_ret[2])}")
+
 
 
     class Chaino (_ChainoBase):
@@ -300,48 +1386,91 @@ if IS_CPYTHON:#===========================================
 
         
         _SERIAL_TIMEOUT = 0.1 #serial timeout
-        _serials = {} 
+        _serials = {} # port -> _PortScheduler (serial 객체와 그 포트의 스케쥴러)
+        _serials_lock = threading.Lock()
+        _connecting = set() # 연결(handshake) 중인 포트들
+        registry = None # chaino.registry.DeviceRegistry를 설정하면 알려진 디바이스는 빠르게 연결한다
 
         @staticmethod
-        def scan(): #serial 포트 스캔 함수
-            """
-            Scans available serial ports for connected Chaino master devices.
+        def _probe(port: str, timeout: float) -> ScanResult:
+            # 포트를 열어 Chaino master인지 확인하고 정보를 얻은 뒤 다시 닫는다
+            # timeout은 probe마다 따로 잰다 (pool에서 기다린 시간은 포함하지 않는다)
+            # 진행 중인 단계는 끊지 못한다 (각 단계는 serial timeout으로 끝난다).
+            # timeout이 지나면 다음 단계로 가지 않고 결과를 버린 채 포트를 닫는다
+            deadline = time.perf_counter() + timeout
+            dev = Chaino(port)
+            try:
+                if time.perf_counter() > deadline: return None
+                ident = dev.identity() # 연결할 때 읽어 둔 값
+                start_ns = time.perf_counter_ns()
+                dev.exec_func(201)
+                rtt_ms = (time.perf_counter_ns() - start_ns) / 1e6
+                if time.perf_counter() > deadline: return None
+                return ScanResult(port, ident["name"], ident["addr"], ident["version"], rtt_ms)
+            finally:
+                dev.close()
 
-            This method iterates through all detected serial ports, attempts to
-            connect, and verifies if each is a Chaino master by sending a handshake
-            command. It prints a list of found Chaino devices and other ports.
+
+        @staticmethod
+        def scan(timeout: float = 2.0, max_workers: int = 8, ports=None) -> list: #serial 포트 스캔 함수
+            """
+            Scans the serial ports for connected Chaino master devices.
+
+            The ports are probed concurrently by a pool of at most ``max_workers``
+            threads. Each probe opens the port, runs the handshake, reads the
+            identity of the master and closes the port again. Ports that are not
+            Chaino masters, can not be opened or are already opened by this
+            process are left out, and so are the ports whose probe did not
+            finish within ``timeout`` seconds.
+            Every probe has finished and closed its port when this returns, so
+            the ports can be opened right away.
+
+            :param timeout: The result cutoff in seconds, measured from the start
+                            of each probe. It is not a time limit: a step in
+                            progress is not interrupted (each step ends with the
+                            serial timeout), a late probe only skips its remaining
+                            steps and its result is dropped, and ``scan()`` still
+                            waits for it to close its port.
+            :type timeout: float
+            :param max_workers: The maximum number of ports probed at the same time.
+            :type max_workers: int
+            :param ports: The port names to probe. If ``None`` (default), all the
+                          ports from ``serial.tools.list_ports.comports()``.
+            :type ports: list[str] | None
+            :return: A list of ``ScanResult(port, name, addr, version, rtt_ms)``
+                     named tuples, in the order of the ports.
+            :rtype: list[ScanResult]
 
             .. code-block:: python
 
-                Chaino.scan()
-            
-            Example Output::
+                for port, name, addr, version, rtt_ms in Chaino.scan():
+                    print(f'{port}: {name}(0x{addr:02x}) {version} {rtt_ms:.2f}ms')
 
-                Serial("COM9"): Chaino_Hana (I2C addr.:0x40)
-                Serial("COM3"): Not a Chaino (master) device
-                Note: Chaino.scan() can detect **MASTER** Chaino devices only.
+            .. note::
+               Chaino.scan() can detect **MASTER** Chaino devices only.
             """
-            ports = serial.tools.list_ports.comports()
-            port_list = [(port.device, port.description) for port in ports]
-            for s in port_list: #print(f"'{e[0]}' : {e[1]}")
-                try:
-                    test_obj = Chaino(s[0]) #첫번째 포트로 테스트 객체 생성
-                    # 예외가 발생하지 않았다면 "ImChn" 까지 확인된 것임
-                    #print_yellow(f'Serial("{s[0]}"): {test_obj._chaino_name}')
-                    print_yellow(f'Serial("{s[0]}"): {test_obj._chaino_name}(0x{test_obj._my_slave_addr:02x})')
-                except Exception as e:
-                    print(str(e))
-                    print(f'Serial("{s[0]}"): Not a Chaino (master) device')
-            print("Note: Chaino.scan() can detect \033[31m**MASTER**\033[0m Chaino devices only.")
+            if ports is None:
+                ports = [port.device for port in serial.tools.list_ports.comports()]
+            if not ports: return []
+            # 모든 probe가 끝날(포트를 닫을) 때까지 기다린다. 끝나지 않은 probe를 두고 돌아가면
+            # 그 포트는 연결 중으로 예약된 채 남아서 바로 열 수 없다.
+            with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(ports)))) as pool:
+                futures = [pool.submit(Chaino._probe, port, timeout) for port in ports]
+            return [f.result() for f in futures if f.exception() is None and f.result() is not None]
 
 
-        def ping(self):
+        def ping(self, count: int = 1):
             """
             Measures the round-trip communication latency to the target device.
 
             This method sends a simple command (`who()`) and measures the time it
             takes to receive a response. The result, in milliseconds, is printed
             to the console. This is useful for checking connection health and speed.
+            With ``count`` > 1 the minimum, average and maximum are printed.
+            For repeatable measurements use ``python -m chaino bench``.
+
+            :param count: The number of ``who()`` calls to time.
+            :type count: int
 
             .. code-block:: python
             
@@ -353,11 +1482,16 @@ if IS_CPYTHON:#===========================================
                 ping... elapsed time to execute who() : 0.934 ms
             """
             print("ping...", end="")
-            start_time = time.time()   # 시작 시간 기록
-            self.who()
-            end_time = time.time()     # 종료 시간 기록
-            elapsed_time = end_time - start_time
-            print(f" elapsed time to execute who() : {elapsed_time*1000:.3f} ms")
+            elapsed = []
+            for _ in range(count):
+                start_ns = time.perf_counter_ns()   # 시작 시간 기록
+                self.exec_func(201) # who()는 캐시된 값을 반환하므로 직접 호출한다
+                elapsed.append(time.perf_counter_ns() - start_ns)
+            if count == 1:
+                print(f" elapsed time to execute who() : {elapsed[0]/1e6:.3f} ms")
+            else:
+                print(f" who() x {count} : min {min(elapsed)/1e6:.3f} ms, "
+                      f"avg {sum(elapsed)/count/1e6:.3f} ms, max {max(elapsed)/1e6:.3f} ms")
 
 
         def __init__(self, port:str, i2c_addr: int=0):
@@ -388,20 +1522,54 @@ if IS_CPYTHON:#===========================================
             super().__init__(i2c_addr)
             self._port = port
 
-            if port not in Chaino._serials:
+            # 다른 포트의 연결(handshake)을 막지 않도록, lock은 포트를 예약/등록할 때만 잡는다
+            with Chaino._serials_lock:
+                if port in Chaino._connecting:
+                    raise Exception(f'Serial port("{port}") is being opened.')
+                if port not in Chaino._serials:
+                    Chaino._connecting.add(port)
+                elif i2c_addr == 0: #만약 port가 _serials에 있다면 이미 연결된 것임
+                    #print_err2(f'Serial port("{port}") is already opened.')
+                    raise Exception(f'Serial port("{port}") is already opened.')
+                else:
+                    self._sched = Chaino._serials[port]
+                    self._sched.handles.add(self)
+                    self._serial = self._sched.serial #이미 연결된 serial 객체를 가져온다
+                    return
+            try:
                 self._connect_serial() #serial port 연결
+                with Chaino._serials_lock:
+                    Chaino._serials[port] = self._sched
+            finally:
+                with Chaino._serials_lock:
+                    Chaino._connecting.discard(port)
 
-            elif i2c_addr == 0: #만약 port가 _serials에 있다면 이미 연결된 것임
-                #print_err2(f'Serial port("{port}") is already opened.')
-                raise Exception(f'Serial port("{port}") is already opened.')
-            else:
-                self._serial = Chaino._serials[port] #이미 연결된 serial 객체를 가져온다
+
+        def close(self):
+            """
+            Closes the serial port of this handle.
+
+            The port is shared by the master handle and all the slave handles
+            opened on it, so they can not be used after this call either.
+            The port can then be opened again with :class:`Chaino`.
+
+            .. code-block:: python
+
+                master = Chaino("COM9")
+                ...
+                master.close()
+            """
+            with Chaino._serials_lock:
+                if Chaino._serials.get(self._port) is self._sched:
+                    del Chaino._serials[self._port]
+            self._serial.close()
 
 
         #def _check_connection(self):
         def _connect_serial(self):
             # 2025/7/19:(eps32) 921600 이 *460800 보다 오히려 더 느려진다. (2ms)
             # 2025/7/21:(RP2040zero) 921600 이 *460800 보다 더 빠르지 않다.(0.8ms < esp32보다 더 고속동작)
+            self._serial = None
             try:
                 self._serial = serial.Serial(
                     port        = self._port,
@@ -412,47 +1580,117 @@ if IS_CPYTHON:#===========================================
                     parity      = serial.PARITY_NONE,
                     stopbits    = serial.STOPBITS_ONE
                 )
+                self._sched = _PortScheduler(self._serial)
+                self._sched.handles.add(self)
+                reg = Chaino.registry
+                entry = reg.lookup(self._port) if reg is not None else None
+                if entry is not None and self._connect_known(entry, reg.lazy):
+                    return
                 self._clear_buffers() # 버퍼 클리어 (문제 2 해결)
-                if self.exec_func(0) == "ImChn":
-                    self._chaino_name = self.who()
-                    self._my_slave_addr = self.get_addr()
-                    Chaino._serials[self._port] = self._serial
+                # 한 번의 호출(207)로 handshake와 identity를 얻는다. CRC가 맞는 응답이 왔다면
+                # Chaino 디바이스이며, 'F'(구 펌웨어)라면 _fetch_identity()가 기존 함수들로 얻는다.
+                ident = self.identity()
+                self._chaino_name = ident["name"]
+                self._my_slave_addr = ident["addr"]
+                if reg is not None:
+                    reg.remember(self._port, ident["name"], ident["addr"], ident["version"], ident["caps"])
                 
             except Exception as e:
+                    if self._serial is not None: self._serial.close() # 열었던 포트는 닫는다
                     #print_err(str(e))
                     #print_red(f'\nSerial port("{self._port}") does not connected to Chaino device.')
                     raise Exception(f'Serial port("{self._port}") does not connected to Chaino device.')
                     #sys.exit() 
 
 
+        def _connect_known(self, entry: dict, lazy: bool) -> bool:
+            # registry에 있는 디바이스: sleep 없이 버퍼만 비우고 identity 호출 한 번으로 확인한다
+            # (이후의 늦은 응답은 _discard_stale()이 버린다)
+            self._serial.reset_input_buffer()
+            if not lazy:
+                try:
+                    if self.get_addr() != entry["addr"]: return False
+                except Exception:
+                    return False
+            self._chaino_name = entry["name"]
+            self._my_slave_addr = entry["addr"]
+            if self._identity is None and entry.get("caps") is not None: # lazy
+                self._identity = {"name": entry["name"], "version": entry["version"],
+                                  "addr": entry["addr"], "caps": list(entry["caps"])}
+            return True
+
+
         def _serial_write(self, packet: bytes):
             self._serial.write(packet+bEOT) #끝에 bEOT를 붙여서 전송
+            self._cnt_bytes_tx += len(packet) + 1
+            tap = self._sched.tap
+            if tap is not None: tap.record(b'>', packet)
             #self._serial.flush() # AI가 flush()는 필요치 않다고 함
 
         
 
         # (2025/07/29:수정) serial port에서 {EOT}까지 패킷을 읽는다
+        # read_until()은 한 바이트씩 read()를 호출하므로, 도착해 있는 바이트를 한 번에 읽어
+        # 포트별 _FrameDecoder에 넣고 완성된 패킷을 꺼낸다. (CRC16에 {EOT}가 들어가는 경우는
+        # _FrameDecoder가 첫 2byte를 강제로 crc로 취급하여 처리한다)
         def _read_packet(self) -> bytes:
-            #CRC16에 우연히 \x04(EOT)가 포함될 수 있으므로
-            #첫 2byte를 먼저 강제로 읽은 후, 그 나머지를 {EOT}까지 읽는다.
-            packet = self._serial.read(2)
-            line = self._serial.read_until(bEOT, size=None)
-            if line.endswith(bEOT):
-                return packet + line[:-1]  # EOT 제거
-            else:
-                #print_err("Fail to receive [EOT] via Serial")
-                self._clear_buffers() # 버퍼를 클리어하고 None을 반환
-                return None        
+            sched = self._sched
+            ser = self._serial
+            deadline = time.perf_counter() + Chaino._SERIAL_TIMEOUT
+            while not sched.rx_frames:
+                data = ser.read(ser.in_waiting or 1) # 도착한 것이 없으면 첫 바이트를 기다린다
+                if data:
+                    self._cnt_bytes_rx += len(data)
+                    sched.rx_frames.extend(sched.decoder.feed(data))
+                elif time.perf_counter() >= deadline:
+                    #print_err("Fail to receive [EOT] via Serial")
+                    # 덜 받은 패킷은 버리고 b''(CRC 오류와 같이 처리 -> 재전송 요청)를 반환한다.
+                    # 아무것도 받지 못했다면 None을 반환한다.
+                    partial = sched.decoder.buffered()
+                    if sched.tap is not None: sched.tap.record(b'!', sched.decoder.pending())
+                    sched.decoder.reset()
+                    sched.stale = True # 응답이 늦게 도착할 수 있다
+                    return b'' if partial else None
+            packet = sched.rx_frames.pop(0)
+            if sched.tap is not None: sched.tap.record(b'<', packet)
+            return packet
+
+
+
+        def _discard_stale(self):
+            # 새 요청을 보내기 전에, 이전 요청의 늦게 도착한 응답이 있다면 버린다.
+            # 이전 교환이 깨끗하게 끝났고 받은 것이 없다면 sleep 없이 바로 돌아온다.
+            sched = self._sched
+            if sched.pipeline is not None:
+                # 같은 스레드의 pipeline이 포트를 쓰고 있다: 그 응답들은 버리지 않고 먼저 모두 받는다
+                sched.pipeline._settle()
+                return
+            ser = self._serial
+            if not (sched.stale or ser.in_waiting or sched.rx_frames or sched.decoder.buffered()):
+                return
+            # 늦은 응답이 아직 오는 중일 수 있으므로 serial timeout 동안 수신이 없을 때까지
+            # (line이 조용해질 때까지) 읽어서 버린다. 계속 수신되더라도 일정 시간 후에는 멈춘다.
+            deadline = time.perf_counter() + Chaino._SERIAL_TIMEOUT * 10
+            while time.perf_counter() < deadline:
+                data = ser.read(ser.in_waiting or 1) # 도착한 것이 없으면 timeout까지 기다린다
+                if not data: break
+                self._cnt_bytes_rx += len(data)
+            sched.decoder.reset() # 덜 받은 패킷이 새 응답과 이어지지 않도록 한다
+            sched.rx_frames.clear()
+            sched.stale = False
 
 
 
         def _clear_buffers(self):
             self._serial.reset_input_buffer()
             self._serial.reset_output_buffer()
-            time.sleep(0.1)  # 버퍼 안정화 대기
+            time.sleep(0.1)  # 버퍼 안정화 대기 (연결할 때만 사용)
             # 추가로 남은 데이터가 있다면 읽어서 버림
             while self._serial.in_waiting > 0:
                 self._serial.read(self._serial.in_waiting)
+            self._sched.decoder.reset()
+            self._sched.rx_frames.clear()
+            self._sched.stale = False
 
 
 
@@ -469,10 +1707,12 @@ if IS_CPYTHON:#===========================================
                              Arduino device (e.g., 1~200 for user-defined functions).
             :type func_num: int
             :param args: A variable number of arguments to pass to the remote function.
-                         Arguments are automatically converted to strings.
+                         Arguments are automatically converted to strings
+                         (or binary-encoded, see :meth:`set_binary_mode`).
             :return: The value(s) returned from the remote function. Can be ``None`` if
                      there's no return value, a ``str`` for a single return value, or a
-                     ``list[str]`` for multiple return values.
+                     ``list[str]`` for multiple return values. In binary mode the
+                     values are typed instead of ``str``.
             :rtype: None | str | list[str]
             :raises Exception: If communication fails after multiple retries, a CRC
                                error persists, or the remote function reports an error.
@@ -484,8 +1724,29 @@ if IS_CPYTHON:#===========================================
                 adc = int(adc_str)
                 print(f"adc result: {adc}")
             """
-            packet = gen_exec_func_packet(self._addr, func_num, *args)
+            packet = self._gen_exec_packet(func_num, *args)
+            return self._parse_response(self._transact(packet, func_num))  # 응답 패킷 파싱 후 반환
+
+
+        def _transact(self, packet: bytes, func_num=None) -> bytes:
+            # packet을 송신하고 CRC 검사/재전송을 거친 응답 패킷에서 crc를 뗀 나머지를 반환
+            # 같은 포트를 쓰는 다른 스레드의 패킷과 섞이지 않도록 포트를 독점한 상태에서 수행한다
+            # 지연시간은 포트를 얻은 뒤부터 잰다 (포트 대기시간은 _PortScheduler.stats()에 있다)
+            with self._sched:
+                start = time.perf_counter()
+                try:
+                    data_packet = self._transact_locked(packet)
+                except Exception:
+                    self._sched.stale = True # 실패한 요청의 응답이 늦게 올 수 있다
+                    self._record_call(func_num, time.perf_counter() - start, False)
+                    raise
+                self._record_call(func_num, time.perf_counter() - start, data_packet[:1] != b'F')
+                return data_packet
+
+
+        def _transact_locked(self, packet: bytes) -> bytes:
             #print_packet(packet)
+            self._discard_stale()
             self._serial_write(packet) #(1) packet 송신
 
             for try_count in range(Chaino._MAX_RETRIES):
@@ -495,8 +1756,10 @@ if IS_CPYTHON:#===========================================
 
                 if packet_ret == None:
                     #print_err(f"Serial통신 수신 장애({try_count+1}).")
-                    self._cnt_rd_crc_err +=1
-                    if try_count < Chaino._MAX_RETRIES - 1: continue
+                    self._cnt_timeouts +=1
+                    if try_count < Chaino._MAX_RETRIES - 1:
+                        self._cnt_retries +=1
+                        continue
                     else:
                         raise Exception("Max retries reached for serial read error.") 
                         #sys.exit()
@@ -515,6 +1778,7 @@ if IS_CPYTHON:#===========================================
                     self._cnt_rd_crc_err +=1
                     if try_count < Chaino._MAX_RETRIES - 1:
                         #print(f" -> Request Resend({try_count+1}/{Chaino._MAX_RETRIES})")
+                        self._cnt_retries +=1
                         self._serial_write(PACKET_RQ_RESEND)
                         continue
                     else:
@@ -528,22 +1792,200 @@ if IS_CPYTHON:#===========================================
                     self._cnt_wrt_crc_err +=1
                     if try_count < Chaino._MAX_RETRIES - 1:
                         #print(f" -> Rewriting packet({try_count+1}/{Chaino._MAX_RETRIES})")
+                        self._cnt_retries +=1
                         self._serial_write(packet) #packet을 다시 보낸다
                         continue
                     else:
                         raise Exception("Max retries reached for resending packet error.")
                         #sys.exit()
-                
-                return self._parse_response(packet_ret[2:])  # 응답 패킷 파싱 후 반환
+
+                # 타임아웃 뒤에 온 응답이라도 이 요청의 응답이다 (stop-and-wait은 타임아웃에 다시 보내지
+                # 않으므로 더 올 응답이 없다). 다음 요청이 line이 조용해질 때까지 기다리지 않게 한다
+                self._sched.stale = False
+                return packet_ret[2:]
+
+
+        def pipeline(self, depth: int = 8):
+            """
+            Opens a pipelined session that keeps up to ``depth`` calls in flight.
+
+            :meth:`exec_func` is stop-and-wait: one call costs one full round trip.
+            In a pipeline each request frame carries a sequence number, so the next
+            requests are sent without waiting for the previous responses and the
+            answers are matched back to their calls by that number. CRC errors and
+            resends are recovered per sequence number. Leaving the ``with`` block
+            waits until every submitted call has been answered.
+
+            :param depth: The maximum number of unanswered calls (1~128).
+            :type depth: int
+            :return: A pipeline object whose ``submit(func_num, *args)`` returns
+                     a :class:`PipelinedCall`.
+
+            .. note::
+               The firmware must support the sequence-tagged ('Q') frames. These
+               frames are ASCII even in binary mode (see :meth:`set_binary_mode`),
+               so the results are strings as in ASCII mode.
+
+            .. code-block:: python
+
+                with dev.pipeline(depth=8) as pipe:
+                    calls = [pipe.submit(13, 26) for _ in range(1000)]
+                adcs = [int(c.result()) for c in calls]
+            """
+            return _Pipeline(self, depth)
+
+
+        def stats(self) -> dict:
+            st = super().stats()
+            st["port"] = self._port
+            return st
+
+
+        def start_capture(self, path: str):
+            """
+            Starts recording the frames of this handle's serial port to a file.
+
+            Every frame written and read on the port (by all the handles
+            sharing it) is stored with a monotonic timestamp, together with
+            the read timeouts. See :mod:`chaino.capture` for the file format,
+            the pretty-printer and the replayer. A running capture of the port
+            is stopped first.
+
+            :param path: The capture file (overwritten).
+            :type path: str
+            :return: The capture writer (``count`` is the number of frames so far).
+            :rtype: chaino.capture.WireCapture
+
+            .. code-block:: python
+
+                hana.start_capture("link.cap")
+                ...
+                hana.stop_capture()
+            """
+            from .capture import WireCapture # 캡처할 때만 읽는다
+            self.stop_capture()
+            self._sched.tap = WireCapture(path, self._port)
+            return self._sched.tap
+
+
+        def stop_capture(self):
+            """Stops the capture of this handle's serial port, if any, and closes the file."""
+            tap, self._sched.tap = self._sched.tap, None
+            if tap is not None: tap.close()
+
+
+        @staticmethod
+        def port_stats(port: str) -> dict:
+            """
+            Returns the scheduling statistics and the metrics of an opened serial port.
+
+            All handles (the master and its I2C slaves) opened on one port share
+            a scheduler that serializes their frames, so threads talking to
+            different slaves never interleave bytes on the link. Waiting threads
+            are served in arrival order.
+
+            The metrics of the handles on the port (see :meth:`stats`) are
+            added up per I2C address in ``devices`` and for the whole port.
+
+            :param port: The name of the serial port (e.g., "COM9").
+            :type port: str
+            :return: A dict with ``queue_depth`` (threads waiting now),
+                     ``max_queue_depth``, ``transactions``, ``wait_avg_ms``,
+                     ``wait_max_ms``, the summed counters of :meth:`stats`
+                     and ``devices`` (address -> metrics).
+            :rtype: dict
+            :raises KeyError: If the port has not been opened.
+
+            .. code-block:: python
+
+                print(Chaino.port_stats("COM9"))
+            """
+            sched = Chaino._serials[port]
+            st = sched.stats()
+            devices = {}
+            for dev in list(sched.handles):
+                d = dev.stats()
+                devices[d["addr"]] = _merge_stats(devices[d["addr"]], d) if d["addr"] in devices else d
+            total = None
+            for d in devices.values():
+                total = d if total is None else _merge_stats(total, d)
+            for key in _COUNTER_KEYS:
+                st[key] = total[key] if total else 0
+            st["port"] = port
+            st["devices"] = devices
+            return st
+
+
+        @staticmethod
+        def prometheus(ports=None) -> str:
+            """
+            Exports the metrics of opened serial ports in the Prometheus text format.
+
+            Every sample is labeled with ``port``, and the per-device ones with
+            ``addr`` (e.g., ``0x42``); the call counters and the latency
+            histogram (in seconds) are also labeled with ``func``.
+
+            :param ports: The ports to export. If ``None`` (default), all opened ports.
+            :type ports: list[str] | None
+            :return: The metrics in the text exposition format.
+            :rtype: str
+
+            .. code-block:: python
+
+                # e.g., from an HTTP handler of a Prometheus scrape target
+                body = Chaino.prometheus().encode()
+            """
+            if ports is None:
+                with Chaino._serials_lock:
+                    ports = list(Chaino._serials)
+            return _prometheus_text([Chaino.port_stats(port) for port in ports])
 
 
 ##################################################################
 else: # micropython에서는 binascii 모듈에 crc_hqx함수가 없음 #=============================
 ###################################################################
     
-    from machine import Pin, I2C
-    
-    
+    try:
+        from machine import Pin, I2C
+    except ImportError: # unix 포트: bus 객체를 Chaino(addr, bus)로 직접 지정한다 (benchmark 등)
+        Pin = I2C = None
+
+    _HEX = b"0123456789abcdef"
+    _TX_SIZE = 64   # 미리 할당한 송신 버퍼의 크기 (넘는 패킷은 새로 만들어 보낸다)
+    _RX_SIZE = 255  # 응답 길이(ret_len)는 1byte
+
+
+    def _put_int(buf, i: int, end: int, v: int) -> int:
+        # buf[i:]에 정수 v를 10진수 ASCII로 쓰고 다음 위치를 반환한다. 자리가 모자라면 -1
+        if v < 0:
+            if i >= end: return -1
+            buf[i] = 45 # '-'
+            i += 1
+            v = -v
+        n, t = 1, v
+        while t >= 10:
+            t //= 10
+            n += 1
+        if i + n > end: return -1
+        j = i + n
+        while j > i:
+            j -= 1
+            buf[j] = 48 + v % 10
+            v //= 10
+        return i + n
+
+
+    def _put_arg(buf, i: int, x) -> int:
+        # {RS}와 인수 x(int/bool)를 쓴다. x가 None이면 그대로, 쓸 수 없으면 -1
+        if x is None or i < 0: return i
+        if i >= _TX_SIZE: return -1
+        buf[i] = 0x1e
+        if x is True: x = 1
+        elif x is False: x = 0
+        elif type(x) is not int: return -1
+        return _put_int(buf, i + 1, _TX_SIZE, x)
+
+
     class Chaino(_ChainoBase):    
         """
         The primary client class for communicating with a Chaino device from MicroPython.
@@ -553,7 +1995,15 @@ else: # micropython에서는 binascii 모듈에 crc_hqx함수가 없음 #=======
         retries automatically.
         """
         #chaino는 I2C1을 사용
-        _Wire1 = I2C(1, sda=Pin(2), scl=Pin(3), freq=400000)
+        _Wire1 = I2C(1, sda=Pin(2), scl=Pin(3), freq=400000) if I2C is not None else None
+        _int_calls = True
+
+        # 모든 핸들이 함께 쓰는 송수신 버퍼와 길이별 memoryview (처음 만든 핸들에서 할당)
+        # 수신 버퍼 _frame은 header(3byte) 뒤에 응답이 이어지는 형태이고 _hdr, _rx는 그 일부이다
+        _tx = _frame = _rx = _hdr = None
+        _tx_views = _rx_views = _frame_views = None
+
+        _SINGLE_READ_LEN = 16 # single read 모드에서 처음 한 번에 읽는 응답 길이 (crc 포함)
 
 
         @staticmethod
@@ -606,19 +2056,22 @@ else: # micropython에서는 binascii 모듈에 crc_hqx함수가 없음 #=======
             """
             print("ping...", end="")
             start = time.ticks_us()   # 시작 시간 (µs)
-            self.who()
+            self.exec_func(201) # who()는 캐시된 값을 반환하므로 직접 호출한다
             end = time.ticks_us()     # 종료 시간 (µs)
             elapsed = time.ticks_diff(end, start)  # 실행 시간 계산
             print(f" elapsed time to execute who() : {elapsed/1000:.3f} ms")
 
 
 
-        def __init__(self, addr:int):
+        def __init__(self, addr:int, bus=None):
             """
             Initializes a connection to a Chaino slave device over the I2C bus.
 
             :param i2c_addr: The 7-bit I2C address of the target slave device.
             :type i2c_addr: int
+            :param bus: The ``machine.I2C`` object to use. If ``None`` (default), I2C1
+                        (SDA: GP2, SCL: GP3, 400 kHz).
+            :type bus: machine.I2C
 
             .. code-block:: python
 
@@ -626,6 +2079,67 @@ else: # micropython에서는 binascii 모듈에 crc_hqx함수가 없음 #=======
                 slave_device = Chaino(0x42)
             """
             super().__init__(addr)
+            self._bus = bus or Chaino._Wire1
+            self._single_read = False
+            self._rd_len = Chaino._SINGLE_READ_LEN
+            if Chaino._tx is None:
+                Chaino._tx, Chaino._frame = bytearray(_TX_SIZE), bytearray(3 + _RX_SIZE)
+                Chaino._hdr, Chaino._rx = memoryview(Chaino._frame)[:3], memoryview(Chaino._frame)[3:]
+                Chaino._tx_views = [None] * (_TX_SIZE + 1)
+                Chaino._rx_views = [None] * (_RX_SIZE + 1)
+                Chaino._frame_views = [None] * (3 + _RX_SIZE + 1)
+
+
+        @staticmethod
+        def _view(views, buf, n: int):
+            # buf[:n]의 memoryview. 길이별로 한 번만 만들어 두고 재사용한다
+            mv = views[n]
+            if mv is None: mv = views[n] = memoryview(buf)[:n]
+            return mv
+
+
+        def _packet_addr(self) -> int:
+            return -1 # I2C 패킷에는 주소 필드가 없다
+
+
+        def set_single_read(self, enable: bool = True) -> bool:
+            """
+            Switches the response read between two transactions and one.
+
+            By default a call takes three I2C transactions: the request, a
+            3-byte header (type, length, checksum) and the response itself. In
+            single read mode the slave answers a read with the header and the
+            response together, so a call takes two transactions; the master
+            reads a few bytes more than the longest response seen so far into
+            a preallocated buffer and reads once more only if a longer response
+            arrives. Since the slave sends the whole frame again on every read,
+            a CRC error is recovered by reading again instead of executing the
+            function again.
+
+            The mode is negotiated with the device (function 209) and takes
+            effect from the next call; if the firmware does not support it, the
+            handle stays in the two-read mode.
+
+            :param enable: ``True`` for single read mode, ``False`` for the two-read mode.
+            :type enable: bool
+            :return: ``True`` if the single read mode is active after the call.
+            :rtype: bool
+
+            .. code-block:: python
+
+                hana = Hana(0x42)
+                hana.set_single_read()
+            """
+            if not enable:
+                if self._single_read: self.exec_func(209, 0)
+                self._single_read = False
+                return False
+            if not self._single_read:
+                try:
+                    self._single_read = int(self.exec_func(209, 1)) == 1
+                except Exception:
+                    self._single_read = False
+            return self._single_read
             
         
         
@@ -647,50 +2161,170 @@ else: # micropython에서는 binascii 모듈에 crc_hqx함수가 없음 #=======
             :raises Exception: If I2C communication fails or the remote function
                                reports an error.
             """            
-            addr   = self._addr
-            packet = gen_exec_func_packet(-1, func_num, *args)
+            packet = self._gen_exec_packet(func_num, *args)
+            return self._parse_response(self._transact(packet, func_num))
+
+
+        def exec_func_int(self, func_num: int, a=None, b=None, c=None, d=None):
+            """
+            Executes a function with up to four integer arguments and an integer result
+            without allocating memory.
+
+            The request is encoded directly into a preallocated buffer, the
+            response is read into another one with ``readfrom_into`` and its
+            first value is converted to ``int`` in place, so a call in a control
+            loop does not trigger the garbage collector. Arguments that are not
+            ``int``/``bool``, too long packets and the binary mode fall back to
+            :meth:`exec_func`.
+
+            :param func_num: The integer ID of the function (0~255).
+            :type func_num: int
+            :param a: The arguments; ``None`` means no argument.
+            :return: The first return value as ``int``, or ``None`` if there is none.
+            :rtype: int | None
+            :raises Exception: If I2C communication fails or the remote function
+                               reports an error.
+            :raises ValueError: If the returned value is not an integer.
 
+            .. code-block:: python
+
+                while True:
+                    adc = hana.exec_func_int(13, 26)   # read_analog(26)
+                    hana.exec_func_int(21, 9, adc >> 2) # write_analog(9, ...)
+            """
+            n = -1 if self._binary or not (0 <= func_num <= 0xFF) else self._encode_ints(func_num, a, b, c, d)
+            if n < 0: # 할당 없는 경로를 쓸 수 없다
+                ret = self.exec_func(func_num, *[x for x in (a, b, c, d) if x is not None])
+                return None if ret is None else int(ret if not isinstance(ret, list) else ret[0])
+
+            self._cnt_calls += 1
+            try:
+                ret_len = self._xfer(Chaino._view(Chaino._tx_views, Chaino._tx, n))
+            except Exception:
+                self._cnt_errors += 1
+                raise
+            rx = Chaino._rx
+            if rx[2] != 83: # 'S'가 아니면 (예: 'F') 일반 경로로 해석하여 예외를 발생시킨다
+                self._cnt_errors += 1
+                return self._parse_response(bytes(rx[2:ret_len]))
+            i = 4 # crc(2) 'S' {RS} 다음
+            if i >= ret_len or rx[i] == 0x1e: return None
+            neg = rx[i] == 45
+            if neg: i += 1
+            v = 0
+            while i < ret_len and rx[i] != 0x1e:
+                ch = rx[i] - 48
+                if not (0 <= ch <= 9):
+                    raise ValueError(f"Not an integer response(addr:0x{self._addr:02x})")
+                v = v * 10 + ch
+                i += 1
+            return -v if neg else v
+
+
+        def _encode_ints(self, func_num: int, a, b, c, d) -> int:
+            # [crc:2byte]FN{RS}a{RS}b.. 를 송신 버퍼에 직접 쓰고 길이를 반환한다. 쓸 수 없으면 -1
+            tx = Chaino._tx
+            i = 2
+            if func_num >= 16:
+                tx[i] = _HEX[func_num >> 4]
+                i += 1
+            tx[i] = _HEX[func_num & 15]
+            i += 1
+            # (a, b, c, d) tuple을 만들면 할당이 일어나므로 하나씩 쓴다
+            i = _put_arg(tx, _put_arg(tx, _put_arg(tx, _put_arg(tx, i, a), b), c), d)
+            if i < 0: return -1
+            crc = crc_hqx_range(tx, 2, i, 0)
+            tx[0] = crc >> 8
+            tx[1] = crc & 0xFF
+            return i
+
+
+        def _transact(self, packet: bytes, func_num=None) -> bytes:
+            # packet을 I2C로 송신하고 CRC 검사를 거친 응답 패킷에서 crc를 뗀 나머지를 반환
+            # (호출/오류 수만 센다. 지연시간은 할당이 생기므로 재지 않는다)
+            self._cnt_calls += 1
+            try:
+                ret_len = self._xfer(packet)
+            except Exception:
+                self._cnt_errors += 1
+                raise
+            if Chaino._rx[2] == 70: self._cnt_errors += 1 # 'F': 함수 실행 실패
+            return bytes(Chaino._view(Chaino._rx_views, Chaino._rx, ret_len)[2:])
+
+
+        def _send(self, packet):
+            # 요청 packet을 보낸다. 쓰기 오류는 쓰기만 다시 시도한다
             for attempt in range(Chaino._MAX_RETRIES):
+                if attempt: self._cnt_retries += 1
                 try:
-                    Chaino._Wire1.writeto(addr, packet)
-                    buf = Chaino._Wire1.readfrom(addr, 3)
+                    self._bus.writeto(self._addr, packet)
+                    self._cnt_bytes_tx += len(packet)
+                    return
                 except OSError:
-                    if attempt == Chaino._MAX_RETRIES - 1:
-                        raise Exception(f"Slave(addr:0x{addr:02x}) write error")
-                    continue
+                    self._cnt_timeouts += 1
+            raise Exception(f"Slave(addr:0x{self._addr:02x}) write error")
 
-                header, ret_len, rx_ck = buf[0], buf[1], buf[2]
-                calc_ck = (~(header + ret_len)) & 0xFF
 
-                # (a) 슬레이브가 'E' 알림 보냄  (b) 체크섬 불일치 → 재시도
-                if header == ord('E') or rx_ck != calc_ck:
-                    if attempt == Chaino._MAX_RETRIES - 1:
-                        why = "crc error" if header == ord('E') else "checksum mismatch"
-                        raise Exception(f"Slave(addr:0x{addr:02x}) header invalid: {why}")
-                    continue
+        def _xfer(self, packet) -> int:
+            # packet을 송신하고 응답을 공유 수신 버퍼(_rx)에 받는다. 응답 길이(crc 포함)를 반환
+            # 실패한 단계만 다시 한다: 슬레이브의 'E'는 요청을 다시 보내고, 응답의 CRC 오류는 다시 읽기만 한다
+            addr, bus, single = self._addr, self._bus, self._single_read
+            hdr, rx = Chaino._hdr, Chaino._rx
+            self._send(packet)
 
-            
+            ret_len = 0 # 0: 아직 올바른 header를 받지 못했다
+            why = "retry limit exceeded"
             for attempt in range(Chaino._MAX_RETRIES):
+                if attempt: self._cnt_retries += 1
                 try:
-                    packet_ret = Chaino._Wire1.readfrom(addr, ret_len)
+                    if single: # header와 응답을 한 번의 read로 받는다 (응답은 매번 처음부터 다시 보내진다)
+                        n = self._rd_len
+                        bus.readfrom_into(addr, Chaino._view(Chaino._frame_views, Chaino._frame, 3 + n))
+                        self._cnt_bytes_rx += 3 + n
+                        if hdr[1] > n and hdr[2] == (~(hdr[0] + hdr[1])) & 0xFF: # 예상보다 긴 응답
+                            n = self._rd_len = hdr[1]
+                            bus.readfrom_into(addr, Chaino._view(Chaino._frame_views, Chaino._frame, 3 + n))
+                            self._cnt_bytes_rx += 3 + n
+                    elif not ret_len:
+                        bus.readfrom_into(addr, hdr)
+                        self._cnt_bytes_rx += 3
                 except OSError:
-                    if attempt == Chaino._MAX_RETRIES - 1:
-                        raise Exception(f"Slave(addr:0x{addr:02x}) read error")
+                    why = "read error"
+                    self._cnt_timeouts += 1
+                    if not single and not ret_len: self._send(packet) # header 단계는 요청부터 다시 한다
                     continue
 
-                is_crc_ok = is_crc_matched(packet_ret)
-                if not is_crc_ok:
-                    if attempt == Chaino._MAX_RETRIES - 1:
-                        raise Exception(f"Received packet from slave(addr:0x{addr:02x}) CRC error")
+                if single or not ret_len:
+                    header = hdr[0]
+                    if header == 69: # 'E': 슬레이브가 받은 요청이 깨졌다 → 다시 보낸다
+                        why = "header invalid: crc error"
+                        self._cnt_wrt_crc_err += 1
+                        self._send(packet)
+                        continue
+                    if hdr[2] != (~(header + hdr[1])) & 0xFF:
+                        why = "header invalid: checksum mismatch"
+                        self._cnt_rd_crc_err += 1
+                        if not single: self._send(packet) # 2번 읽는 방식은 header를 다시 읽을 수 없다
+                        continue
+                    ret_len = hdr[1]
+
+                if not single:
+                    try:
+                        bus.readfrom_into(addr, Chaino._view(Chaino._rx_views, rx, ret_len))
+                        self._cnt_bytes_rx += ret_len
+                    except OSError:
+                        why = "read error"
+                        self._cnt_timeouts += 1
+                        continue
+
+                if ret_len <= 2 or (rx[0] << 8 | rx[1]) != crc_hqx_range(rx, 2, ret_len, 0):
+                    why = "received packet CRC error" # 응답만 다시 읽는다
+                    self._cnt_rd_crc_err += 1
                     continue
-                
-                if packet_ret[2] == ord('S'): #성공
-                    return self._parse_response(packet_ret[2:])
-                else: #'S'가 아니면 'F'임
-                    raise Exception(f"Fail to execute function#{func_num} at the slave(0x{addr:02x})")
 
-            # 여기 오면 모두 실패
-            raise Exception("Slave(addr:0x{addr:02x}) Retry limit exceeded")
+                return ret_len # 'S'/'F' 판단은 _parse_response에서 한다
+
+            raise Exception(f"Slave(addr:0x{addr:02x}) {why}")
     
 
 ########################################################################
@@ -0,0 +1,587 @@
+"""
+Software emulator of a Chaino master and its I2C slaves
+=======================================================
+
+This module emulates a Chaino master board (and any number of I2C slave
+boards behind it) running the Chaino_Hana firmware. The emulator speaks the
+exact serial frame protocol - CRC16-XMODEM, the 'R'/'Q'/'B' requests, the
+'S'/'F'/'E' responses and the resend frames - and exposes itself on a
+pseudo-terminal, so :class:`~chaino.chaino.Chaino` can open it like real
+hardware. Per-byte latency, baud rate and error injection are configurable,
+which makes benchmarks and tests reproducible on a machine without boards.
+
+The pseudo-terminal requires a POSIX system (Linux, macOS).
+
+Usage:
+------
+.. code-block:: python
+
+    from chaino import Hana
+    from chaino.emulator import ChainoEmulator
+
+    with ChainoEmulator(slaves=[0x41], baudrate=460800) as emu:
+        emu.device(0x41).adc[26] = 512
+        hana = Hana(emu.port, 0x41)
+        print(hana.read_analog(26))   # 512
+"""
+import os
+import random
+import select
+import struct
+import threading
+import time
+import tty
+
+from .chaino import (
+    RS, bRS, bGS, PACKET_RQ_RESEND, _FrameDecoder, _stuff, _unstuff,
+    decode_typed, encode_typed, gen_CRC16_XMODEM, is_crc_matched, map_args,
+)
+from .capture import TX, RX, Capture
+
+
+class EmulatedDevice:
+    """
+    The state and the function table of one emulated Chaino_Hana board.
+
+    The pin state is kept in plain dicts that can be read and modified from
+    the test code, e.g. ``dev.adc[26] = 1000`` or ``dev.inputs[2] = 1``.
+
+    :param addr: The I2C address of the board (0 for the master).
+    :type addr: int
+    :param name: The name answered by ``who()``.
+    :type name: str
+    :param version: The string answered by ``get_version()``.
+    :type version: str
+    """
+
+    def __init__(self, addr: int, name: str = "Chaino_Hana",
+                 version: str = "Chaino_Hana Firmware v0.9.4"):
+        self.addr = addr
+        self.name = name
+        self.version = version
+        self.stored_addr = addr # EEPROM에 저장된 주소 (리셋 후 적용)
+        self.outputs = {}   # pin -> 0/1 (출력으로 설정된 핀)
+        self.inputs = {}    # pin -> 0/1 (외부에서 입력되는 값)
+        self.pulls = {}     # pin -> "up"/"down"
+        self.adc = {}       # pin -> raw value
+        self.adc_bits = 10
+        self.pwm_duty = {}  # pin -> duty
+        self.pwm_freq = {}  # pin -> Hz
+        self.pwm_bits = 8
+        self.tones = {}     # pin -> (freq, duration_ms)
+        self.neopixel = (0, 0, 0)
+        self.caps = ["pipeline", "batch", "binary", "stream", "pins", "analogs",
+                     "sequence", "melody"] # identity()로 알려주는 지원 기능들
+        self.adc_source = None  # 스트리밍용 파형: adc_source(pin, t_sec) -> raw value
+        self.specs = []     # load_functions()로 알려주는 함수 선언들 (register()의 spec)
+        self._emit = None       # 요청 없이 패킷을 보내는 함수 (ChainoEmulator가 설정)
+        self._stream_stop = None
+        self.melody = []    # (freq, duration_ms), freq 0은 쉼표
+        self._melody_stop = {} # pin -> Event
+        self.sequence = []  # (time_us, op, pin, value)
+        self._seq_stop = None
+        self._seq_thread = None
+        self._t0 = time.monotonic()
+        self._funcs = {
+            0: lambda *args: "ImChn", # 인수는 무시한다
+            10: self._set_high, 11: self._set_low, 12: self._is_high,
+            13: self._read_analog, 14: self._set_adc_bits,
+            15: self._pull_up, 16: self._pull_down, 17: self._pull_clear,
+            18: self._read_pins, 19: self._write_pins, 20: self._read_analogs,
+            21: self._write_analog, 22: self._set_pwm_freq, 23: self._set_pwm_bits,
+            31: self._millis,
+            41: self._start_tone, 42: self._stop_tone,
+            43: self._load_melody, 44: self._play_melody,
+            51: self._start_stream, 52: self._stop_stream,
+            61: self._load_sequence, 62: self._start_sequence,
+            63: self._stop_sequence, 64: lambda: int(self._seq_playing()),
+            201: lambda: self.name, 202: lambda: self.version, 203: lambda: self.addr,
+            204: self._set_addr, 205: self._set_neopixel,
+            206: lambda mode: 1, # 바이너리(typed) 인코딩 지원
+            207: lambda: (self.name, self.version, self.addr, *self.caps),
+            208: lambda: tuple(self.specs),
+        }
+
+
+    def register(self, func_num: int, func, spec: str = None):
+        """
+        Registers (or replaces) a function of the emulated firmware.
+
+        ``func`` receives the arguments as ``str`` (already typed values for
+        binary-mode frames) and returns ``None``, a value
+        or a tuple of values. An exception raised by ``func`` is answered as a
+        function execution failure ('F'). If ``spec`` is given (e.g.,
+        ``"add(a:int, b:int) -> int"``), the function is advertised in the
+        function table read by :meth:`~chaino.chaino.Chaino.load_functions`.
+        """
+        self._funcs[func_num] = func
+        if spec is not None:
+            self.specs.append(f"{func_num} {spec}")
+
+
+    def call(self, func_num: int, args, typed: bool = False) -> bytes:
+        # 함수를 실행하여 'S'{RS}ret.. ('T'ret.. ) 또는 'F'{RS}err_msg 응답 payload를 만든다
+        func = self._funcs.get(func_num)
+        if func is None:
+            return f"F{RS}Unknown function#{func_num}".encode()
+        try:
+            ret = func(*args)
+        except Exception as e:
+            return f"F{RS}{e}".encode()
+        if ret is None: ret = ()
+        elif not isinstance(ret, (tuple, list)): ret = (ret,)
+        if typed:
+            return b'T' + _stuff(b''.join(encode_typed(x) for x in ret))
+        return RS.join(["S"] + [map_args(x) for x in ret]).encode()
+
+
+    # Chaino_Hana 펌웨어 함수들 ---------------------------------------------
+    def _set_high(self, pin): self.outputs[int(pin)] = 1
+    def _set_low(self, pin): self.outputs[int(pin)] = 0
+
+    def _is_high(self, pin):
+        pin = int(pin)
+        if pin in self.outputs: return self.outputs[pin]
+        if pin in self.inputs: return self.inputs[pin]
+        return 1 if self.pulls.get(pin) == "up" else 0
+
+    def _read_pins(self, mask):
+        mask, levels = int(mask), 0
+        for pin in range(32):
+            if mask >> pin & 1 and self._is_high(pin): levels |= 1 << pin
+        return levels
+
+    def _write_pins(self, set_mask, clr_mask):
+        set_mask, clr_mask = int(set_mask), int(clr_mask)
+        for pin in range(32):
+            if set_mask >> pin & 1: self.outputs[pin] = 1
+            elif clr_mask >> pin & 1: self.outputs[pin] = 0
+
+    def _read_analog(self, pin):
+        return min(self.adc.get(int(pin), 0), (1 << self.adc_bits) - 1)
+
+    def _read_analogs(self, samples, *pins):
+        t = time.monotonic() - self._t0
+        vals = [self._sample(int(pin), t) for _ in range(int(samples)) for pin in pins]
+        return struct.pack(f'>{len(vals)}H', *vals).hex()
+
+    def _set_adc_bits(self, bits): self.adc_bits = int(bits)
+
+    def _pull_up(self, pin):
+        self.outputs.pop(int(pin), None); self.pulls[int(pin)] = "up"
+
+    def _pull_down(self, pin):
+        self.outputs.pop(int(pin), None); self.pulls[int(pin)] = "down"
+
+    def _pull_clear(self, pin):
+        self.outputs.pop(int(pin), None); self.pulls.pop(int(pin), None)
+
+    def _write_analog(self, pin, duty): self.pwm_duty[int(pin)] = int(duty)
+    def _set_pwm_freq(self, pin, freq): self.pwm_freq[int(pin)] = int(freq)
+    def _set_pwm_bits(self, bits): self.pwm_bits = int(bits)
+
+    def _millis(self):
+        return int((time.monotonic() - self._t0) * 1000) & 0xFFFFFFFF
+
+    def _start_tone(self, pin, freq, duration):
+        self.tones[int(pin)] = (int(freq), int(duration))
+
+    def _stop_tone(self, pin):
+        pin = int(pin)
+        self.tones.pop(pin, None)
+        stop = self._melody_stop.pop(pin, None)
+        if stop is not None: stop.set()
+
+    def _load_melody(self, index, hex_notes):
+        index = int(index)
+        if index == 0: self.melody = []
+        elif index != len(self.melody):
+            raise ValueError(f"Melody index mismatch: {index} != {len(self.melody)}")
+        raw = bytes.fromhex(hex_notes)
+        self.melody += [struct.unpack_from('>HH', raw, i) for i in range(0, len(raw), 4)]
+
+    def _play_melody(self, pin, loops):
+        pin = int(pin)
+        self._stop_tone(pin)
+        stop = self._melody_stop[pin] = threading.Event()
+        threading.Thread(target=self._run_melody, daemon=True,
+                         args=(stop, pin, list(self.melody), int(loops))).start()
+
+    def _run_melody(self, stop, pin, notes, loops):
+        n = 0
+        while loops == 0 or n < loops:
+            for freq, ms in notes:
+                if freq: self.tones[pin] = (freq, ms)
+                else: self.tones.pop(pin, None)
+                if stop.wait(ms / 1000): return
+            n += 1
+        self.tones.pop(pin, None)
+        if self._melody_stop.get(pin) is stop: del self._melody_stop[pin]
+
+    def _set_addr(self, new_addr):
+        new_addr = int(new_addr)
+        if not (0x08 <= new_addr <= 0x77):
+            raise ValueError("I2C address must be in the range of 0x08~0x77")
+        self.stored_addr = new_addr
+        return f"I2C address is changed to 0x{new_addr:02x}. Reset the device."
+
+    def _set_neopixel(self, r, g, b):
+        self.neopixel = (int(r), int(g), int(b))
+
+    def _start_stream(self, rate_hz, block_size, *pins):
+        self._stop_stream()
+        self._stream_stop = threading.Event()
+        threading.Thread(target=self._run_stream, daemon=True,
+                         args=(self._stream_stop, int(rate_hz), int(block_size),
+                               [int(p) for p in pins])).start()
+
+    def _stop_stream(self):
+        if self._stream_stop is not None:
+            self._stream_stop.set()
+            self._stream_stop = None
+
+    def _load_sequence(self, index, hex_steps):
+        index = int(index)
+        if index == 0: self.sequence = []
+        elif index != len(self.sequence): # 중복/누락된 조각
+            raise ValueError(f"Sequence index mismatch: {index} != {len(self.sequence)}")
+        raw = bytes.fromhex(hex_steps)
+        self.sequence += [struct.unpack_from('>IBBI', raw, i) for i in range(0, len(raw), 10)]
+
+    def _start_sequence(self, loops, period_us):
+        self._stop_sequence()
+        self._seq_stop = threading.Event()
+        self._seq_thread = threading.Thread(
+            target=self._run_sequence, daemon=True,
+            args=(self._seq_stop, list(self.sequence), int(loops), int(period_us)))
+        self._seq_thread.start()
+
+    def _stop_sequence(self):
+        if self._seq_stop is not None:
+            self._seq_stop.set()
+            self._seq_stop = None
+
+    def _seq_playing(self):
+        return self._seq_thread is not None and self._seq_thread.is_alive()
+
+    def _run_sequence(self, stop, steps, loops, period_us):
+        if not steps: return
+        period = (period_us or steps[-1][0]) / 1e6
+        ops = (self._set_low, self._set_high, self._write_analog, self._set_pwm_freq)
+        start, n = time.monotonic(), 0
+        while loops == 0 or n < loops:
+            for time_us, op, pin, value in steps:
+                delay = start + n * period + time_us / 1e6 - time.monotonic()
+                if stop.wait(delay) if delay > 0 else stop.is_set(): return
+                if op < 2: ops[op](pin)
+                else: ops[op](pin, value)
+            n += 1
+
+    def _sample(self, pin, t):
+        if self.adc_source is not None: raw = int(self.adc_source(pin, t))
+        else: raw = self.adc.get(pin, 0)
+        return max(0, min(raw, (1 << self.adc_bits) - 1))
+
+    def _run_stream(self, stop, rate_hz, block_size, pins):
+        # D seq(2byte) t0_us(4byte) val(2byte)*(block_size*len(pins)) 를 블록마다 보낸다
+        period = 1.0 / rate_hz
+        start, n, seq = time.monotonic(), 0, 0
+        while not stop.is_set():
+            t0 = start + n * period
+            delay = t0 + block_size * period - time.monotonic() # 블록이 다 채워지는 시각
+            if delay > 0: time.sleep(delay)
+            if stop.is_set() or self._emit is None: break
+            vals = [self._sample(pin, t0 + i * period) for i in range(block_size) for pin in pins]
+            t0_us = int((t0 - self._t0) * 1e6) & 0xFFFFFFFF
+            data = struct.pack('>HI', seq, t0_us) + struct.pack(f'>{len(vals)}H', *vals)
+            self._emit(b'D' + _stuff(data))
+            seq = (seq + 1) & 0xFFFF
+            n += block_size
+
+
+
+class ChainoEmulator:
+    """
+    An emulated Chaino master with I2C slaves, served on a pseudo-terminal.
+
+    :param slaves: The I2C addresses of the emulated slave boards, or a dict of
+                   ``{addr: EmulatedDevice}`` for customized boards.
+    :param master_addr: The I2C address of the master board itself.
+    :type master_addr: int
+    :param baudrate: If given, every byte written back is delayed by the time
+                     it would take on a UART at this baud rate (10 bits/byte).
+    :type baudrate: int | None
+    :param byte_latency: An additional delay (seconds) per response byte.
+    :type byte_latency: float
+    :param response_delay: A fixed processing delay (seconds) per request frame.
+    :type response_delay: float
+    :param rx_error_rate: The probability that a received frame is treated as
+                          corrupted (answered with 'E').
+    :type rx_error_rate: float
+    :param tx_error_rate: The probability that a byte of a response frame is
+                          corrupted on the way back (host sees a CRC error).
+    :type tx_error_rate: float
+    :param drop_rate: The probability that a request frame is silently lost.
+    :type drop_rate: float
+    :param seed: The seed of the random generator used for error injection.
+
+    .. code-block:: python
+
+        emu = ChainoEmulator(slaves=[0x41, 0x42], tx_error_rate=0.01, seed=1)
+        emu.start()
+        master = Chaino(emu.port)
+        ...
+        emu.stop()
+    """
+
+    _SEQ_CACHE = 256 # 순번별로 보관하는 마지막 응답의 수
+
+    def __init__(self, slaves=(), master_addr: int = 0x40, baudrate: int = None,
+                 byte_latency: float = 0.0, response_delay: float = 0.0,
+                 rx_error_rate: float = 0.0, tx_error_rate: float = 0.0,
+                 drop_rate: float = 0.0, seed=None):
+        self.master = EmulatedDevice(master_addr)
+        if isinstance(slaves, dict):
+            self.slaves = dict(slaves)
+        else:
+            self.slaves = {addr: EmulatedDevice(addr) for addr in slaves}
+        self.baudrate = baudrate
+        self.byte_latency = byte_latency
+        self.response_delay = response_delay
+        self.rx_error_rate = rx_error_rate
+        self.tx_error_rate = tx_error_rate
+        self.drop_rate = drop_rate
+        self._rand = random.Random(seed)
+        self._wlock = threading.Lock() # 스트리밍 스레드와 응답이 섞이지 않도록
+        for dev in [self.master] + list(self.slaves.values()):
+            dev._emit = lambda payload: self._send(payload, remember=False)
+        self._fd = None
+        self._slave_fd = None
+        self._thread = None
+        self._running = False
+        self._last_response = b''
+        self._seq_responses = {} # seq -> (request packet, response frame)
+        self._seq_newest = None  # 마지막으로 새로 실행한 순번
+        self.port = None
+        self.cnt_frames = 0
+
+
+    def device(self, addr: int) -> EmulatedDevice:
+        """Returns the emulated board at ``addr`` (0 or the master address for the master)."""
+        if addr == 0 or addr == self.master.addr:
+            return self.master
+        return self.slaves[addr]
+
+
+    def start(self) -> str:
+        """Opens the pseudo-terminal, starts serving and returns its path."""
+        self._fd, self._slave_fd = os.openpty()
+        tty.setraw(self._fd)
+        tty.setraw(self._slave_fd)
+        self.port = os.ttyname(self._slave_fd)
+        self._running = True
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+        return self.port
+
+
+    def stop(self):
+        """Stops serving and closes the pseudo-terminal."""
+        self._running = False
+        for dev in [self.master] + list(self.slaves.values()):
+            dev._stop_stream()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        for fd in (self._fd, self._slave_fd):
+            if fd is not None: os.close(fd)
+        self._fd = self._slave_fd = None
+
+
+    def __enter__(self):
+        self.start()
+        return self
+
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+
+    def _serve(self):
+        decoder = _FrameDecoder()
+        while self._running:
+            ready, _, _ = select.select([self._fd], [], [], 0.05)
+            if not ready: continue
+            try:
+                data = os.read(self._fd, 4096)
+            except OSError:
+                break
+            for packet in decoder.feed(data):
+                self._on_packet(packet)
+
+
+    def _send(self, payload: bytes, remember: bool = True):
+        frame = gen_CRC16_XMODEM(payload) + payload
+        if remember: # 'E'도 기억해야 재전송 요청에 엉뚱한 응답을 보내지 않는다
+            self._last_response = frame
+        wire = bytearray(frame)
+        if self.tx_error_rate and self._rand.random() < self.tx_error_rate:
+            idx = self._rand.randrange(2, len(wire)) # crc 이후의 한 바이트를 오염시킨다
+            wire[idx] ^= 0x01 if wire[idx] == 0x24 else 0x20 # {EOT}가 생기지 않도록
+        self._write(bytes(wire) + b'\x04')
+
+
+    def _write(self, data: bytes):
+        delay = self.byte_latency * len(data)
+        if self.baudrate: delay += len(data) * 10 / self.baudrate
+        with self._wlock:
+            if delay: time.sleep(delay)
+            os.write(self._fd, data)
+
+
+    def _target(self, addr: int):
+        if addr == 0 or addr == self.master.addr: return self.master
+        return self.slaves.get(addr)
+
+
+    def _exec(self, addr: int, func_num: int, args, typed: bool = False) -> bytes:
+        dev = self._target(addr)
+        if dev is None:
+            return f"F{RS}No slave device at 0x{addr:02x}".encode()
+        return dev.call(func_num, args, typed)
+
+
+    def _on_packet(self, packet: bytes):
+        self.cnt_frames += 1
+        if self.drop_rate and self._rand.random() < self.drop_rate:
+            return
+        if self.response_delay: time.sleep(self.response_delay)
+
+        if packet == PACKET_RQ_RESEND: # 마지막 응답을 다시 보낸다
+            self._write(self._last_response + b'\x04')
+            return
+        corrupted = self.rx_error_rate and self._rand.random() < self.rx_error_rate
+        if corrupted or not is_crc_matched(packet):
+            self._send(b'E')
+            return
+
+        payload = packet[2:]
+        header = payload[:1]
+        if header == b'R':   # R{RS}AD{RS}FN{RS}args
+            parts = [x.decode() for x in payload.split(bRS)]
+            self._send(self._exec(int(parts[1], 16), int(parts[2], 16), parts[3:]))
+
+        elif header == b'Q': # Q{RS}SQ{RS}AD{RS}FN{RS}args
+            parts = [x.decode() for x in payload.split(bRS)]
+            seq = int(parts[1], 16)
+            cached = self._seq_responses.get(seq)
+            # 순번은 차례로 쓰이고 pipeline의 depth는 128 이하이므로, 마지막 순번보다 1~128 앞선
+            # 순번은 새 요청이다 (한 바퀴 돌아 같은 요청이 와도 다시 실행한다).
+            # 그 밖의 순번으로 같은 요청이 다시 왔다면 재전송이므로 다시 실행하지 않는다.
+            is_new = self._seq_newest is None or 0 < (seq - self._seq_newest) & 0xFF <= 128
+            if not is_new and cached is not None and cached[0] == packet:
+                self._write(cached[1] + b'\x04')
+                return
+            if is_new:
+                if self._seq_newest is not None: # 건너뛴 순번(잃어버린 요청)의 이전 응답은 버린다
+                    k = (self._seq_newest + 1) & 0xFF
+                    while k != seq:
+                        self._seq_responses.pop(k, None)
+                        k = (k + 1) & 0xFF
+                self._seq_newest = seq
+            resp = f"Q{RS}{seq:02x}{RS}".encode() + self._exec(int(parts[2], 16), int(parts[3], 16), parts[4:])
+            self._send(resp)
+            self._seq_responses[seq] = (packet, self._last_response)
+
+        elif header == b'T': # T AD FN typed_args.. (바이너리 모드)
+            data = _unstuff(payload[1:])
+            self._send(self._exec(data[0], data[1], decode_typed(data[2:]), typed=True))
+
+        elif header == b'e': # e{RS}SQ : 순번 SQ의 응답 재전송
+            cached = self._seq_responses.get(int(payload[2:4], 16))
+            if cached is not None: self._write(cached[1] + b'\x04')
+            else: self._send(b'E')
+
+        elif header == b'B': # B{RS}AD{GS}FN{RS}args{GS}...
+            subs = payload.split(bGS)
+            addr = int(subs[0][2:], 16)
+            results = [b'B']
+            for sub in subs[1:]:
+                parts = [x.decode() for x in sub.split(bRS)]
+                results.append(self._exec(addr, int(parts[0], 16), parts[1:]))
+            self._send(bGS.join(results))
+
+        else:
+            self._send(f"F{RS}Unknown header {header!r}".encode())
+
+
+
+class CaptureReplayer(ChainoEmulator):
+    """
+    An emulated Chaino master that answers from a capture.
+
+    Each request frame from the host is matched with the next recorded
+    request; if it is the same, the responses recorded after it are sent
+    back (a recorded timeout sends nothing, so the host times out and
+    retries just like it did in the field). Requests that do not match,
+    such as the handshake of a new connection, are answered by the emulated
+    devices of :class:`ChainoEmulator`.
+
+    :param capture: A capture read by :func:`~chaino.capture.read_capture`.
+    :type capture: chaino.capture.Capture
+    :param realtime: If ``True``, each response is delayed as recorded.
+                     Otherwise the responses are sent at once (throughput).
+    :type realtime: bool
+    :param kwargs: Passed to :class:`ChainoEmulator`
+                   (e.g., ``slaves``).
+
+    .. code-block:: python
+
+        cap = read_capture("link.cap")
+        with CaptureReplayer(cap, slaves=[0x41]) as rep:
+            hana = Hana(rep.port, 0x41)
+            ...
+            print(rep.cnt_replayed, rep.cnt_unmatched)
+    """
+
+    def __init__(self, capture: Capture, realtime: bool = False, **kwargs):
+        super().__init__(**kwargs)
+        self.capture = capture
+        self.realtime = realtime
+        self._pos = 0 # 다음에 비교할 record의 위치
+        self.cnt_replayed = 0  # capture로 응답한 요청의 수
+        self.cnt_unmatched = 0 # 에뮬레이터가 응답한 요청의 수
+
+
+    def done(self) -> bool:
+        """Returns ``True`` if all the recorded requests have been replayed."""
+        return self._next_request(self._pos) is None
+
+
+    def _next_request(self, pos: int):
+        records = self.capture.records
+        while pos < len(records) and records[pos].direction != TX:
+            pos += 1
+        return pos if pos < len(records) else None
+
+
+    def _on_packet(self, packet: bytes):
+        records = self.capture.records
+        pos = self._next_request(self._pos)
+        if pos is None or records[pos].frame != packet:
+            self.cnt_unmatched += 1
+            super()._on_packet(packet)
+            return
+
+        self.cnt_frames += 1
+        self.cnt_replayed += 1
+        pos += 1
+        while pos < len(records) and records[pos].direction != TX:
+            rec = records[pos]
+            if self.realtime: # 앞의 record부터의 시간만큼 기다린다
+                time.sleep(rec.time - records[pos - 1].time)
+            if rec.direction == RX and rec.frame:
+                self._write(rec.frame + b'\x04')
+            pos += 1
+        self._pos = pos
@@ -45,13 +45,30 @@ MicroPython Usage:
         time.sleep(0.5)
         hana.set_neopixel(0,0,0)
         time.sleep(0.5)
+
+    # The pins of the board running the script (no I2C communication)
+    local = Hana(0)
+    local.write_analog(9, local.read_analog(26) >> 2)
 """
 import sys, time
+import struct
+
+IS_CPYTHON = (sys.implementation.name == "cpython")
 
 try:
-    from .chaino import Chaino  # when loading package
+    import numpy as _np # 없으면 list로 반환한다 (micropython 포함)
 except ImportError:
-    from chaino import Chaino   # when executing directly
+    _np = None
+
+try:
+    from threading import Lock as _Lock
+except ImportError: # micropython
+    from _thread import allocate_lock as _Lock
+
+try:
+    from .chaino import Chaino, is_crc_matched, _unstuff, device_functions  # when loading package
+except ImportError:
+    from chaino import Chaino, is_crc_matched, _unstuff, device_functions   # when executing directly
 
 
 _PITCHES = {
@@ -117,14 +134,214 @@ _NOTES = {
 }
 
 
-class _HanaBase:
-    # A mixin class providing common hardware control methods for a Chaino_Hana board.
-    # This class is not intended to be instantiated directly.
-    
-
-    #☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷
-    def set_high(self, pin: int):
-        """
+def _note_freq(note) -> int:
+    # 'c4', 'a#5', 'do' 같은 음 이름 또는 주파수(Hz)를 주파수로 바꾼다
+    if isinstance(note, str):
+        note_lower = note.lower()
+        if note_lower in _PITCHES: return _PITCHES[note_lower]
+        if note_lower in _NOTES: return _NOTES[note_lower]
+        raise ValueError(f"Unknown note: {note}.")
+    return note
+
+
+_MML_SEMITONES = {"c": 0, "d": 2, "e": 4, "f": 5, "g": 7, "a": 9, "b": 11}
+
+
+def _parse_mml(mml: str, tempo: int):
+    # MML 문자열을 (freq, beats) 들로 바꾼다. 쉼표는 freq 0
+    # T<bpm> O<octave> L<len> < > 과 음표 c d e f g a b (#,+,- 와 길이, 점), 쉼표 r 을 지원한다
+    mml = mml.lower()
+    notes, octave, length, i = [], 4, 4, 0
+
+    def number(i):
+        j = i
+        while j < len(mml) and mml[j].isdigit(): j += 1
+        return (int(mml[i:j]) if j > i else None), j
+
+    while i < len(mml):
+        ch = mml[i]; i += 1
+        if ch in " \t\n|,": continue
+        if ch == "<": octave -= 1; continue
+        if ch == ">": octave += 1; continue
+        if ch in "tol":
+            val, i = number(i)
+            if val is None: raise ValueError(f"MML: '{ch}' needs a number.")
+            if ch == "t": tempo = val
+            elif ch == "o": octave = val
+            else: length = val
+            continue
+        if ch not in _MML_SEMITONES and ch != "r":
+            raise ValueError(f"MML: unexpected '{ch}' at {i - 1}.")
+        semi = _MML_SEMITONES.get(ch)
+        while i < len(mml) and mml[i] in "#+-":
+            semi = semi + (-1 if mml[i] == "-" else 1) if semi is not None else None
+            i += 1
+        val, i = number(i)
+        beats = 4 / (val or length)
+        while i < len(mml) and mml[i] == ".":
+            beats *= 1.5; i += 1
+        freq = 0 if semi is None else round(440 * 2 ** (((octave + 1) * 12 + semi - 69) / 12))
+        notes.append((freq, beats * 120 / tempo)) # 박자를 tempo 120 기준으로 맞춘다
+    return notes
+
+
+_MELODY_NOTES_PER_CALL = 30 # 음 하나는 4byte(16진수 8문자)
+
+
+def _pins_mask(pins) -> int:
+    # 핀 번호들을 비트마스크로 만든다
+    mask = 0
+    for pin in pins: mask |= 1 << pin
+    return mask
+
+
+def _levels_masks(levels: dict) -> tuple:
+    # {pin: level} 을 write_pins(19)의 (set_mask, clr_mask) 로 만든다
+    set_mask = clr_mask = 0
+    for pin, level in levels.items():
+        if level: set_mask |= 1 << pin
+        else: clr_mask |= 1 << pin
+    return set_mask, clr_mask
+
+
+def _decode_pins(levels, pins) -> dict:
+    # read_pins(18)의 응답 비트마스크를 {pin: True/False} 로 만든다
+    levels = int(levels)
+    return {pin: bool(levels >> pin & 1) for pin in pins}
+
+
+def _table_calls(chunks: list, width: int) -> tuple:
+    # 표 조각들을 (시작 index, 조각) 호출 인자들로 만들고 전체 항목 수와 함께 반환한다
+    # 장치는 index 0을 받으면 이전 표를 지운다
+    calls, index = [], 0
+    for chunk in chunks:
+        calls.append((index, chunk))
+        index += len(chunk) // width
+    return calls, index
+
+
+def _melody_ms(chunks: list) -> int:
+    # 멜로디 조각들(>HH freq, duration_ms)의 전체 재생 시간
+    return sum(int(c[i + 4:i + 8], 16) for c in chunks for i in range(0, len(c), 8))
+
+
+def _compile_melody(notes, tempo: int) -> list:
+    # 음들을 >HH (freq, duration_ms) 로 묶은 16진수 문자열 조각들로 만든다
+    if isinstance(notes, str):
+        notes, tempo = _parse_mml(notes, tempo), 120
+    packed = []
+    for note in notes:
+        note, beats = note if isinstance(note, (tuple, list)) else (note, 1)
+        freq = 0 if note in (None, "r", "R") else _note_freq(note)
+        ms = round(60000 / tempo * beats)
+        if not (0 <= freq <= 0xFFFF and 0 < ms <= 0xFFFF):
+            raise ValueError(f"Note out of range: {note} ({freq}Hz, {ms}ms).")
+        packed.append(struct.pack('>HH', freq, ms).hex())
+    n = _MELODY_NOTES_PER_CALL
+    return [''.join(packed[i:i + n]) for i in range(0, len(packed), n)]
+
+
+_ADC_VALUES_PER_CALL = 60 # 한 번의 함수실행(패킷)으로 받는 최대 ADC 값의 수
+
+
+def _adc_calls(pins: list, samples: int) -> list:
+    # read_analogs(20)의 호출마다 읽을 샘플 수들. 한 호출은 60개 값까지 돌려준다
+    if not 0 < len(pins) <= _ADC_VALUES_PER_CALL: # 한 샘플의 값들은 한 호출에 들어가야 한다
+        raise ValueError(f"read_analogs() takes 1~{_ADC_VALUES_PER_CALL} pins, got {len(pins)}.")
+    per_call = _ADC_VALUES_PER_CALL // len(pins) # 호출당 샘플 수
+    return [min(per_call, samples - i) for i in range(0, samples, per_call)]
+
+
+def _decode_adc_hex(chunks: list, n_pins: int, as_array: bool):
+    # 각 조각은 big-endian uint16 값들의 16진수 문자열. 샘플 순서(s0p0 s0p1 .. s1p0 ..)로 들어있다
+    raw = b''.join(bytes.fromhex(c) for c in chunks)
+    if as_array and _np is not None:
+        return _np.frombuffer(raw, dtype='>u2').astype(_np.uint16).reshape(-1, n_pins).T
+    vals = struct.unpack(f'>{len(raw) // 2}H', raw)
+    return [list(vals[i::n_pins]) for i in range(n_pins)]
+
+
+# 시퀀스 스텝의 동작 코드
+_SEQ_OPS = {"low": 0, "high": 1, "pwm": 2, "freq": 3}
+_SEQ_STEPS_PER_CALL = 12 # 스텝 하나는 10byte(16진수 20문자)
+
+
+def _compile_sequence(steps) -> list:
+    # (time_us, op, pin, value) 스텝들을 시간순으로 정렬하여
+    # >IBBI (time_us, op, pin, value) 로 묶은 16진수 문자열 조각들로 만든다
+    packed = []
+    for step in sorted(steps, key=lambda st: st[0]):
+        time_us, op, pin = step[0], step[1], step[2]
+        value = step[3] if len(step) > 3 else 0
+        if isinstance(op, str):
+            if op.lower() not in _SEQ_OPS: raise ValueError(f"Unknown sequence op: {op}.")
+            op = _SEQ_OPS[op.lower()]
+        if not (0 <= time_us <= 0xFFFFFFFF):
+            raise ValueError(f"Step time out of range: {time_us}.")
+        packed.append(struct.pack('>IBBI', time_us, op, pin, value).hex())
+    n = _SEQ_STEPS_PER_CALL
+    return [''.join(packed[i:i + n]) for i in range(0, len(packed), n)]
+
+
+def _shadow_entries(func_num: int, args):
+    # shadow mode에서 기억하는 쓰기 함수라면 [(key, value), ...] 를, 아니면 None을 반환한다
+    if func_num in (10, 11): return [(("out", int(args[0])), 11 - func_num)]
+    if func_num == 19:
+        set_mask, clr_mask = int(args[0]), int(args[1])
+        return [(("out", pin), 1 if set_mask >> pin & 1 else 0)
+                for pin in range(max(set_mask, clr_mask).bit_length())
+                if (set_mask | clr_mask) >> pin & 1]
+    if func_num in (15, 16, 17): return [(("pull", int(args[0])), func_num)]
+    if func_num == 21: return [(("pwm", int(args[0])), int(args[1]))]
+    if func_num == 22: return [(("freq", int(args[0])), int(args[1]))]
+    if func_num == 205: return [(("neopixel",), tuple(int(x) for x in args))]
+    return None
+
+
+# 핀의 모드를 정하는 쓰기들: 한 핀에는 이 중 마지막 것 하나만 유효하다
+_SHADOW_MODES = ("out", "pull", "pwm")
+
+
+def _shadow_other_modes(key):
+    # key가 핀의 모드를 정하는 쓰기라면 같은 핀의 다른 모드 key들을 반환한다 (무효가 된다)
+    if key[0] not in _SHADOW_MODES: return ()
+    return [(kind, key[1]) for kind in _SHADOW_MODES if kind != key[0]]
+
+
+def _shadow_call(key, value):
+    # (key, value)를 디바이스 함수 호출로 되돌린다
+    kind = key[0]
+    if kind == "out": return (10 if value else 11, (key[1],))
+    if kind == "pull": return (value, (key[1],))
+    if kind == "pwm": return (21, (key[1], value))
+    if kind == "freq": return (22, (key[1], value))
+    return (205, value)
+
+
+# Chaino_Hana 펌웨어 함수 테이블. _HanaBase(와 aio.AsyncHana)의 이 메소드들은 선언과
+# 아래 _HANA_DOCS의 docstring으로부터 만들어진다 (device_functions 참조)
+_HANA_FUNCTIONS = (
+    "10 set_high(pin:int)",
+    "11 set_low(pin:int)",
+    "12 is_high(pin:int) -> bool",
+    "13 read_analog(pin:int) -> int",
+    "14 set_analog_resolution(bits:int)",
+    "15 pull_up(pin:int)",
+    "16 pull_down(pin:int)",
+    "17 pull_clear(pin:int)",
+    "21 write_analog(pin:int, duty:int)",
+    "22 set_pwm_freq(pin:int, freq:int)",
+    "23 set_pwm_resolution(bits:int)",
+    "31 get_millis() -> int",
+    "42 stop_tone(pin:int)",
+    "62 start_sequence(loops:int=1, period_us:int=0)",
+    "63 stop_sequence()",
+    "64 is_sequence_playing() -> bool",
+)
+
+# 함수 테이블 메소드들의 docstring. micropython은 docstring을 쓰지 않으므로 CPython에서만 만든다
+_HANA_DOCS = {} if not IS_CPYTHON else {
+    "set_high": """
         Write a HIGH value to a digital pin.
         This is equivalent to Arduino's ``digitalWrite(pin, HIGH)``.
 
@@ -138,13 +355,8 @@ class _HanaBase:
             time.sleep(1)
             # Turn the LED off
             hana.set_low(13)
-        """
-        self.exec_func(10, pin)
-
-
-
-    def set_low(self, pin: int):
-        """
+        """,
+    "set_low": """
         Write a LOW value to a digital pin.
         This is equivalent to Arduino's ``digitalWrite(pin,LOW)``.
 
@@ -158,15 +370,8 @@ class _HanaBase:
             time.sleep(1)
             # Turn the LED off
             hana.set_low(13)
-        """
-        self.exec_func(11, pin)
-
-
-
-    #def read_digital(self, pin: int) -> int:
-    #def read_pin(self, pin: int) -> int:
-    def is_high(self, pin: int) -> bool:
-        """
+        """,
+    "is_high": """
         Reads the value from a specified digital pin.
         This is equivalent to Arduino's ``digitalRead()``.
 
@@ -183,18 +388,8 @@ class _HanaBase:
         .. code-block:: python
             if is_high():
                 print("Touched.")
-        """
-        #return int(self.exec_func(12, pin))
-        return int(self.exec_func(12, pin))==1;
-
-    
-    def is_low(self, pin: int) ->bool:
-        return not self.is_high(pin)
-    
-
-
-    def read_analog(self, pin: int) -> int:
-        """
+        """,
+    "read_analog": """
         Reads the value from the specified analog pin.
         This is equivalent to Arduino's ``analogRead()``.
 
@@ -204,12 +399,8 @@ class _HanaBase:
                  resolution (e.g., 0-1023 for 10-bit, 0-4095 for 12-bit).
         :rtype: int
         :seealso: :meth:`set_adc_bits` to change the reading resolution.
-        """
-        return int(self.exec_func(13, pin))
-    
-
-    def set_analog_resolution(self, bits: int):
-        """
+        """,
+    "set_analog_resolution": """
         Sets the resolution for :meth:`read_analog`.
         This is equivalent to ``analogReadResolution()`` on supported boards.
 
@@ -222,13 +413,8 @@ class _HanaBase:
             # Set ADC to 12-bit resolution for more precision
             hana.set_analog_resolution(12)
             high_res_value = hana.read_analog(26) # Returns a value between 0 and 4095
-        """
-        self.exec_func(14, bits)
-
-
-
-    def pull_up(self, pin: int):
-        """
+        """,
+    "pull_up": """
         Enables the internal pull-up resistor on the specified digital pin.
         This is equivalent to setting pinMode(pin, INPUT_PULLUP) in Arduino,
         but specifically for activating the pull-up.
@@ -242,13 +428,8 @@ class _HanaBase:
             hana.pull_up(2)
             # Now, hana.is_high(2) will return True when the button is not pressed,
             # and LOW when the button is pressed.
-        """
-        self.exec_func(15, pin)
-
-
-
-    def pull_down(self, pin: int):
-        """
+        """,
+    "pull_down": """
         Enables the internal pull-down resistor on the specified digital pin.
         This is equivalent to setting pinMode(pin, INPUT_PULLDOWN) in Arduino,
         but specifically for activating the pull-down.
@@ -262,13 +443,8 @@ class _HanaBase:
             hana.pull_down(3)
             # Now, hana.read_pin(3) will return LOW when the button is not pressed,
             # and HIGH when the button is pressed.
-        """
-        self.exec_func(16, pin)
-
-
-
-    def pull_clear(self, pin: int):
-        """
+        """,
+    "pull_clear": """
         Deactivates the internal pull-up or pull-down resistor on the specified digital pin.
 
         This effectively sets the pin to a standard input mode, removing any
@@ -284,18 +460,8 @@ class _HanaBase:
             hana.pull_up(2)
             # Later, clear the pull-up/pull-down resistor setting on pin 2
             hana.pull_clear(2)
-        """
-        self.exec_func(17, pin)
-
-
-    #☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷
-
-
-
-
-
-    def write_analog(self, pin: int, duty: int):
-        """
+        """,
+    "write_analog": """
         Writes an analog value (PWM wave) to a pin.
         This is equivalent to Arduino's ``analogWrite()``.
 
@@ -310,13 +476,8 @@ class _HanaBase:
 
             # Fade an LED to half brightness
             hana.write_analog(9, 128)
-        """
-        self.exec_func(21, pin, duty)
-
-
-
-    def set_pwm_freq(self, pin:int, freq:int):
-        """
+        """,
+    "set_pwm_freq": """
         Sets the frequency for PWM signals generated by :meth:`write_analog`.
 
         :param pin: The pin to write to.
@@ -328,12 +489,8 @@ class _HanaBase:
         
             # Set PWM frequency to 1 kHz for smoother LED fading
             hana.set_pwm_freq(9, 1000)
-        """
-        self.exec_func(22, pin, freq)
-
-
-    def set_pwm_resolution(self, bits:int):
-        """
+        """,
+    "set_pwm_resolution": """
         Sets the range for the duty cycle used in :meth:`write_analog`.
 
         :param bits: The number of bits which defines the
@@ -346,23 +503,307 @@ class _HanaBase:
             hana.set_pwm_bits(11)
             # Now set LED to 50% brightness with the new range
             hana.write_analog(9, 1024)
-        """
-        self.exec_func(23, bits)
-
-
-
-    def get_millis(self) -> int: #"""현재 밀리초 단위 시간 반환"""
-        """
+        """,
+    "get_millis": """
         Returns the number of milliseconds passed since the board began running.
         This is equivalent to Arduino's ``millis()``.
 
         :return: The number of milliseconds as an integer.
         :rtype: int
         :note: This number will overflow (go back to zero) after approximately 50 days.
+        """,
+    "stop_tone": """
+        Stops the tone being generated on a pin.
+        This is equivalent to Arduino's ``noTone()``.
+
+        :param pin: The pin on which to stop the tone.
+        :type pin: int
+        
+        .. code-block:: python
+
+            >>> # Start tone
+            >>> hana.start_tone(8, 'a4')  # Play A4 note on pin 8 infinitely
+            >>> 
+            >>> # Do other work...
+            >>> time.sleep(2)    # Wait 2 seconds
+            >>> 
+            >>> # Stop tone
+            >>> hana.stop_tone(8)     # Stop tone generation on pin 8
+            
+            >>> # Create silence between notes in melody
+            >>> hana.start_tone(8, 'c4', 500)   # Do note for 0.5 seconds
+            >>> hana.stop_tone(8)           # Stop immediately
+            >>> time.sleep(1.5)           # 1.5 second silence
+            >>> hana.start_tone(8, 'd4', 500)   # Re note for 0.5 seconds
+        
+        :note:
+            - Only needed when start_tone() method's duration parameter is 0.
+            - When duration is specified, tone stops automatically, stop_tone() is unnecessary.
+        """,
+    "start_sequence": """
+        Starts playing back the uploaded sequence on the device timer.
+
+        :param loops: The number of times to play the sequence. 0 loops forever.
+        :type loops: int
+        :param period_us: The time between the starts of two loops in
+                          microseconds. If 0 (default), the time of the last step is used.
+        :type period_us: int
+        """,
+    "stop_sequence": """
+        Stops the sequence playback. The pins keep their current output.
+        """,
+    "is_sequence_playing": """
+        Checks whether the device is still playing the sequence.
+
+        :return: ``True`` while the sequence is being played back.
+        :rtype: bool
+        """,
+}
+
+
+@device_functions(*_HANA_FUNCTIONS, docs=_HANA_DOCS)
+class _HanaBase:
+    # A mixin class providing common hardware control methods for a Chaino_Hana board.
+    # This class is not intended to be instantiated directly.
+    
+    _shadow = None   # shadow mode: 디바이스에 반영된 출력 상태 {key: value}
+    _pending = None  # shadow mode: 아직 보내지 않은 변경 {key: value}
+    _shadow_error = None
+
+
+    # shadow register 모드 ----------------------------------------------------
+    def set_shadow_mode(self, enable: bool = True, tick: float = None):
+        """
+        Turns the shadow register mode on or off.
+
+        In shadow mode the handle remembers the output levels, PWM duties and
+        frequencies, pull settings and the NeoPixel color it has written.
+        A write that does not change that state is not sent at all, and the
+        other writes are only queued, keeping the last value per pin. The
+        queued writes are sent as one batch by :meth:`flush`, every ``tick``
+        seconds, or together with the next call that is not such a write
+        (e.g., :meth:`is_high` or :meth:`read_analog`), so the order of the
+        operations is kept. A write that changes the mode of a pin (digital
+        output, pull or PWM) forgets what was remembered for the other modes
+        of that pin.
+
+        :param enable: ``True`` to turn the mode on, ``False`` to flush the
+                       queued writes and turn it off.
+        :type enable: bool
+        :param tick: If given, the queued writes are flushed from a background
+                     thread every ``tick`` seconds (CPython only).
+        :type tick: float | None
+
+        .. note::
+           The state the board had before the mode was turned on is unknown,
+           so the first write of each pin is always sent. The batch ('B') frames
+           and :meth:`write_pins` (function 19) must be supported by the firmware.
+
+        .. code-block:: python
+
+            hana.set_shadow_mode()
+            while True:
+                hana.write_analog(9, level)       # sent only when level changes
+                hana.set_high(13) if on else hana.set_low(13)
+                value = hana.read_analog(26)      # flushes the writes in the same frame
+        """
+        if enable:
+            if self._shadow is None:
+                self._shadow, self._pending = {}, {}
+                self._shadow_lock = _Lock()
+                self._shadow_flush_lock = _Lock() # 꺼낸 쓰기들을 보낼 때까지 다른 flush를 막는다
+                self.exec_func = self._shadow_exec # 인스턴스 속성으로 가로챈다 (끄면 비용 없음)
+                self._stubs = None # 함수 테이블 메소드들도 exec_func를 거치게 한다
+            if tick: self._start_shadow_tick(tick)
+        elif self._shadow is not None:
+            self._stop_shadow_tick()
+            try:
+                self.flush()
+            finally:
+                del self.exec_func
+                self._stubs = {}
+                self._shadow = self._pending = None
+
+
+    def flush(self):
+        """
+        Sends the writes queued in shadow mode to the device as one batch.
+
+        :raises Exception: If a queued write failed on the device, or if an
+                           error occurred in the background flush since the last call.
         """
-        return int(self.exec_func(31))
+        if self._shadow is not None:
+            self._shadow_flush(None, None)
+        err, self._shadow_error = self._shadow_error, None
+        if err is not None: raise err
+
+
+    def _start_shadow_tick(self, tick: float):
+        raise RuntimeError("The flush tick needs CPython threads.")
+
+
+    def _stop_shadow_tick(self):
+        pass
+
+
+    def _shadow_exec(self, func_num: int, *args):
+        entries = _shadow_entries(func_num, args)
+        if entries is None: # 쓰기가 아니면 보류된 쓰기와 함께(같은 batch로) 실행한다
+            return self._shadow_flush(func_num, args)
+        shadow, pending = self._shadow, self._pending
+        with self._shadow_lock:
+            for key, value in entries:
+                for other in _shadow_other_modes(key): # 모드가 바뀌면 이전 모드의 값은 무효다
+                    shadow.pop(other, None)
+                    pending.pop(other, None)
+                if shadow.get(key) == value: pending.pop(key, None) # 디바이스 상태와 같다 -> 생략
+                else: pending[key] = value
+
+
+    def _shadow_flush(self, func_num, args):
+        # tick thread의 flush와 다른 호출이 꺼낸 쓰기들의 전송 순서가 바뀌지 않도록
+        # pending을 꺼내서 보내고 shadow에 반영할 때까지 하나씩만 실행한다
+        with self._shadow_flush_lock:
+            return self._shadow_send(func_num, args)
+
+
+    def _shadow_send(self, func_num, args):
+        with self._shadow_lock:
+            pending, self._pending = self._pending, {}
+        calls, applied = [], [] # applied[i]: calls[i]이 반영하는 (key, value)들
+        groups, group, after = [], None, set()
+        for key, value in pending.items():
+            if key[0] == "out": # 출력들은 write_pins(19)로 합친다
+                pin = key[1]
+                # 합치는 위치 이후에 같은 핀의 다른 쓰기가 있다면 핀의 순서를 지키도록 새로 시작한다
+                if group is None or pin in after:
+                    calls.append(None); applied.append([])
+                    group = [len(calls) - 1, 0, 0] # [index, set_mask, clr_mask]
+                    groups.append(group); after = set()
+                group[1 if value else 2] |= 1 << pin
+                applied[group[0]].append((key, value))
+            else:
+                calls.append(_shadow_call(key, value)); applied.append([(key, value)])
+                if len(key) > 1: after.add(key[1])
+        for index, set_mask, clr_mask in groups:
+            outs = applied[index]
+            calls[index] = (_shadow_call(*outs[0]) if len(outs) == 1
+                            else (19, (set_mask, clr_mask)))
+        if func_num is not None:
+            calls.append((func_num, args))
+
+        cls_exec = type(self).exec_func
+        try:
+            if len(calls) == 1 and func_num is not None:
+                return cls_exec(self, func_num, *args) # 보류된 쓰기가 없다
+            if not calls: return None
+            results = ([cls_exec(self, calls[0][0], *calls[0][1])] if len(calls) == 1
+                       else self._exec_batch(calls))
+        except Exception:
+            with self._shadow_lock: # 전송 실패: 그 사이에 새로 쓴 값이 우선이다
+                pending.update(self._pending)
+                self._pending = pending
+            raise
+
+        error = None
+        shadow = self._shadow
+        with self._shadow_lock:
+            for i, kv in enumerate(applied):
+                if isinstance(results[i], Exception):
+                    error = error or results[i]
+                    continue
+                for key, value in kv:
+                    for other in _shadow_other_modes(key): shadow.pop(other, None)
+                    shadow[key] = value
+        if error is not None: raise error
+        if func_num is not None:
+            if isinstance(results[-1], Exception): raise results[-1]
+            return results[-1]
+
+
+
+    #☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷
+    #def read_digital(self, pin: int) -> int:
+    #def read_pin(self, pin: int) -> int:
+    def is_low(self, pin: int) ->bool:
+        return not self.is_high(pin)
     
 
+    def read_pins(self, pins) -> dict:
+        """
+        Reads several digital pins at the same instant with a single call.
+
+        The device samples all the requested pins at once, so the result is a
+        coherent snapshot, and it costs one round trip instead of one per pin.
+
+        :param pins: The numbers of the digital pins to read (0~31).
+        :type pins: list[int]
+        :return: A dict of ``{pin: True/False}`` (``True`` for HIGH).
+        :rtype: dict
+
+        .. code-block:: python
+
+            buttons = hana.read_pins(range(2, 18))   # 16-button panel
+            pressed = [pin for pin, high in buttons.items() if not high]
+        """
+        pins = list(pins)
+        return _decode_pins(self.exec_func(18, _pins_mask(pins)), pins)
+
+
+    def write_pins(self, levels: dict):
+        """
+        Writes several digital pins at the same instant with a single call.
+
+        :param levels: A dict of ``{pin: level}``; a truthy level writes HIGH,
+                       a falsy level writes LOW.
+        :type levels: dict
+
+        .. code-block:: python
+
+            hana.write_pins({13: 1, 14: 0, 15: 1})
+        """
+        self.exec_func(19, *_levels_masks(levels))
+
+
+
+    def read_analogs(self, pins, samples: int = 1, as_array: bool = True):
+        """
+        Reads several analog pins, optionally oversampled, in as few calls as possible.
+
+        Each call returns the raw values of up to 60 readings packed as 16-bit
+        words, which are decoded in one step instead of converting strings to
+        ints one by one.
+
+        :param pins: The analog input pins (e.g., 26~29 on RP2040).
+        :type pins: list[int]
+        :param samples: The number of readings per pin (oversampling).
+        :type samples: int
+        :param as_array: Return a NumPy array if NumPy is installed.
+        :type as_array: bool
+        :return: A ``uint16`` array of shape ``(len(pins), samples)``, or a list
+                 of per-pin lists when NumPy is not available.
+        :rtype: numpy.ndarray | list[list[int]]
+        :raises ValueError: If ``pins`` is empty or has more than 60 pins.
+
+        .. note::
+           The firmware must support the multi-channel read function (20).
+
+        .. code-block:: python
+
+            vals = hana.read_analogs([26, 27, 28], samples=16)
+            means = vals.mean(axis=1)
+        """
+        pins = list(pins)
+        chunks = [self.exec_func(20, n, *pins) for n in _adc_calls(pins, samples)]
+        return _decode_adc_hex(chunks, len(pins), as_array)
+
+
+    #☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷☷
+
+
+
+
+
     '''
     def get_micros(self) -> int:
         """
@@ -416,7 +857,7 @@ class _HanaBase:
             >>> hana.start_tone(8, 'c#5', 500)   # C#5 on pin 8 for 0.5 seconds
             >>> hana.start_tone(8, 'do')         # Do note on pin 8 infinitely
             
-            >>> # Simple melody
+            >>> # Simple melody (see also play_melody())
             >>> melody = ['do', 're', 'mi', 'fa', 'sol']
             >>> for note in melody:
             ...     hana.start_tone(8, note, 400)
@@ -424,54 +865,129 @@ class _HanaBase:
         
         :note: Case insensitive
         """
-        if isinstance(freq, str):
-            freq_lower = freq.lower()
-            if freq_lower in _PITCHES: freq = _PITCHES[freq_lower]
-            elif freq_lower in _NOTES: freq = _NOTES[freq_lower]
-            else: raise ValueError(f"Unknown note: {freq}.")
-        
-        self.exec_func(41, pin, freq, duration)
+        self.exec_func(41, pin, _note_freq(freq), duration)
 
 
 
-    def stop_tone(self, pin: int):
+    def play_melody(self, pin: int, notes, tempo: int = 120, loops: int = 1) -> int:
         """
-        Stops the tone being generated on a pin.
-        This is equivalent to Arduino's ``noTone()``.
+        Plays a melody on a pin from a table stored on the device.
 
-        :param pin: The pin on which to stop the tone.
+        The notes are compiled to a compact ``(freq, duration)`` table which is
+        sent in one frame per 30 notes, and the device plays it back by itself
+        without gaps or further communication. Use :meth:`stop_tone` to stop it.
+
+        :param pin: The pin on which to play the melody.
         :type pin: int
-        
+        :param notes: A list of notes, or an MML string. A note is a name
+                      (e.g., 'c4', 'do'), a frequency in Hz or ``None``/'r'
+                      for a rest, optionally paired with its length in beats
+                      (e.g., ``('e4', 0.5)``); the default length is 1 beat.
+                      The MML string supports ``c d e f g a b`` with ``#``/``+``/``-``,
+                      ``r`` (rest), lengths (``c8``, ``c4.``), ``o<n>``, ``<``, ``>``,
+                      ``l<n>`` and ``t<bpm>``.
+        :type notes: list | str
+        :param tempo: The number of beats per minute.
+        :type tempo: int
+        :param loops: The number of times to play the melody. 0 loops forever.
+        :type loops: int
+        :return: The duration of one loop in milliseconds.
+        :rtype: int
+        :raises ValueError: If a note can not be recognized.
+
+        .. note::
+           The firmware must support the melody functions (43, 44).
+
         .. code-block:: python
 
-            >>> # Start tone
-            >>> hana.start_tone(8, 'a4')  # Play A4 note on pin 8 infinitely
-            >>> 
-            >>> # Do other work...
-            >>> time.sleep(2)    # Wait 2 seconds
-            >>> 
-            >>> # Stop tone
-            >>> hana.stop_tone(8)     # Stop tone generation on pin 8
-            
-            >>> # Create silence between notes in melody
-            >>> hana.start_tone(8, 'c4', 500)   # Do note for 0.5 seconds
-            >>> hana.stop_tone(8)           # Stop immediately
-            >>> time.sleep(1.5)           # 1.5 second silence
-            >>> hana.start_tone(8, 'd4', 500)   # Re note for 0.5 seconds
-        
-        :note:
-            - Only needed when start_tone() method's duration parameter is 0.
-            - When duration is specified, tone stops automatically, stop_tone() is unnecessary.
+            hana.play_melody(8, ['do', 're', 'mi', ('fa', 2), None, 'sol'], tempo=100)
+            hana.play_melody(8, "t140 o4 l8 e e r e r c e4 g4 r4 < g4")
+        """
+        chunks = _compile_melody(notes, tempo)
+        for index, chunk in _table_calls(chunks, 8)[0]:
+            self.exec_func(43, index, chunk)
+        self.exec_func(44, pin, loops)
+        return _melody_ms(chunks)
+
+
+
+    # 디바이스에서 재생되는 시퀀스 관련 함수들
+    def upload_sequence(self, steps) -> int:
         """
-        self.exec_func(42, pin)
+        Uploads a timed sequence of output changes to be played back by the device.
+
+        Each step is a ``(time_us, op, pin, value)`` tuple, where ``time_us`` is
+        the time from the start of the sequence in microseconds and ``op`` is
+        one of ``'high'``, ``'low'``, ``'pwm'`` (duty, like :meth:`write_analog`)
+        or ``'freq'`` (like :meth:`set_pwm_freq`). ``value`` is ignored for
+        ``'high'`` and ``'low'``. The steps are sorted by time and sent in chunks
+        of 12 steps; the first chunk replaces any previously uploaded sequence.
+
+        :param steps: The steps of the sequence.
+        :type steps: list[tuple]
+        :return: The number of uploaded steps.
+        :rtype: int
+        :raises ValueError: If a step has an unknown op or time.
 
+        .. note::
+           The firmware must support the sequence functions (61~64).
+
+        .. code-block:: python
+
+            # 1 kHz square wave on pin 13 for 10 ms, then fade pin 9
+            steps = [(t, 'high' if t % 1000 == 0 else 'low', 13, 0)
+                     for t in range(0, 10000, 500)]
+            steps += [(10000 + i * 100, 'pwm', 9, i) for i in range(256)]
+            hana.upload_sequence(steps)
+            hana.start_sequence()
+        """
+        calls, count = _table_calls(_compile_sequence(steps), 20)
+        for index, chunk in calls:
+            self.exec_func(61, index, chunk)
+        return count
 
 
 #=============================================================================================
-IS_CPYTHON = (sys.implementation.name == "cpython")
 
 if IS_CPYTHON:
-    
+
+    import threading
+
+
+    class AnalogBlock:
+        """
+        One block of samples delivered by :meth:`Hana.stream_analog`.
+
+        :ivar seq: The block sequence number (0~65535, wraps around).
+        :ivar t0_us: The device time (``micros()``) of the first sample.
+        :ivar rate_hz: The sampling rate.
+        :ivar pins: The sampled pins, in the order of each sample tuple.
+        :ivar samples: A list of tuples, one tuple of ADC values per sampling instant.
+        :ivar lost: The number of blocks missing just before this one (0 if none).
+        """
+        __slots__ = ("seq", "t0_us", "rate_hz", "pins", "samples", "lost")
+
+        def __init__(self, seq, t0_us, rate_hz, pins, samples, lost):
+            self.seq, self.t0_us, self.rate_hz = seq, t0_us, rate_hz
+            self.pins, self.samples, self.lost = pins, samples, lost
+
+
+        def times_us(self) -> list:
+            """Returns the device time (us) of each sample in this block."""
+            step = 1e6 / self.rate_hz
+            return [self.t0_us + i * step for i in range(len(self.samples))]
+
+
+        def channel(self, pin: int) -> list:
+            """Returns the values of one pin in this block."""
+            idx = self.pins.index(pin)
+            return [s[idx] for s in self.samples]
+
+
+        def __repr__(self):
+            return f"<AnalogBlock seq:{self.seq} samples:{len(self.samples)} lost:{self.lost}>"
+
+
     class Hana(Chaino, _HanaBase):
         """
         A high-level interface for controlling a Chaino_Hana board from CPython.
@@ -493,10 +1009,115 @@ if IS_CPYTHON:
         """
         def __init__(self, port, i2c_addr: int = 0):
             Chaino.__init__(self, port, i2c_addr)
+            self._shadow_tick_stop = None
+
+
+        def _start_shadow_tick(self, tick: float):
+            self._stop_shadow_tick()
+            stop = self._shadow_tick_stop = threading.Event()
+
+            def run():
+                while not stop.wait(tick):
+                    try:
+                        self._shadow_flush(None, None)
+                    except Exception as e: # 다음 flush()에서 알린다
+                        self._shadow_error = e
+
+            threading.Thread(target=run, daemon=True).start()
+
+
+        def _stop_shadow_tick(self):
+            if self._shadow_tick_stop is not None:
+                self._shadow_tick_stop.set()
+                self._shadow_tick_stop = None
+
+
+        _STREAM_MAX_TIMEOUTS = 5 # 연속으로 이만큼 블록이 오지 않으면 스트리밍 실패로 본다
+
+        def stream_analog(self, pins, rate_hz: int, block_size: int = 64, max_blocks: int = None):
+            """
+            Streams ADC samples continuously, sampled by the device's own timer.
+
+            The device samples the given pins at ``rate_hz`` into its buffer and
+            sends ``block_size`` samples per frame, so the host needs no round
+            trip per sample. Each block has a sequence number; missing blocks
+            (e.g., dropped by a CRC error) are reported in :attr:`AnalogBlock.lost`.
+            The port is reserved for the stream until the iterator is exhausted
+            or closed, and closing it stops the streaming on the device.
+
+            :param pins: An ADC pin or a list of ADC pins (e.g., 26~29 on RP2040).
+            :type pins: int | list[int]
+            :param rate_hz: The sampling rate per pin in Hz.
+            :type rate_hz: int
+            :param block_size: The number of sampling instants per block.
+            :type block_size: int
+            :param max_blocks: Stop after this many blocks (``None``: until closed).
+            :type max_blocks: int | None
+            :return: An iterator of :class:`AnalogBlock`.
+            :raises Exception: If the device does not start streaming or stops
+                               sending blocks.
+
+            .. note::
+               The firmware must support the streaming functions (51, 52).
+
+            .. code-block:: python
+
+                for block in hana.stream_analog([26, 27], 10000, max_blocks=100):
+                    if block.lost: print(f"{block.lost} block(s) lost")
+                    process(block.samples)
+            """
+            pins = [pins] if isinstance(pins, int) else list(pins)
+            n_pins = len(pins)
+            sched = self._sched
+            sched.acquire()
+            try:
+                self.exec_func(51, rate_hz, block_size, *pins)
+                count, expected, timeouts = 0, None, 0
+                while max_blocks is None or count < max_blocks:
+                    packet = self._read_packet()
+                    if packet is None:
+                        timeouts += 1
+                        if timeouts >= Hana._STREAM_MAX_TIMEOUTS:
+                            raise Exception(f"ADC stream stopped(addr:{self._addr}).")
+                        continue
+                    timeouts = 0
+                    if not is_crc_matched(packet) or packet[2:3] != b'D':
+                        self._cnt_rd_crc_err += 1 # 손실은 다음 블록의 순번으로 드러난다
+                        continue
+                    # D seq(2byte) t0_us(4byte) val(2byte)*(block_size*n_pins)  (byte stuffing 됨)
+                    data = _unstuff(packet[3:])
+                    seq, t0_us = struct.unpack_from('>HI', data, 0)
+                    vals = struct.unpack_from(f'>{(len(data) - 6) // 2}H', data, 6)
+                    samples = [vals[i:i + n_pins] for i in range(0, len(vals), n_pins)]
+                    lost = 0 if expected is None else (seq - expected) & 0xFFFF
+                    expected = (seq + 1) & 0xFFFF
+                    count += 1
+                    yield AnalogBlock(seq, t0_us, rate_hz, pins, samples, lost)
+            finally:
+                try:
+                    self._stop_stream()
+                finally:
+                    sched.release()
+
+
+        def _stop_stream(self):
+            # 스트리밍 중에는 'D' 패킷들 사이에 stop 함수(52)의 응답이 섞여서 온다
+            packet = self._gen_exec_packet(52)
+            self._serial_write(packet)
+            for _ in range(Chaino._MAX_RETRIES * 4):
+                packet_ret = self._read_packet()
+                if packet_ret is None:
+                    self._serial_write(packet)
+                elif is_crc_matched(packet_ret) and packet_ret[2:3] in (b'S', b'T'):
+                    return
+            raise Exception(f"Failed to stop the ADC stream(addr:{self._addr}).")
             
 else:
     
-    from machine import Pin
+    try:
+        from machine import Pin, ADC, PWM, Timer
+    except ImportError: # unix 포트에는 machine 모듈이 없다 (addr 0의 직접 제어는 쓸 수 없다)
+        Pin = ADC = PWM = Timer = None
 
     class Hana(Chaino, _HanaBase):
         """
@@ -505,24 +1126,61 @@ else:
         This class combines the I2C communication capabilities of :class:`~chaino.Chaino`
         with the Arduino-like hardware control methods specific to the Chaino_Hana board.
 
+        With ``i2c_addr=0`` the methods control the pins of the board running
+        the script directly through ``machine.Pin``, ``machine.ADC`` and
+        ``machine.PWM`` (the objects are created once per pin and reused), so
+        there is no I2C communication at all. The defaults follow Arduino:
+        10-bit :meth:`read_analog`, 8-bit :meth:`write_analog` at 1 kHz.
+        :meth:`play_melody` is played with a ``machine.Timer``. The sequence
+        functions and :meth:`set_neopixel` need the Chaino_Hana firmware and
+        raise ``ValueError`` like the other remote functions.
+
         .. note::
            This class inherits all methods from :class:`~chaino.chaino.Chaino`, 
            such as :meth:`~chaino.chaino.Chaino.ping`, :meth:`~chaino.chaino.Chaino.who`,
            :meth:`~chaino.chaino.Chaino.get_version`, etc. 
            Only Hana-specific methods are listed below.
 
-        :param i2c_addr: The I2C address of the target Chaino_Hana slave board.
+        :param i2c_addr: The I2C address of the target Chaino_Hana slave board,
+                         or 0 (default) for the pins of this board.
         :type i2c_addr: int
+        :param bus: The ``machine.I2C`` object to use. If ``None`` (default), I2C1.
+        :type bus: machine.I2C
         """
-        def __init__(self, i2c_addr: int = 0):
-            # MicroPython용 Chaino는 (slave_addr)만 받는다고 가정
-            Chaino.__init__(self, i2c_addr)
-            self._dic_pins = {}
-                
+        def __init__(self, i2c_addr: int = 0, bus=None):
+            # MicroPython용 Chaino는 (slave_addr, bus)를 받는다
+            Chaino.__init__(self, i2c_addr, bus)
+            self._dic_pins = {} # pin -> [mode, Pin]
+            self._adcs = {}     # pin -> ADC
+            self._pwms = {}     # pin -> PWM
+            self._pwm_freqs = {}  # pin -> set_pwm_freq()로 지정한 주파수
+            self._adc_bits = 10 # Arduino의 기본값
+            self._pwm_bits = 8
+            self._tone_timers = {} # pin -> duration이 있는 start_tone/play_melody의 one-shot Timer
+            if i2c_addr == 0: self._send = self._no_bus # 직접 제어하지 않는 함수는 I2C로 보내지 않는다
+
+
+        # addr 0: 이 보드의 핀을 직접 제어한다 -------------------------------------
+        def _no_bus(self, packet):
+            raise ValueError("Remote functions are not available on the local board (addr 0).")
+
+        @staticmethod
+        def _no_local(name: str):
+            raise ValueError(f"{name}() needs the Chaino_Hana firmware and "
+                             "is not available on the local board (addr 0).")
+
+        def _release(self, pin: int):
+            # 다른 기능으로 쓰기 전에 pin의 ADC/PWM 객체를 버린다 (PWM은 출력을 멈춘다)
+            self._adcs.pop(pin, None)
+            pwm = self._pwms.pop(pin, None)
+            if pwm is not None: pwm.deinit()
+            timer = self._tone_timers.pop(pin, None)
+            if timer is not None: timer.deinit()
 
         def _set_out(self, pin:int, val:int):
             dpins = self._dic_pins
             if pin not in dpins or dpins[pin][0] != Pin.OUT:
+                self._release(pin)
                 gpio = Pin(pin, Pin.OUT)
                 dpins[pin] = [Pin.OUT, gpio]
                 gpio.value(val)
@@ -533,9 +1191,33 @@ else:
             dpins = self._dic_pins
             # IN, PULL_UP, PULL_DOWN인 경우는 _dic_pin_mode[pin] 값 유지
             if pin not in dpins or dpins[pin][0]==Pin.OUT:
+                self._release(pin)
                 dpins[pin] = [Pin.IN, Pin(pin, Pin.IN)]
             return bool(dpins[pin][1].value())
 
+        def _set_pull(self, pin: int, pull):
+            self._release(pin)
+            self._dic_pins[pin] = [Pin.IN, Pin(pin, Pin.IN, pull)]
+
+        def _read_adc(self, pin: int) -> int:
+            adc = self._adcs.get(pin)
+            if adc is None:
+                self._release(pin)
+                self._dic_pins.pop(pin, None)
+                adc = self._adcs[pin] = ADC(Pin(pin))
+            return adc.read_u16() >> (16 - self._adc_bits)
+
+        def _pwm(self, pin: int, freq: int):
+            # pin의 PWM 객체 (없으면 만든다). freq가 None이 아니면 주파수를 바꾼다
+            pwm = self._pwms.get(pin)
+            if pwm is None:
+                self._release(pin)
+                self._dic_pins.pop(pin, None)
+                pwm = self._pwms[pin] = PWM(Pin(pin))
+                if freq is None: freq = self._pwm_freqs.get(pin, 1000)
+            if freq is not None: pwm.freq(freq)
+            return pwm
+
 
         def set_high(self, pin:int):
             if self._addr == 0: self._set_out(pin, 1)
@@ -555,6 +1237,155 @@ else:
             return not self.is_high(pin)
 
 
+        def read_pins(self, pins) -> dict:
+            if self._addr == 0: return {pin: self._is_high(pin) for pin in pins}
+            else: return _HanaBase.read_pins(self, pins)
+
+
+        def write_pins(self, levels: dict):
+            if self._addr == 0:
+                for pin, level in levels.items(): self._set_out(pin, 1 if level else 0)
+            else: _HanaBase.write_pins(self, levels)
+
+
+        def pull_up(self, pin: int):
+            if self._addr == 0: self._set_pull(pin, Pin.PULL_UP)
+            else: _HanaBase.pull_up(self, pin)
+
+
+        def pull_down(self, pin: int):
+            if self._addr == 0: self._set_pull(pin, Pin.PULL_DOWN)
+            else: _HanaBase.pull_down(self, pin)
+
+
+        def pull_clear(self, pin: int):
+            if self._addr == 0: self._set_pull(pin, None)
+            else: _HanaBase.pull_clear(self, pin)
+
+
+        def read_analog(self, pin: int) -> int:
+            if self._addr == 0: return self._read_adc(pin)
+            else: return _HanaBase.read_analog(self, pin)
+
+
+        def read_analogs(self, pins, samples: int = 1, as_array: bool = True):
+            if self._addr == 0:
+                read = self._read_adc
+                return [[read(pin) for _ in range(samples)] for pin in pins]
+            else: return _HanaBase.read_analogs(self, pins, samples, as_array)
+
+
+        def set_analog_resolution(self, bits: int):
+            if self._addr == 0:
+                if not (1 <= bits <= 16): raise ValueError(f"Invalid ADC resolution: {bits}")
+                self._adc_bits = bits # ADC는 16bit(read_u16)로 읽고 자른다
+            else: _HanaBase.set_analog_resolution(self, bits)
+
+
+        def write_analog(self, pin: int, duty: int):
+            if self._addr == 0:
+                top = (1 << self._pwm_bits) - 1
+                duty = 0 if duty < 0 else top if duty > top else duty
+                self._pwm(pin, None).duty_u16(duty * 0xFFFF // top)
+            else: _HanaBase.write_analog(self, pin, duty)
+
+
+        def set_pwm_freq(self, pin: int, freq: int):
+            if self._addr == 0:
+                self._pwm_freqs[pin] = freq
+                if pin in self._pwms: self._pwms[pin].freq(freq)
+            else: _HanaBase.set_pwm_freq(self, pin, freq)
+
+
+        def set_pwm_resolution(self, bits: int):
+            if self._addr == 0:
+                if not (1 <= bits <= 16): raise ValueError(f"Invalid PWM resolution: {bits}")
+                self._pwm_bits = bits
+            else: _HanaBase.set_pwm_resolution(self, bits)
+
+
+        def get_millis(self) -> int:
+            if self._addr == 0: return time.ticks_ms()
+            else: return _HanaBase.get_millis(self)
+
+
+        def start_tone(self, pin: int, freq, duration: int = 0):
+            if self._addr == 0:
+                freq = _note_freq(freq)
+                timer = self._tone_timers.pop(pin, None)
+                if timer is not None: timer.deinit()
+                self._pwm(pin, freq).duty_u16(0x8000) # duty 50%의 구형파
+                if duration > 0:
+                    timer = self._tone_timers[pin] = Timer(-1)
+                    timer.init(mode=Timer.ONE_SHOT, period=duration,
+                               callback=lambda t: self.stop_tone(pin))
+            else: _HanaBase.start_tone(self, pin, freq, duration)
+
+
+        def stop_tone(self, pin: int):
+            if self._addr == 0:
+                if pin in self._pwms or pin in self._tone_timers:
+                    self._release(pin) # noTone()처럼 출력을 멈춘다
+            else: _HanaBase.stop_tone(self, pin)
+
+
+        def play_melody(self, pin: int, notes, tempo: int = 120, loops: int = 1) -> int:
+            if self._addr != 0: return _HanaBase.play_melody(self, pin, notes, tempo, loops)
+            # 펌웨어처럼 (freq, ms) 표를 one-shot Timer로 한 음씩 재생한다 (stop_tone()이 멈춘다)
+            table = [(int(c[i:i + 4], 16), int(c[i + 4:i + 8], 16))
+                     for c in _compile_melody(notes, tempo) for i in range(0, len(c), 8)]
+            self.stop_tone(pin)
+            if not table: return 0
+            pwm = self._pwm(pin, None) # timer보다 먼저 만든다 (새 PWM은 _release()로 timer를 지운다)
+            timer = self._tone_timers[pin] = Timer(-1)
+            state = [0, loops] # 다음 음의 index, 남은 반복 횟수 (loops 0은 0이 되지 않으므로 무한 반복)
+
+            def step(t):
+                i = state[0]
+                if i == len(table):
+                    state[1] -= 1
+                    if state[1] == 0:
+                        self.stop_tone(pin)
+                        return
+                    i = 0
+                freq, ms = table[i]
+                state[0] = i + 1
+                if freq:
+                    pwm.freq(freq)
+                    pwm.duty_u16(0x8000)
+                else: pwm.duty_u16(0) # 쉼표
+                timer.init(mode=Timer.ONE_SHOT, period=ms, callback=step)
+
+            step(timer)
+            return sum(ms for _, ms in table)
+
+
+        # 시퀀스는 펌웨어의 us 단위 타이머로 재생되므로 addr 0에서는 쓸 수 없다
+        def upload_sequence(self, steps) -> int:
+            if self._addr == 0: self._no_local("upload_sequence")
+            return _HanaBase.upload_sequence(self, steps)
+
+
+        def start_sequence(self, loops: int = 1, period_us: int = 0):
+            if self._addr == 0: self._no_local("start_sequence")
+            _HanaBase.start_sequence(self, loops, period_us)
+
+
+        def stop_sequence(self):
+            if self._addr == 0: self._no_local("stop_sequence")
+            _HanaBase.stop_sequence(self)
+
+
+        def is_sequence_playing(self) -> bool:
+            if self._addr == 0: self._no_local("is_sequence_playing")
+            return _HanaBase.is_sequence_playing(self)
+
+
+        def set_neopixel(self, r: int, g: int, b: int):
+            if self._addr == 0: self._no_local("set_neopixel") # NeoPixel의 핀은 보드마다 다르다
+            Chaino.set_neopixel(self, r, g, b)
+
+
 
 
 
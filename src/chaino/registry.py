@@ -0,0 +1,121 @@
+"""
+Persistent registry of Chaino master devices
+============================================
+
+This module keeps a small JSON file that maps the USB identity of a serial
+port (VID, PID and serial number, as reported by
+``serial.tools.list_ports``) to the name, I2C address and firmware version
+of the Chaino master behind it.
+
+When a registry is set on :attr:`Chaino.registry <chaino.chaino.Chaino>`,
+opening a known device skips the handshake: the buffer settling delay and
+the identity call (function 207) that reads the name, address, version and
+capabilities. The link is only checked with ``get_addr()`` (the address must
+match), or not at all with ``lazy=True``. Unknown devices, devices that answer
+differently and ports without a USB serial number go through the full
+handshake, and the result is written back to the file.
+
+Usage:
+------
+.. code-block:: python
+
+    from chaino import Chaino, Hana
+    from chaino.registry import DeviceRegistry
+
+    Chaino.registry = DeviceRegistry()   # ~/.chaino/devices.json
+    hana = Hana("COM9")                  # fast after the first run
+"""
+import json
+import os
+import threading
+import time
+
+import serial.tools.list_ports # pyserial을 pip install해야 한다
+
+
+def usb_key(port_info) -> str:
+    """
+    Returns the registry key ``"VID:PID:SERIAL"`` of a ``list_ports`` entry,
+    or ``None`` if the port is not a USB device with a serial number.
+    """
+    if port_info.vid is None or not port_info.serial_number:
+        return None
+    return f"{port_info.vid:04x}:{port_info.pid:04x}:{port_info.serial_number}"
+
+
+class DeviceRegistry:
+    """
+    The on-disk table of known Chaino masters, keyed by USB identity.
+
+    :param path: The JSON file. If ``None`` (default), ``~/.chaino/devices.json``.
+    :type path: str | None
+    :param lazy: If ``True``, a known device is opened without any call;
+                 a wrong entry then shows up as an error of the first call.
+    :type lazy: bool
+    """
+
+    DEFAULT_PATH = os.path.join(os.path.expanduser("~"), ".chaino", "devices.json")
+
+    def __init__(self, path: str = None, lazy: bool = False):
+        self.path = path or DeviceRegistry.DEFAULT_PATH
+        self.lazy = lazy
+        self._lock = threading.Lock()
+        self._keys = {} # port -> usb key (list_ports 조회 결과 캐시)
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._devices = json.load(f)
+        except (OSError, ValueError): # 파일이 없거나 깨졌다면 빈 registry로 시작한다
+            self._devices = {}
+
+
+    def key_of(self, port: str) -> str:
+        """Returns the USB identity key of a port name, or ``None``."""
+        with self._lock:
+            if port not in self._keys:
+                self._keys = {p.device: usb_key(p) for p in serial.tools.list_ports.comports()}
+            return self._keys.get(port)
+
+
+    def lookup(self, port: str) -> dict:
+        """
+        Returns the stored entry (``name``, ``addr``, ``version``, ``caps``,
+        ``port``, ``seen``) of the device on a port, or ``None`` if it is unknown.
+        """
+        key = self.key_of(port)
+        if key is None: return None
+        with self._lock:
+            entry = self._devices.get(key)
+            return dict(entry) if entry else None
+
+
+    def remember(self, port: str, name: str, addr: int, version: str = None, caps=None):
+        """Stores (or updates) the device on a port and writes the file."""
+        key = self.key_of(port)
+        if key is None: return
+        with self._lock:
+            self._devices[key] = {"name": name, "addr": addr, "version": version,
+                                  "caps": caps, "port": port, "seen": int(time.time())}
+            self._save()
+
+
+    def forget(self, port: str):
+        """Removes the device on a port from the registry."""
+        key = self.key_of(port)
+        with self._lock:
+            if self._devices.pop(key, None) is not None:
+                self._save()
+
+
+    def devices(self) -> dict:
+        """Returns a copy of all the entries, keyed by ``"VID:PID:SERIAL"``."""
+        with self._lock:
+            return {key: dict(entry) for key, entry in self._devices.items()}
+
+
+    def _save(self):
+        # 임시 파일에 쓴 뒤 교체하므로 쓰는 도중에 중단되어도 파일이 깨지지 않는다
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._devices, f, indent=2)
+        os.replace(tmp, self.path)
@@ -0,0 +1,23 @@
+import os
+
+import pytest
+
+
+@pytest.fixture
+def emulator():
+    # 에뮬레이터는 pty로 동작하므로 POSIX에서만 쓸 수 있다
+    if os.name != "posix":
+        pytest.skip("ChainoEmulator needs a POSIX pty")
+    from chaino.emulator import ChainoEmulator
+    with ChainoEmulator(slaves=[0x41], seed=1) as emu:
+        yield emu
+
+
+@pytest.fixture
+def hana(emulator):
+    from chaino import Hana
+    h = Hana(emulator.port, 0x41)
+    try:
+        yield h
+    finally:
+        h.close()
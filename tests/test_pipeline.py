@@ -0,0 +1,87 @@
+import pytest
+
+pytest.importorskip("serial")
+
+
+def _results(calls):
+    out = []
+    for call in calls:
+        try:
+            out.append(call.result())
+        except Exception as e:
+            out.append(e)
+    return out
+
+
+def test_pipeline_in_order(hana, emulator):
+    emulator.device(0x41).adc.update({26: 11, 27: 22})
+    with hana.pipeline(depth=8) as pipe:
+        calls = [pipe.submit(13, 26 + i % 2) for i in range(100)]
+    assert _results(calls) == ["11", "22"] * 50
+
+
+def test_pipeline_recovers_lost_requests(hana, emulator):
+    emulator.device(0x41).adc[26] = 5
+    emulator.drop_rate = 0.2
+    with hana.pipeline(depth=8) as pipe:
+        calls = [pipe.submit(13, 26) for _ in range(60)]
+    emulator.drop_rate = 0.0
+    assert _results(calls) == ["5"] * 60
+    assert hana.stats()["retries"] > 0
+
+
+def test_pipeline_recovers_crc_errors(hana, emulator):
+    emulator.device(0x41).adc[26] = 7
+    emulator.rx_error_rate = 0.05  # 요청 프레임마다
+    emulator.tx_error_rate = 0.005 # 응답 바이트마다
+    with hana.pipeline(depth=8) as pipe:
+        calls = [pipe.submit(13, 26) for _ in range(60)]
+    emulator.rx_error_rate = emulator.tx_error_rate = 0.0
+    assert _results(calls) == ["7"] * 60
+    st = hana.stats()
+    assert st["crc_errors_rx"] + st["crc_errors_tx"] > 0
+
+
+def test_pipeline_late_answers(hana, emulator):
+    # 응답이 serial timeout보다 늦게 오면 재전송된 순번의 늦은 응답도 받아들여야 한다
+    emulator.device(0x41).adc[26] = 9
+    emulator.response_delay = 0.12
+    with hana.pipeline(depth=4) as pipe:
+        calls = [pipe.submit(13, 26) for _ in range(8)]
+    emulator.response_delay = 0.0
+    assert _results(calls) == ["9"] * 8
+    assert hana.exec_func(13, 26) == "9" # 늦은 응답이 다음 호출에 섞이지 않는다
+
+
+def test_pipeline_device_error(hana):
+    with hana.pipeline() as pipe:
+        bad = pipe.submit(250)
+        good = pipe.submit(201)
+    with pytest.raises(Exception):
+        bad.result()
+    assert good.result() == "Chaino_Hana"
+
+
+def test_batch(hana, emulator):
+    dev = emulator.device(0x41)
+    dev.adc[26] = 321
+    frames = emulator.cnt_frames
+    with hana.batch() as b:
+        b.exec_func(10, 13)        # set_high(13)
+        b.exec_func(250)           # 없는 함수
+        b.exec_func(13, 26)
+        b.exec_func(205, 1, 2, 3)
+    assert emulator.cnt_frames == frames + 1
+    assert b.results[0] is None or b.results[0] == ""
+    assert isinstance(b.results[1], Exception)
+    assert b.results[2] == "321"
+    assert dev.outputs[13] == 1
+    assert dev.neopixel == (1, 2, 3)
+
+
+def test_empty_batch(hana, emulator):
+    frames = emulator.cnt_frames
+    with hana.batch() as b:
+        pass
+    assert b.results == []
+    assert emulator.cnt_frames == frames
@@ -0,0 +1,62 @@
+import random
+
+import pytest
+
+pytest.importorskip("serial")
+
+from chaino import chaino as C
+
+
+def test_crc_variants_match_bitwise():
+    rnd = random.Random(1)
+    for n in (0, 1, 2, 7, 64, 255):
+        data = bytes(rnd.randrange(256) for _ in range(n))
+        for value in (0, 0x1D0F, 0xFFFF):
+            want = C._crc_hqx_bitwise(data, value)
+            assert C._crc_hqx_table(data, value) == want
+            assert C.crc_hqx(data, value) == want
+            assert C._crc_hqx_table_range(b"xx" + data + b"y", 2, 2 + n, value) == want
+            assert C.crc_hqx_range(bytearray(b"x" + data), 1, 1 + n, value) == want
+
+
+def test_crc_xmodem_frame():
+    packet = C.gen_exec_func_packet(0x41, 13, 26)
+    assert C.is_crc_matched(packet)
+    assert not C.is_crc_matched(packet[:-1] + bytes((packet[-1] ^ 1,)))
+
+
+@pytest.mark.parametrize("value", [
+    None, True, False, 0, -1, 127, -128, 128, 300, -40000, 1 << 40, -(1 << 40),
+    0.5, -2.25, "", "hana", "ㅎㅏㄴㅏ", b"", b"\x00\x04\x1b\xff",
+])
+def test_typed_round_trip(value):
+    assert C.decode_typed(C.encode_typed(value)) == [value]
+
+
+def test_typed_round_trip_many():
+    values = [1, "ab", b"\x04", None, 70000, False, 1.5]
+    assert C.decode_typed(b"".join(C.encode_typed(v) for v in values)) == values
+
+
+def test_typed_rejects():
+    with pytest.raises(TypeError):
+        C.encode_typed([1])
+    with pytest.raises(ValueError):
+        C.encode_typed(b"x" * 256)
+
+
+def test_stuffing_round_trip():
+    data = bytes(range(256)) * 2
+    stuffed = C._stuff(data)
+    assert b"\x04" not in stuffed
+    assert C._unstuff(stuffed) == data
+
+
+def test_binary_mode_with_emulator(hana, emulator):
+    emulator.device(0x41).adc[26] = 300
+    assert hana.exec_func(13, 26) == "300"
+    assert hana.set_binary_mode()
+    assert hana.exec_func(13, 26) == 300
+    assert hana.read_analog(26) == 300
+    assert hana.set_binary_mode(False) is False
+    assert hana.exec_func(13, 26) == "300"
@@ -0,0 +1,97 @@
+import time
+
+import pytest
+
+pytest.importorskip("serial")
+
+
+def test_writes_are_queued_and_coalesced(hana, emulator):
+    dev = emulator.device(0x41)
+    hana.set_shadow_mode()
+    frames = emulator.cnt_frames
+    for level in range(10):
+        hana.write_analog(9, level)
+        hana.set_high(13)
+    assert emulator.cnt_frames == frames # 아직 보내지 않는다
+    hana.flush()
+    assert emulator.cnt_frames == frames + 1
+    assert dev.pwm_duty[9] == 9 and dev.outputs[13] == 1
+
+
+def test_unchanged_writes_are_not_sent(hana, emulator):
+    hana.set_shadow_mode()
+    hana.set_high(13)
+    hana.write_analog(9, 100)
+    hana.flush()
+    frames = emulator.cnt_frames
+    for _ in range(5):
+        hana.set_high(13)
+        hana.write_analog(9, 100)
+    hana.flush()
+    assert emulator.cnt_frames == frames
+    hana.set_low(13)
+    hana.set_high(13) # 디바이스 상태로 되돌아왔다
+    hana.flush()
+    assert emulator.cnt_frames == frames
+
+
+def test_read_flushes_in_the_same_frame(hana, emulator):
+    dev = emulator.device(0x41)
+    dev.adc[26] = 321
+    hana.set_shadow_mode()
+    hana.set_high(13)
+    hana.set_neopixel(1, 2, 3)
+    frames = emulator.cnt_frames
+    assert hana.read_analog(26) == 321
+    assert emulator.cnt_frames == frames + 1
+    assert dev.outputs[13] == 1 and dev.neopixel == (1, 2, 3)
+
+
+def test_mode_change_forgets_the_other_modes(hana, emulator):
+    dev = emulator.device(0x41)
+    hana.set_shadow_mode()
+    hana.write_analog(9, 128)
+    hana.flush()
+    hana.set_low(9)
+    hana.flush()
+    dev.pwm_duty.clear()
+    hana.write_analog(9, 128) # 핀이 출력 모드로 바뀌었으므로 다시 보내야 한다
+    hana.flush()
+    assert dev.pwm_duty == {9: 128}
+
+
+def test_outputs_keep_the_order_per_pin(hana):
+    hana.set_shadow_mode()
+    sent = []
+    exec_batch = hana._exec_batch
+    hana._exec_batch = lambda calls: (sent.append(list(calls)), exec_batch(calls))[1]
+    hana.set_high(3)
+    hana.set_pwm_freq(9, 1000)
+    hana.set_high(9)
+    hana.set_low(4)
+    hana.flush()
+    assert sent == [[(10, (3,)), (22, (9, 1000)), (19, (1 << 9, 1 << 4))]]
+
+
+def test_tick_and_turning_off(hana, emulator):
+    dev = emulator.device(0x41)
+    hana.set_shadow_mode(tick=0.01)
+    hana.write_analog(9, 77)
+    deadline = time.monotonic() + 2
+    while dev.pwm_duty.get(9) != 77 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert dev.pwm_duty.get(9) == 77
+    hana.write_analog(9, 78)
+    hana.set_shadow_mode(False) # 보류된 쓰기를 보내고 끈다
+    assert dev.pwm_duty[9] == 78
+    assert "exec_func" not in hana.__dict__
+
+
+def test_device_error_is_raised_by_flush(hana, emulator):
+    dev = emulator.device(0x41)
+    hana.set_shadow_mode()
+    dev.register(21, lambda pin, duty: 1 / 0)
+    hana.write_analog(9, 2)
+    with pytest.raises(Exception):
+        hana.flush()
+    assert ("pwm", 9) not in hana._shadow